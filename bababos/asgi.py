@@ -2,6 +2,8 @@
 ASGI config for bababos project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server for ``/api/quotes/async`` to coalesce concurrent
+quote requests into batches, under WSGI every request is a batch of its own.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
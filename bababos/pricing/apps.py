@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PricingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "bababos.pricing"
+
+    def ready(self):
+        from bababos.pricing import signals  # noqa: F401
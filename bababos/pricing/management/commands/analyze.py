@@ -1,12 +1,17 @@
 import csv
+import json
 from datetime import datetime
 
+import pandas as pd
 from django.contrib.auth.models import User
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.core.management.base import OutputWrapper
 from django.utils import timezone
 from tabulate import tabulate
 
 from bababos.pricing.models import Customer, Logistic, Product, Region, Supplier, RFQ
+from bababos.pricing.services import RFQReport
+from bababos.utilities.utils import get_currency_formatter
 from colorama import init, Fore, Style
 
 
@@ -18,15 +23,53 @@ class Command(BaseCommand):
 
         self.rfq = None
 
+    money_fields = [
+        "last_po_price",
+        "lowest_supplier_price",
+        "supplier_price",
+        "chosen_price",
+        "final_price",
+        "freight",
+    ]
+
     def add_arguments(self, parser):
-        parser.add_argument("rfq_id", nargs="?", type=int)
+        parser.add_argument("rfq_ids", nargs="*", type=int)
+        parser.add_argument(
+            "--range",
+            nargs=2,
+            type=int,
+            metavar=("FIRST", "LAST"),
+            help="Report the RFQs with IDs from FIRST to LAST",
+        )
+        parser.add_argument(
+            "--format",
+            choices=["table", "csv", "json"],
+            default="table",
+            help="Format of the report of several RFQs",
+        )
+        parser.add_argument("--output", help="Write the report to this file")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of RFQs loaded together in a report",
+        )
 
     def handle(self, *args, **options):
         init()
 
-        rfq_id = options["rfq_id"]
+        rfq_ids = options["rfq_ids"]
+        if not rfq_ids and options["range"] is None:
+            raise CommandError("Give the ID of an RFQ, several IDs or --range")
+        if (
+            len(rfq_ids) > 1
+            or options["range"] is not None
+            or options["format"] != "table"
+            or options["output"]
+        ):
+            return self.write_report(options)
 
-        self.rfq = RFQ.objects.get(pk=rfq_id)
+        self.rfq = RFQ.objects.select_related("customer", "product").get(pk=rfq_ids[0])
         self.print_rfq_table()
         self.print_customer_purchase_order_histories()
         self.print_supplier_prices()
@@ -55,7 +98,9 @@ class Command(BaseCommand):
 
     def print_customer_purchase_order_histories(self):
         customer = self.rfq.customer
-        purchase_orders = customer.POs.filter(product=self.rfq.product)
+        purchase_orders = customer.POs.filter(product=self.rfq.product).select_related(
+            "customer", "product"
+        )
 
         data = []
         for purchase_order in purchase_orders:
@@ -88,14 +133,15 @@ class Command(BaseCommand):
 
     @staticmethod
     def format_currency(amount, currency="IDR"):
-        from babel.numbers import format_currency
-
-        formatted_amount = format_currency(amount, currency, locale="id_ID")
-        return formatted_amount
+        return get_currency_formatter(currency).format(amount)
 
     def print_supplier_prices(self):
         product = self.rfq.product
-        supplier_prices = product.supplier_prices.order_by("price")
+        supplier_prices = (
+            product.supplier_prices.filter(latest=True)
+            .select_related("supplier")
+            .order_by("price")
+        )
         data = []
         for supplier_price in supplier_prices:
             data.append(
@@ -119,7 +165,7 @@ class Command(BaseCommand):
         )
 
     def print_transactions(self):
-        transactions = self.rfq.transactions.all()
+        transactions = self.rfq.transactions.select_related("supplier_price__supplier")
         data = []
         for transaction in transactions:
             data.append(
@@ -136,7 +182,7 @@ class Command(BaseCommand):
                     + Style.RESET_ALL,
                     transaction.supplier_price.supplier.code,
                     transaction.status,
-                    # transaction.note
+                    transaction.rule,
                 ]
             )
         self.stdout.write("\n## Transactions")
@@ -153,8 +199,71 @@ class Command(BaseCommand):
                     "Final Price",
                     "Supplier",
                     "Status",
-                    # "Note"
+                    "Rule",
                 ],
                 tablefmt="presto",
             )
         )
+
+    def write_report(self, options):
+        rfqs = RFQ.objects.all()
+        if options["rfq_ids"]:
+            rfqs = rfqs.filter(pk__in=options["rfq_ids"])
+        if options["range"] is not None:
+            rfqs = rfqs.filter(pk__range=options["range"])
+        report = RFQReport(rfqs, chunk_size=options["chunk_size"])
+
+        output_file = None
+        output = self.stdout
+        if options["output"]:
+            output_file = open(options["output"], "w", newline="")
+            output = OutputWrapper(output_file)
+        try:
+            {
+                "table": self.write_table,
+                "csv": self.write_csv,
+                "json": self.write_json,
+            }[options["format"]](report, output)
+        finally:
+            if output_file is not None:
+                output_file.close()
+        if options["output"]:
+            self.stdout.write(
+                f"Reported {report.rfq_count} RFQs to {options['output']}"
+            )
+
+    def write_table(self, report, output):
+        formatter = get_currency_formatter()
+        for chunk in report.get_chunks():
+            rows = pd.DataFrame(
+                list(report.get_rows(chunk)), columns=report.FIELDS, dtype=object
+            )
+            for field in self.money_fields:
+                rows[field] = formatter.format_series(rows[field])
+            output.write(
+                tabulate(
+                    rows.itertuples(index=False),
+                    headers=report.FIELDS,
+                    tablefmt="simple",
+                    disable_numparse=True,
+                )
+            )
+
+    @staticmethod
+    def write_csv(report, output):
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(report.FIELDS)
+        writer.writerows(report)
+
+    @staticmethod
+    def write_json(report, output):
+        # Streamed as an array, a row is written once the next one is known
+        output.write("[")
+        previous = None
+        for row in report:
+            if previous is not None:
+                output.write(previous + ",")
+            previous = json.dumps(row._asdict(), default=str)
+        if previous is not None:
+            output.write(previous)
+        output.write("]")
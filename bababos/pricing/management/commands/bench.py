@@ -0,0 +1,210 @@
+import json
+import tempfile
+import time
+
+import numpy as np
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from bababos.pricing.models import RFQ, Customer
+from bababos.pricing.services import (
+    CustomerImporter,
+    PricelistImporter,
+    PricingProfiler,
+    PurchaseOrderImporter,
+    RFQImporter,
+    SupplierImporter,
+    SupplierRecommender,
+    SyntheticDataset,
+)
+from bababos.pricing.services.supplier_recommender import RFQAnalyzer
+from bababos.utilities.utils import QueryCounter, get_peak_rss_mb
+
+
+class Command(BaseCommand):
+    help = "Benchmark feed, decide and the analyzer on a synthetic dataset"
+
+    importers = {
+        "customers": CustomerImporter,
+        "suppliers": SupplierImporter,
+        "rfqs": RFQImporter,
+        "pricelist": PricelistImporter,
+        "purchase_orders": PurchaseOrderImporter,
+    }
+    dataset_keys = [
+        "customers",
+        "products",
+        "suppliers",
+        "purchase_orders_per_customer",
+        "supplier_prices_per_product",
+        "rfqs",
+        "basket_size",
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=1000)
+        parser.add_argument("--products", type=int, default=5000)
+        parser.add_argument("--suppliers", type=int, default=100)
+        parser.add_argument("--purchase-orders-per-customer", type=int, default=100)
+        parser.add_argument("--supplier-prices-per-product", type=int, default=3)
+        parser.add_argument("--rfqs", type=int, default=10_000)
+        parser.add_argument(
+            "--basket-size",
+            type=int,
+            default=20,
+            help="Number of products a customer buys",
+        )
+        parser.add_argument("--seed", type=float, default=0.42)
+        parser.add_argument(
+            "--prefix",
+            default="BENCH",
+            help="Prefix of the generated codes and SKUs, must not be in use",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of RFQs priced together by decide",
+        )
+        parser.add_argument(
+            "--analyze-sample",
+            type=int,
+            default=500,
+            help="Number of RFQs priced one by one with RFQAnalyzer",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the dataset, it is rolled back by default",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        dataset = SyntheticDataset(
+            customers=options["customers"],
+            products=options["products"],
+            suppliers=options["suppliers"],
+            purchase_orders_per_customer=options["purchase_orders_per_customer"],
+            supplier_prices_per_product=options["supplier_prices_per_product"],
+            rfqs=options["rfqs"],
+            basket_size=options["basket_size"],
+            prefix=options["prefix"],
+            seed=options["seed"],
+        )
+        if Customer.objects.filter(code__startswith=f"{dataset.prefix}-").exists():
+            raise CommandError(f"The prefix {dataset.prefix} is already in use")
+
+        report = {
+            "started_at": timezone.now().isoformat(),
+            "dataset": {
+                key: value
+                for key, value in dataset.get_params().items()
+                if key in self.dataset_keys
+            },
+        }
+        with tempfile.TemporaryDirectory() as directory, transaction.atomic():
+            # The generated rows are only used to write the CSV files, the
+            # benchmarked dataset is the one fed by the importers
+            dataset.get_region()
+            with transaction.atomic():
+                dataset.generate()
+                paths = dataset.export(directory)
+                transaction.set_rollback(True)
+
+            report["feed"] = self.bench_feed(paths)
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+            rfqs = RFQ.objects.filter(customer__code__startswith=f"{dataset.prefix}-")
+            report["decide"] = self.bench_decide(rfqs, options["batch_size"])
+            report["analyze"] = self.bench_analyze(
+                rfqs.order_by("id")[: options["analyze_sample"]]
+            )
+
+            transaction.set_rollback(not options["keep"])
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as output_file:
+                output_file.write(output)
+        self.stdout.write(output)
+
+    def bench_feed(self, paths):
+        results = {}
+        for name, importer_class in self.importers.items():
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                started_at = time.perf_counter()
+                importer = importer_class(path=paths[name]).handle()
+                seconds = time.perf_counter() - started_at
+
+            results[name] = {
+                "rows": importer.read,
+                "written": importer.written,
+                "seconds": seconds,
+                "rows_per_second": importer.read / max(seconds, 1e-9),
+                "queries": counter.count,
+                "peak_rss_mb": get_peak_rss_mb(),
+            }
+        return results
+
+    def bench_decide(self, rfqs, batch_size):
+        recommender = SupplierRecommender(batch_size=batch_size, profile=True)
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started_at = time.perf_counter()
+            recommender.handle(rfqs)
+            seconds = time.perf_counter() - started_at
+
+        # RFQs of a batch are priced together, they share its latency
+        latencies = np.repeat(
+            [batch_seconds / size for size, batch_seconds in recommender.batch_timings],
+            [size for size, _ in recommender.batch_timings],
+        )
+        return {
+            **self.summarize(recommender.rfq_count, seconds, latencies),
+            "batch_size": batch_size,
+            "queries": counter.count,
+            "peak_rss_mb": get_peak_rss_mb(),
+            "phases": recommender.profiler.get_summary(),
+            **recommender.get_stats(),
+        }
+
+    def bench_analyze(self, rfqs):
+        latencies = []
+        unpriced = 0
+        counter = QueryCounter()
+        profiler = PricingProfiler()
+        with connection.execute_wrapper(counter), connection.execute_wrapper(profiler):
+            started_at = time.perf_counter()
+            # Loaded once, as decide does, not by every analyzer
+            margin_policy = RFQAnalyzer.load_margin_policy()
+            for rfq in rfqs:
+                rfq_started_at = time.perf_counter()
+                analyzer = RFQAnalyzer(
+                    rfq, profiler=profiler, margin_policy=margin_policy
+                ).handle()
+                # The rule of the RFQ leaves it unpriced
+                unpriced += analyzer.chosen_price is None
+                latencies.append(time.perf_counter() - rfq_started_at)
+            seconds = time.perf_counter() - started_at
+
+        return {
+            **self.summarize(len(latencies), seconds, latencies),
+            "unpriced": unpriced,
+            "queries": counter.count,
+            "peak_rss_mb": get_peak_rss_mb(),
+            "phases": profiler.get_summary(),
+        }
+
+    @staticmethod
+    def summarize(rfq_count, seconds, latencies):
+        p50, p95 = np.percentile(latencies, [50, 95]) if len(latencies) else (0, 0)
+        return {
+            "rfqs": rfq_count,
+            "seconds": seconds,
+            "rfqs_per_second": rfq_count / max(seconds, 1e-9),
+            "p50_ms": float(p50) * 1000,
+            "p95_ms": float(p95) * 1000,
+        }
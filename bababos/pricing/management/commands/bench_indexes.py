@@ -0,0 +1,235 @@
+import json
+import statistics
+import time
+
+from django.core.management import BaseCommand
+from django.db import connection, models
+from django.db.models import Exists, OuterRef
+from tabulate import tabulate
+
+from bababos.pricing.models import PO, RFQ, SupplierPrice, Transaction
+from bababos.pricing.services import SyntheticDataset
+
+
+class Command(BaseCommand):
+    help = "Time the hot lookups of decide and analyze before and after the index migration"
+
+    # Indexes of the 0011_hot_lookup_indexes migration
+    hot_indexes = [
+        (PO, "purchase_orders_history_idx"),
+        (SupplierPrice, "supplier_prices_latest_idx"),
+    ]
+    # Foreign keys whose own index the migration dropped
+    foreign_keys = [(PO, "customer"), (Transaction, "rfq")]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--generate",
+            action="store_true",
+            help="Generate a synthetic dataset first",
+        )
+        parser.add_argument("--customers", type=int, default=10_000)
+        parser.add_argument("--products", type=int, default=20_000)
+        parser.add_argument("--suppliers", type=int, default=200)
+        parser.add_argument("--purchase-orders-per-customer", type=int, default=1000)
+        parser.add_argument("--supplier-prices-per-product", type=int, default=3)
+        parser.add_argument("--rfqs", type=int, default=10_000)
+        parser.add_argument(
+            "--sample",
+            type=int,
+            default=200,
+            help="Number of RFQs whose lookups are timed",
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--json", action="store_true", help="Print JSON only")
+
+    def handle(self, *args, **options):
+        if options["generate"]:
+            started_at = time.perf_counter()
+            SyntheticDataset(
+                customers=options["customers"],
+                products=options["products"],
+                suppliers=options["suppliers"],
+                purchase_orders_per_customer=options["purchase_orders_per_customer"],
+                supplier_prices_per_product=options["supplier_prices_per_product"],
+                rfqs=options["rfqs"],
+            ).generate()
+            self.log(
+                options,
+                f"Generated the dataset in {time.perf_counter() - started_at:.0f}s",
+            )
+
+        rfqs = list(
+            RFQ.objects.order_by("id").values_list("id", "customer_id", "product_id")[
+                : options["sample"]
+            ]
+        )
+        results = {
+            "purchase_orders": PO.objects.count(),
+            "supplier_prices": SupplierPrice.objects.count(),
+            "rfqs": RFQ.objects.count(),
+            "sample": len(rfqs),
+        }
+
+        # The indexes are switched in place, migrating back would unapply
+        # the later migrations and drop their tables
+        try:
+            self.drop_hot_indexes()
+            self.vacuum()
+            results["before"] = self.measure(rfqs, options["repeat"])
+        finally:
+            self.restore_indexes()
+        self.vacuum()
+        results["after"] = self.measure(rfqs, options["repeat"])
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            "{purchase_orders} POs, {supplier_prices} supplier prices, "
+            "{rfqs} RFQs, {sample} sampled".format(**results)
+        )
+        self.stdout.write(
+            tabulate(
+                [
+                    [
+                        query,
+                        f"{before['ms']:.3f}",
+                        f"{results['after'][query]['ms']:.3f}",
+                        f"{before['db_ms']:.3f}",
+                        f"{results['after'][query]['db_ms']:.3f}",
+                        before["plan"],
+                        results["after"][query]["plan"],
+                    ]
+                    for query, before in results["before"].items()
+                ],
+                headers=[
+                    "Query",
+                    "Before ms",
+                    "After ms",
+                    "Before DB ms",
+                    "After DB ms",
+                    "Before",
+                    "After",
+                ],
+                tablefmt="github",
+            )
+        )
+
+    def log(self, options, message):
+        if not options["json"]:
+            self.stdout.write(message)
+
+    def drop_hot_indexes(self):
+        """
+        Put the indexes back as they were before ``0011_hot_lookup_indexes``.
+        """
+        with connection.schema_editor() as schema_editor:
+            for model, name in self.hot_indexes:
+                schema_editor.remove_index(model, self.get_index(model, name))
+            for model, field in self.foreign_keys:
+                schema_editor.add_index(model, self.get_foreign_key_index(model, field))
+
+    def restore_indexes(self):
+        with connection.schema_editor() as schema_editor:
+            for model, field in self.foreign_keys:
+                index = self.get_foreign_key_index(model, field)
+                if index.name in self.get_index_names(model):
+                    schema_editor.remove_index(model, index)
+            for model, name in self.hot_indexes:
+                if name not in self.get_index_names(model):
+                    schema_editor.add_index(model, self.get_index(model, name))
+
+    @staticmethod
+    def get_index(model, name) -> models.Index:
+        return next(index for index in model._meta.indexes if index.name == name)
+
+    @staticmethod
+    def get_foreign_key_index(model, field) -> models.Index:
+        return models.Index(
+            fields=[field], name=f"{model._meta.db_table}_{field}_bench_idx"
+        )
+
+    @staticmethod
+    def get_index_names(model):
+        with connection.cursor() as cursor:
+            return set(
+                connection.introspection.get_constraints(cursor, model._meta.db_table)
+            )
+
+    @staticmethod
+    def vacuum():
+        # Index only scans need the visibility map of a vacuumed table
+        with connection.cursor() as cursor:
+            for model in [PO, SupplierPrice, Transaction]:
+                cursor.execute(f"VACUUM ANALYZE {model._meta.db_table}")
+
+    def measure(self, rfqs, repeat):
+        product_ids = sorted({product_id for _, _, product_id in rfqs})
+        rfq_ids = [rfq_id for rfq_id, _, _ in rfqs]
+
+        # Lookups run once per sampled RFQ, batch queries once per sample
+        lookups = {
+            "PO history of a customer and product": (
+                lambda customer_id, product_id: PO.objects.filter(
+                    customer_id=customer_id, product_id=product_id
+                ).order_by("ordered_at")
+            ),
+            "Latest supplier prices of a product": (
+                lambda customer_id, product_id: SupplierPrice.objects.filter(
+                    product_id=product_id, latest=True
+                ).order_by("price")
+            ),
+        }
+        batch_queries = {
+            "PO histories of a batch": PO.objects.filter(
+                Exists(
+                    RFQ.objects.filter(
+                        pk__in=rfq_ids,
+                        customer_id=OuterRef("customer_id"),
+                        product_id=OuterRef("product_id"),
+                    )
+                )
+            ).values_list("customer_id", "product_id", "price"),
+            "Stock index of a batch": SupplierPrice.objects.filter(
+                product_id__in=product_ids, latest=True
+            )
+            .order_by("product_id", "price", "id")
+            .values_list("id", "product_id", "price", "available_stock"),
+            "Transactions of a batch": Transaction.objects.filter(
+                rfq_id__in=rfq_ids
+            ).values_list("rfq_id", "supplier_price_id"),
+        }
+
+        results = {}
+        for name, lookup in lookups.items():
+            querysets = [
+                lookup(customer_id, product_id) for _, customer_id, product_id in rfqs
+            ]
+            results[name] = self.time_queries(querysets, repeat)
+        for name, queryset in batch_queries.items():
+            results[name] = self.time_queries([queryset], repeat)
+        return results
+
+    def time_queries(self, querysets, repeat):
+        """
+        Median milliseconds per query, after a first run warming the cache
+        up, and the execution time and scans of the query plan.
+        """
+        timings = []
+        for _ in range(repeat + 1):
+            started_at = time.perf_counter()
+            for queryset in querysets:
+                # A copy, so the result cache of the queryset is not reused
+                list(queryset.all())
+            timings.append((time.perf_counter() - started_at) / len(querysets))
+
+        plan = querysets[0].explain(analyze=True).splitlines()
+        return {
+            "ms": statistics.median(timings[1:]) * 1000,
+            "db_ms": float(plan[-1].split(":")[1].split()[0]),
+            "plan": ", ".join(
+                line.strip(" ->").split("  (")[0] for line in plan if "Scan" in line
+            ),
+        }
@@ -1,17 +1,226 @@
-import csv
-from datetime import datetime
+import json
+import time
 
-from django.contrib.auth.models import User
-from django.core.management import BaseCommand
-from django.utils import timezone
+from django.core.management import BaseCommand, CommandError
 
-from bababos.pricing.models import Customer, Logistic, Product, Region, Supplier
-from bababos.pricing.services import SupplierRecommender
+from bababos.pricing.models import PricingRun
+from bababos.pricing.services import (
+    ChangeTracker,
+    ParallelSupplierRecommender,
+    StreamingSupplierRecommender,
+    SupplierRecommender,
+)
 
 
 class Command(BaseCommand):
     help = "Decide the prices"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of RFQs priced together",
+        )
+        parser.add_argument(
+            "--flush-size",
+            type=int,
+            default=1000,
+            help="Number of transactions written per INSERT",
+        )
+        parser.add_argument(
+            "--update",
+            action="store_true",
+            help="Overwrite transactions already decided for the same RFQ and supplier price",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes, RFQs are split between them by product",
+        )
+        parser.add_argument(
+            "--stream",
+            action="store_true",
+            help="Stream the RFQs product by product, with bounded memory",
+        )
+        parser.add_argument(
+            "--max-memory",
+            type=int,
+            help="Memory budget in MB of a streamed run, the batch size shrinks to stay under it",
+        )
+        parser.add_argument(
+            "--context-size",
+            type=int,
+            default=10_000,
+            help="Number of PO summaries a streamed run keeps between batches",
+        )
+        parser.add_argument(
+            "--landed-cost",
+            action="store_true",
+            help="Allocate suppliers on their price plus the freight to the customer",
+        )
+        parser.add_argument(
+            "--basket",
+            action="store_true",
+            help="Allocate the RFQs of a customer in a batch together, on landed cost",
+        )
+        parser.add_argument(
+            "--basket-budget",
+            type=int,
+            default=50,
+            help="Milliseconds a basket may take before it keeps the RFQ by RFQ allocation",
+        )
+        parser.add_argument(
+            "--handling-cost",
+            type=int,
+            default=0,
+            help="Cost of buying from one more supplier in a basket",
+        )
+        parser.add_argument(
+            "--priority",
+            choices=list(SupplierRecommender.PRIORITIES),
+            default="id",
+            help="Order RFQs take stock in: by ID, oldest first, highest customer tier first or highest expected margin first",
+        )
+        parser.add_argument(
+            "--reserve-stock",
+            action="store_true",
+            help="Only price RFQs without transactions, and take the stock they bought out of the supplier prices in the transaction that writes them",
+        )
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="Report the time and queries of every pricing phase",
+        )
+        parser.add_argument(
+            "--profile-json",
+            help="Write the phase histograms to this file as JSON",
+        )
+        parser.add_argument(
+            "--profile-prometheus",
+            help="Write the phase histograms to this file in the Prometheus text format",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only price again the RFQs whose inputs changed since the last run",
+        )
+
     def handle(self, *args, **options):
-        recommender = SupplierRecommender()
-        recommender.handle()
+        stream = options["stream"] or options["max_memory"] is not None
+        if stream and options["workers"] > 1:
+            raise CommandError(
+                "--stream and --max-memory cannot be used with --workers"
+            )
+        if options["reserve_stock"] and (options["update"] or options["incremental"]):
+            raise CommandError(
+                "--reserve-stock cannot be used with --update or --incremental"
+            )
+        if options["basket"] and (stream or options["workers"] > 1):
+            raise CommandError(
+                "--basket cannot be used with --stream, --max-memory or --workers"
+            )
+
+        recommender_options = {
+            "batch_size": options["batch_size"],
+            "flush_size": options["flush_size"],
+            "update_conflicts": options["update"],
+            "landed_cost": options["landed_cost"],
+            "priority": options["priority"],
+            "reserve_stock": options["reserve_stock"],
+            "profile": bool(
+                options["profile"]
+                or options["profile_json"]
+                or options["profile_prometheus"]
+            ),
+        }
+        started_at = time.perf_counter()
+
+        rfqs = None
+        watermark = PricingRun.get_watermark()
+        run = PricingRun.objects.create(incremental=options["incremental"])
+        if options["incremental"] and watermark is not None:
+            rfqs = ChangeTracker(watermark).get_rfqs()
+            ChangeTracker.discard_pending_transactions(rfqs)
+            self.stdout.write(
+                f"Pricing RFQs changed since {watermark:%Y-%m-%d %H:%M:%S}"
+            )
+
+        if options["workers"] > 1:
+            recommender = ParallelSupplierRecommender(
+                options["workers"], **recommender_options
+            )
+        elif stream:
+            recommender = StreamingSupplierRecommender(
+                max_context=options["context_size"],
+                max_memory=options["max_memory"],
+                **recommender_options,
+            )
+        elif options["basket"]:
+            recommender = SupplierRecommender(
+                basket_budget=options["basket_budget"] / 1000,
+                handling_cost=options["handling_cost"],
+                **recommender_options,
+            )
+        else:
+            recommender = SupplierRecommender(**recommender_options)
+        recommender.handle(rfqs)
+        run.finish(recommender.rfq_count, **recommender.get_stats())
+
+        seconds = time.perf_counter() - started_at
+        self.stdout.write(
+            "Transactions: {inserted} inserted, {skipped} skipped, {updated} updated".format(
+                **recommender.get_stats()
+            )
+        )
+        if options["workers"] > 1:
+            for result in recommender.results:
+                self.stdout.write(
+                    "Worker {worker}: {products} products, {rfqs} RFQs in {seconds:.2f}s"
+                    " ({throughput:.0f} RFQs/s)".format(
+                        throughput=result["rfqs"] / max(result["seconds"], 1e-9),
+                        **result,
+                    )
+                )
+        if stream:
+            self.stdout.write(
+                "Context: {summaries} PO summaries kept ({summary_hits} hits, "
+                "{summary_misses} misses), {products} products, last batch of "
+                "{batch_size} RFQs".format(**recommender.get_context_stats())
+            )
+        if options["reserve_stock"]:
+            self.stdout.write(
+                f"Reserved the stock of {recommender.reserved} supplier prices"
+            )
+        if options["basket"]:
+            self.stdout.write(
+                "Baskets: {baskets}, {consolidated} consolidated saving {saved:,.0f},"
+                " {over_budget} over budget".format(
+                    **recommender.basket_allocator.get_stats()
+                )
+            )
+        self.stdout.write(
+            f"Decided {recommender.rfq_count} RFQs in {seconds:.2f}s"
+            f" ({recommender.rfq_count / max(seconds, 1e-9):.0f} RFQs/s)"
+        )
+        self.stdout.write(
+            f"Peak memory {recommender.peak_rss_mb:.0f} MB,"
+            f" {recommender.queries} queries"
+        )
+        if recommender_options["profile"]:
+            self.write_profile(recommender.profiler, options)
+
+    def write_profile(self, profiler, options):
+        if options["profile"]:
+            for phase, summary in profiler.get_summary().items():
+                self.stdout.write(
+                    "Phase {phase}: {seconds:.2f}s, {queries} queries,"
+                    " {ms_per_rfq:.3f} ms/RFQ".format(phase=phase, **summary)
+                )
+        if options["profile_json"]:
+            with open(options["profile_json"], "w") as output_file:
+                json.dump(profiler.to_dict(), output_file, indent=2)
+        if options["profile_prometheus"]:
+            with open(options["profile_prometheus"], "w") as output_file:
+                output_file.write(profiler.to_prometheus())
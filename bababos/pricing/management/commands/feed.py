@@ -1,11 +1,13 @@
-import csv
-from datetime import datetime
-
-from django.contrib.auth.models import User
 from django.core.management import BaseCommand
-from django.utils import timezone
 
-from bababos.pricing.models import Customer, Logistic, Product, Region, Supplier
+from bababos.pricing.models import Logistic, LogisticPrice, Region, Supplier
+from bababos.pricing.services import (
+    CustomerImporter,
+    PricelistImporter,
+    PurchaseOrderImporter,
+    RFQImporter,
+    SupplierImporter,
+)
 
 
 class Command(BaseCommand):
@@ -70,7 +72,16 @@ class Command(BaseCommand):
         ],
     }
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pricelist",
+            help="Only upsert the supplier prices of this pricelist CSV",
+        )
+
     def handle(self, *args, **options):
+        if options["pricelist"]:
+            return self.feed_pricelist(options["pricelist"])
+
         self.feed_regions()
         self.feed_customers()
         self.feed_suppliers()
@@ -100,41 +111,11 @@ class Command(BaseCommand):
                 for district in self.regions[province][city]:
                     self._find_or_create_if_not_exists(city_instance, district)
 
-    @staticmethod
-    def feed_customers():
+    def feed_customers(self):
+        CustomerImporter(stdout=self.stdout).handle()
 
-        with open("resources/customer.csv", newline="") as csv_file:
-            reader = csv.reader(csv_file)
-            next(reader, None)
-            for row in reader:
-                if User.objects.filter(username=row[0].lower()).exists():
-                    continue
-
-                user = User.objects.create(username=row[0].lower())
-                region = Region.objects.get(name=row[2])
-
-                # todo: simplify using 1 to 1 relationship
-                Customer.objects.create(
-                    user=user, code=row[0], address=row[1], region=region
-                )
-
-    @staticmethod
-    def feed_suppliers():
-
-        with open("resources/supplier.csv", newline="") as csv_file:
-            reader = csv.reader(csv_file)
-            next(reader, None)
-
-            for row in reader:
-                if User.objects.filter(username=row[0].lower()).exists():
-                    continue
-                user = User.objects.create(username=row[0].lower())
-                region = Region.objects.get(name=row[2])
-
-                # todo: simplify using 1 to 1 relationship
-                Supplier.objects.create(
-                    user=user, code=row[0], address=row[1], region=region
-                )
+    def feed_suppliers(self):
+        SupplierImporter(stdout=self.stdout).handle()
 
     def feed_logistics(self):
 
@@ -144,79 +125,55 @@ class Command(BaseCommand):
             Logistic.objects.create(fleet_type=logistic[0], capacity=logistic[1])
 
     def feed_logistic_prices(self):
+        regions = dict(
+            Region.objects.filter(
+                name__in=[
+                    "Cilincing",
+                    *(
+                        dst_price[0]
+                        for dst_prices in self.logistic_prices.values()
+                        for dst_price in dst_prices
+                    ),
+                ]
+            ).values_list("name", "id")
+        )
+        logistics = dict(
+            Logistic.objects.filter(fleet_type__in=self.logistic_prices)
+            .order_by("id")
+            .values_list("fleet_type", "id")
+        )
+        existing = set(
+            LogisticPrice.objects.values_list(
+                "logistic_id", "source_id", "destination_id"
+            )
+        )
 
+        logistic_prices = []
         for item in self.logistic_prices:
-            logistic = Logistic.objects.filter(fleet_type=item).last()
             for dst_price in self.logistic_prices[item]:
-                _price = dst_price[1] * (10**6)
-                _src = Region.objects.get(name="Cilincing")
-                _dst = Region.objects.get(name=dst_price[0])
-
-                if logistic.prices.filter(source=_src, destination=_dst).exists():
+                key = logistics[item], regions["Cilincing"], regions[dst_price[0]]
+                if key in existing:
                     continue
-
-                logistic.prices.create(source=_src, destination=_dst, price=_price)
-
-    @staticmethod
-    def feed_customer_request_for_quotations():
-
-        with open("resources/rfq-customer.csv", newline="") as csv_file:
-            reader = csv.reader(csv_file)
-            next(reader, None)
-
-            for row in reader:
-                customer = Customer.objects.get(code=row[0])
-
-                product = Product.objects.filter(sku=row[1]).last()
-                if product is None:
-                    product = Product.objects.create(sku=row[1])
-
-                customer.RFQs.create(
-                    product=product,
-                    quantity=row[2],
-                    unit=row[3],
+                existing.add(key)
+                logistic_prices.append(
+                    LogisticPrice(
+                        logistic_id=key[0],
+                        source_id=key[1],
+                        destination_id=key[2],
+                        price=dst_price[1] * (10**6),
+                    )
                 )
 
-    @staticmethod
-    def feed_pricelist():
+        LogisticPrice.objects.bulk_create(logistic_prices)
 
-        with open("resources/pricelist.csv", newline="") as csv_file:
-            reader = csv.reader(csv_file)
-            next(reader, None)
+    def feed_customer_request_for_quotations(self):
+        RFQImporter(stdout=self.stdout).handle()
 
-            for row in reader:
-                supplier = Supplier.objects.get(code=row[0])
-                product = Product.objects.filter(sku=row[1]).last()
-                if product is None:
-                    product = Product.objects.create(sku=row[1])
+    def feed_pricelist(self, path=None):
+        PricelistImporter(path=path, stdout=self.stdout).handle()
 
-                supplier.prices.create(
-                    product=product, price=row[2], available_stock=row[3]
-                )
-
-    @staticmethod
-    def feed_purchase_orders():
-
-        with open("resources/historical-po.csv", newline="") as csv_file:
-            reader = csv.reader(csv_file)
-            next(reader, None)
-
-            for row in reader:
-                customer = Customer.objects.get(code=row[0])
-                product = Product.objects.get(sku=row[3])
-                if product.name is None:
-                    product.name = row[4]
-                    product.save()
-
-                customer.POs.create(
-                    product=product,
-                    quantity=int(row[5]),
-                    ordered_at=timezone.make_aware(
-                        datetime.strptime(row[1], "%d/%m/%Y")
-                    ),
-                    unit=row[6],
-                    price=float(row[7]),
-                )
+    def feed_purchase_orders(self):
+        PurchaseOrderImporter(stdout=self.stdout).handle()
 
     @staticmethod
     def _find_or_create_if_not_exists(model, region, root=False):
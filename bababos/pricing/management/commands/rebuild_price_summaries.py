@@ -0,0 +1,18 @@
+import time
+
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from bababos.pricing.models import CustomerProductPriceSummary
+
+
+class Command(BaseCommand):
+    help = "Rebuild the PO history summaries of every customer and product"
+
+    def handle(self, *args, **options):
+        started_at = time.perf_counter()
+        with transaction.atomic():
+            count = CustomerProductPriceSummary.rebuild()
+        self.stdout.write(
+            f"Rebuilt {count} summaries in {time.perf_counter() - started_at:.1f}s"
+        )
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+
+def retire_duplicate_prices(apps, schema_editor):
+    """
+    Re-feeds used to insert the pricelist again, only the newest row of a
+    supplier and product stays the latest one.
+    """
+    SupplierPrice = apps.get_model("pricing", "SupplierPrice")
+    newer = SupplierPrice.objects.filter(
+        supplier_id=models.OuterRef("supplier_id"),
+        product_id=models.OuterRef("product_id"),
+        latest=True,
+        id__gt=models.OuterRef("id"),
+    )
+    SupplierPrice.objects.filter(models.Exists(newer), latest=True).update(latest=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pricing", "0009_pricingrun"),
+    ]
+
+    operations = [
+        migrations.RunPython(retire_duplicate_prices, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="supplierprice",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("latest", True)),
+                fields=("product", "supplier"),
+                name="supplier_prices_latest_uniq",
+            ),
+        ),
+    ]
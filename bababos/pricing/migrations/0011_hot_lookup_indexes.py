@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pricing", "0010_supplierprice_latest_uniq"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="po",
+            name="customer",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="POs",
+                to="pricing.customer",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="rfq",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="transactions",
+                to="pricing.rfq",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="po",
+            index=models.Index(
+                fields=["customer", "product", "ordered_at"],
+                include=("price",),
+                name="purchase_orders_history_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="supplierprice",
+            index=models.Index(
+                condition=models.Q(("latest", True)),
+                fields=["product", "price"],
+                include=("available_stock", "supplier", "id"),
+                name="supplier_prices_latest_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:44
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+import django_extensions.db.fields
+from django.db import migrations, models
+
+# Summaries of the POs already fed, see CustomerProductPriceSummary.rebuild
+REBUILD = """
+    INSERT INTO customer_product_price_summaries (
+        created, modified, customer_id, product_id, po_count, prices,
+        last_price, last_ordered_at
+    )
+    SELECT
+        now(), now(), customer_id, product_id, count(*),
+        array_agg(DISTINCT price ORDER BY price),
+        (array_agg(price ORDER BY ordered_at DESC, id DESC))[1],
+        max(ordered_at)
+    FROM purchase_orders
+    GROUP BY customer_id, product_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pricing", "0011_hot_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerProductPriceSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name="modified"
+                    ),
+                ),
+                ("po_count", models.PositiveIntegerField(default=0)),
+                (
+                    "prices",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.DecimalField(decimal_places=5, max_digits=21),
+                        db_comment="Unique PO prices, ascending",
+                        default=list,
+                        size=None,
+                    ),
+                ),
+                (
+                    "last_price",
+                    models.DecimalField(decimal_places=5, max_digits=21, null=True),
+                ),
+                ("last_ordered_at", models.DateTimeField(null=True)),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="price_summaries",
+                        to="pricing.customer",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="pricing.product",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "customer_product_price_summaries",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("customer", "product"),
+                        name="customer_product_price_summaries_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(REBUILD, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pricing", "0012_customerproductpricesummary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="freight",
+            field=models.DecimalField(
+                db_comment="Freight per unit from the supplier, set when allocated on landed cost",
+                decimal_places=5,
+                default=0,
+                max_digits=21,
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pricing", "0013_transaction_freight"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customer",
+            name="tier",
+            field=models.PositiveSmallIntegerField(
+                db_comment="Higher tiers get stock first with decide --priority tier",
+                db_default=0,
+                default=0,
+            ),
+        ),
+    ]
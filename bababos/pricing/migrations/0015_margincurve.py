@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:25
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+import django_extensions.db.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pricing", "0014_customer_tier"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MarginCurve",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name="modified"
+                    ),
+                ),
+                (
+                    "interpolation",
+                    models.CharField(
+                        choices=[
+                            ("linear", "Linear between breakpoints"),
+                            ("step", "Margin of the last breakpoint reached"),
+                        ],
+                        default="linear",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "quantities",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.PositiveIntegerField(),
+                        db_comment="Breakpoints, ascending",
+                        size=None,
+                    ),
+                ),
+                (
+                    "margins",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.DecimalField(decimal_places=5, max_digits=8),
+                        db_comment="Profit margin at every breakpoint",
+                        size=None,
+                    ),
+                ),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="margin_curves",
+                        to="pricing.customer",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="margin_curves",
+                        to="pricing.product",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "margin_curves",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("customer", "product"),
+                        name="margin_curves_uniq",
+                        nulls_distinct=False,
+                    )
+                ],
+            },
+        ),
+    ]
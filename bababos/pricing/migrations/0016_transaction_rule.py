@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:39
+
+from django.db import migrations, models
+
+# Rule IDs of the notes written before, see pricing_rules.DEFAULT_RULES
+NOTE_RULES = {
+    r"^Single PO history, single supplier price, and last PO history price less than": "single_po_single_supplier_lower",
+    r"^Single PO history, single supplier price, and last PO history price greater than": "single_po_single_supplier_higher",
+    r"^Single PO history, \d+ supplier prices, and has more than one higher": "single_po_higher_bids",
+    r"^Single PO history, \d+ supplier prices, and has one unique supplier price that equal": "single_po_equal_bid",
+    r"^Single PO history, \d+ supplier prices, and has multiple unique": "single_po_multiple_bids",
+    r"^Has \d+ PO histories but all unique, one supplier price, and supplier price greater": "unique_po_greater_supplier",
+    r"^Has \d+ PO histories but all unique, one supplier price, and supplier price less": "unique_po_lower_supplier",
+    r"^Has \d+ PO histories, one supplier price, and supplier price greater": "po_greater_supplier",
+    r"^Has \d+ PO histories, one supplier price, and supplier price between": "po_between_supplier",
+    r"^Has \d+ PO histories, \d+ supplier prices$": "po_multiple_suppliers",
+}
+
+
+def set_rules_from_notes(apps, schema_editor):
+    Transaction = apps.get_model("pricing", "Transaction")
+    for pattern, rule in NOTE_RULES.items():
+        Transaction.objects.filter(note__regex=pattern).update(rule=rule)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pricing", "0015_margincurve"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="rule",
+            field=models.CharField(
+                blank=True,
+                db_comment="ID of the pricing rule that decided the price",
+                max_length=64,
+                null=True,
+            ),
+        ),
+        migrations.RunPython(set_rules_from_notes, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="transaction",
+            name="note",
+        ),
+    ]
@@ -1,6 +1,9 @@
 from .customer import Customer, CustomerFactory
+from .customer_product_price_summary import CustomerProductPriceSummary
 from .logistic import Logistic, LogisticFactory
 from .logistic_price import LogisticPrice, LogisticPriceFactory
+from .margin_curve import MarginCurve
+from .pricing_run import PricingRun
 from .product import Product, ProductFactory
 from .purchase_order import PO, POFactory
 from .region import Region, RegionFactory
@@ -11,10 +14,13 @@ from .transaction import Transaction
 
 __all__ = [
     "Customer",
+    "CustomerProductPriceSummary",
     "RFQ",
     "Logistic",
     "LogisticPrice",
+    "MarginCurve",
     "PO",
+    "PricingRun",
     "Product",
     "Region",
     "Supplier",
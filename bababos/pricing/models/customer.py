@@ -15,6 +15,11 @@ class Customer(Model):
     region = models.ForeignKey(
         "pricing.Region", on_delete=models.CASCADE, related_name="customers"
     )
+    tier = models.PositiveSmallIntegerField(
+        default=0,
+        db_default=0,  # Customers are also inserted with COPY
+        db_comment="Higher tiers get stock first with decide --priority tier",
+    )
 
     class Meta:
         db_table = "customers"
@@ -24,12 +29,13 @@ class UserFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = User
 
-    username = factory.Faker("first_name")
+    username = factory.Sequence(lambda n: f"user-{n}")
 
 
 class CustomerFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = Customer
 
+    code = factory.Sequence(lambda n: f"C-{n}")
     user = factory.SubFactory(UserFactory)
     region = factory.SubFactory("bababos.pricing.models.RegionFactory")
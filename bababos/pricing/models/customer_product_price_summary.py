@@ -0,0 +1,167 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db import connection, models
+
+from bababos.utilities.utils import Model
+
+
+class CustomerProductPriceSummary(Model):
+    """
+    What the analyzer needs of the PO history of a customer and product:
+    the number of POs, their unique prices and the price of the last one.
+
+    Saved POs are added by a ``post_save`` signal, ``refresh`` recomputes
+    the pairs written in bulk and ``rebuild`` the whole table.
+    """
+
+    customer = models.ForeignKey(
+        to="pricing.Customer",
+        on_delete=models.CASCADE,
+        related_name="price_summaries",
+        db_index=False,  # Covered by customer_product_price_summaries_uniq
+    )
+    product = models.ForeignKey(
+        to="pricing.Product", on_delete=models.CASCADE, related_name="+"
+    )
+    po_count = models.PositiveIntegerField(default=0)
+    prices = ArrayField(
+        models.DecimalField(max_digits=21, decimal_places=5),
+        default=list,
+        db_comment="Unique PO prices, ascending",
+    )
+    last_price = models.DecimalField(max_digits=21, decimal_places=5, null=True)
+    last_ordered_at = models.DateTimeField(null=True)
+
+    class Meta:
+        db_table = "customer_product_price_summaries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["customer", "product"],
+                name="customer_product_price_summaries_uniq",
+            ),
+        ]
+
+    @property
+    def min_price(self):
+        return self.prices[0] if self.prices else None
+
+    @property
+    def max_price(self):
+        return self.prices[-1] if self.prices else None
+
+    @classmethod
+    def add(cls, purchase_order):
+        """
+        Count a new PO in the summary of its customer and product.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                cls.ADD,
+                {
+                    "customer_id": purchase_order.customer_id,
+                    "product_id": purchase_order.product_id,
+                    "price": purchase_order.price,
+                    "ordered_at": purchase_order.ordered_at,
+                },
+            )
+
+    @classmethod
+    def refresh(cls, pairs):
+        """
+        Recompute the summaries of (customer ID, product ID) pairs from their
+        POs, pairs without POs left are deleted.
+        """
+        pairs = list(set(pairs))
+        if not pairs:
+            return
+        customer_ids, product_ids = map(list, zip(*pairs))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                cls.REFRESH, {"customer_ids": customer_ids, "product_ids": product_ids}
+            )
+            cursor.execute(
+                cls.DELETE_EMPTY,
+                {"customer_ids": customer_ids, "product_ids": product_ids},
+            )
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recompute every summary, returns the number of summaries.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {cls._meta.db_table}")
+            cursor.execute(cls.REBUILD)
+            return cursor.rowcount
+
+    # A later PO, or the same time with a higher ID, is the last one
+    AGGREGATE = """
+        SELECT
+            now(), now(), customer_id, product_id, count(*),
+            array_agg(DISTINCT price ORDER BY price),
+            (array_agg(price ORDER BY ordered_at DESC, id DESC))[1],
+            max(ordered_at)
+        FROM purchase_orders
+    """
+
+    COLUMNS = """
+        INSERT INTO customer_product_price_summaries AS summaries (
+            created, modified, customer_id, product_id, po_count, prices,
+            last_price, last_ordered_at
+        )
+    """
+
+    REBUILD = f"""
+        {COLUMNS}
+        {AGGREGATE}
+        GROUP BY customer_id, product_id
+    """
+
+    REFRESH = f"""
+        {COLUMNS}
+        {AGGREGATE}
+        WHERE (customer_id, product_id) IN (
+            SELECT * FROM unnest(%(customer_ids)s::bigint[], %(product_ids)s::bigint[])
+        )
+        GROUP BY customer_id, product_id
+        ON CONFLICT (customer_id, product_id) DO UPDATE SET
+            modified = EXCLUDED.modified,
+            po_count = EXCLUDED.po_count,
+            prices = EXCLUDED.prices,
+            last_price = EXCLUDED.last_price,
+            last_ordered_at = EXCLUDED.last_ordered_at
+    """
+
+    DELETE_EMPTY = """
+        DELETE FROM customer_product_price_summaries summaries
+        WHERE (customer_id, product_id) IN (
+            SELECT * FROM unnest(%(customer_ids)s::bigint[], %(product_ids)s::bigint[])
+        )
+        AND NOT EXISTS (
+            SELECT FROM purchase_orders
+            WHERE customer_id = summaries.customer_id
+            AND product_id = summaries.product_id
+        )
+    """
+
+    ADD = f"""
+        {COLUMNS}
+        VALUES (
+            now(), now(), %(customer_id)s, %(product_id)s, 1,
+            ARRAY[%(price)s]::numeric[], %(price)s, %(ordered_at)s
+        )
+        ON CONFLICT (customer_id, product_id) DO UPDATE SET
+            modified = EXCLUDED.modified,
+            po_count = summaries.po_count + 1,
+            prices = (
+                SELECT array_agg(DISTINCT price ORDER BY price)
+                FROM unnest(summaries.prices || EXCLUDED.prices) price
+            ),
+            last_price = CASE
+                WHEN EXCLUDED.last_ordered_at >= summaries.last_ordered_at
+                THEN EXCLUDED.last_price
+                ELSE summaries.last_price
+            END,
+            last_ordered_at = greatest(
+                summaries.last_ordered_at, EXCLUDED.last_ordered_at
+            )
+    """
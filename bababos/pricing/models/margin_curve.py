@@ -0,0 +1,62 @@
+from django.contrib.postgres.fields import ArrayField
+from django.core.exceptions import ValidationError
+from django.db import models
+
+from bababos.utilities.utils import Model
+
+
+class MarginCurve(Model):
+    """
+    Profit margin by RFQ quantity, as margins at ascending quantity
+    breakpoints. A curve without customer and product is the default one,
+    see ``MarginPolicy`` for how the curve of an RFQ is picked.
+    """
+
+    LINEAR = "linear"
+    STEP = "step"
+    INTERPOLATIONS = [
+        (LINEAR, "Linear between breakpoints"),
+        (STEP, "Margin of the last breakpoint reached"),
+    ]
+
+    customer = models.ForeignKey(
+        to="pricing.Customer",
+        on_delete=models.CASCADE,
+        related_name="margin_curves",
+        null=True,
+        blank=True,
+        db_index=False,  # Covered by margin_curves_uniq
+    )
+    product = models.ForeignKey(
+        to="pricing.Product",
+        on_delete=models.CASCADE,
+        related_name="margin_curves",
+        null=True,
+        blank=True,
+    )
+    interpolation = models.CharField(
+        max_length=10, choices=INTERPOLATIONS, default=LINEAR
+    )
+    quantities = ArrayField(
+        models.PositiveIntegerField(), db_comment="Breakpoints, ascending"
+    )
+    margins = ArrayField(
+        models.DecimalField(max_digits=8, decimal_places=5),
+        db_comment="Profit margin at every breakpoint",
+    )
+
+    class Meta:
+        db_table = "margin_curves"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["customer", "product"],
+                name="margin_curves_uniq",
+                nulls_distinct=False,
+            ),
+        ]
+
+    def clean(self):
+        if not self.quantities or len(self.quantities) != len(self.margins):
+            raise ValidationError("Every quantity breakpoint needs one margin.")
+        if any(a >= b for a, b in zip(self.quantities, self.quantities[1:])):
+            raise ValidationError("Quantity breakpoints must be ascending.")
@@ -0,0 +1,40 @@
+from django.db import models
+from django.utils import timezone
+
+from bababos.utilities.utils import Model
+
+
+class PricingRun(Model):
+
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    incremental = models.BooleanField(default=False)
+    rfq_count = models.PositiveIntegerField(default=0)
+    inserted = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "pricing_runs"
+
+    @classmethod
+    def get_watermark(cls):
+        """
+        Start of the last finished run, everything modified since then has
+        not been priced yet.
+        """
+        last_run = (
+            cls.objects.filter(finished_at__isnull=False)
+            .order_by("-started_at")
+            .first()
+        )
+        return last_run.started_at if last_run else None
+
+    def finish(self, rfq_count, inserted=0, skipped=0, updated=0):
+        self.finished_at = timezone.now()
+        self.rfq_count = rfq_count
+        self.inserted = inserted
+        self.skipped = skipped
+        self.updated = updated
+        self.save()
+        return self
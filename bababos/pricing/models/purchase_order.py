@@ -11,7 +11,10 @@ fake = Faker()
 class PO(Model):
 
     customer = models.ForeignKey(
-        to="pricing.Customer", on_delete=models.CASCADE, related_name="POs"
+        to="pricing.Customer",
+        on_delete=models.CASCADE,
+        related_name="POs",
+        db_index=False,  # Covered by purchase_orders_history_idx
     )
     product = models.ForeignKey(to="pricing.Product", on_delete=models.CASCADE)
     ordered_at = models.DateTimeField()
@@ -23,6 +26,14 @@ class PO(Model):
 
     class Meta:
         db_table = "purchase_orders"
+        indexes = [
+            # PO histories of a customer and product, price read from the index
+            models.Index(
+                fields=["customer", "product", "ordered_at"],
+                include=["price"],
+                name="purchase_orders_history_idx",
+            ),
+        ]
 
     @property
     def total(self):
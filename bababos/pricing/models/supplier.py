@@ -22,6 +22,6 @@ class SupplierFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = Supplier
 
-    code = factory.Faker("last_name")
+    code = factory.Sequence(lambda n: f"S-{n}")
     user = factory.SubFactory(UserFactory)
     region = factory.SubFactory("bababos.pricing.models.RegionFactory")
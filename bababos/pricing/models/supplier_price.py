@@ -1,5 +1,5 @@
 import factory
-from django.db import models
+from django.db import connection, models, transaction
 
 from bababos.utilities.utils import Model
 
@@ -20,6 +20,64 @@ class SupplierPrice(Model):
 
     class Meta:
         db_table = "supplier_prices"
+        constraints = [
+            # Current prices only, older versions are kept as history
+            models.UniqueConstraint(
+                fields=["product", "supplier"],
+                condition=models.Q(latest=True),
+                name="supplier_prices_latest_uniq",
+            ),
+        ]
+        indexes = [
+            # Candidate suppliers of a product from the cheapest, index only
+            models.Index(
+                fields=["product", "price"],
+                include=["available_stock", "supplier", "id"],
+                condition=models.Q(latest=True),
+                name="supplier_prices_latest_idx",
+            ),
+        ]
+
+    @classmethod
+    def reserve_stocks(cls, quantities):
+        """
+        Take ``quantities`` (by supplier price ID) out of the available stock
+        in one statement, returns the number of supplier prices updated.
+        ``modified`` is left alone, so incremental runs do not price their
+        products again. Raises ``ValueError``, and reserves nothing, when a
+        supplier price has less stock left than its quantity.
+        """
+        quantities = {
+            supplier_price_id: quantity
+            for supplier_price_id, quantity in quantities.items()
+            if quantity
+        }
+        if not quantities:
+            return 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                cls.RESERVE,
+                {
+                    "ids": list(quantities),
+                    "quantities": list(quantities.values()),
+                },
+            )
+            oversold = set(quantities).difference(row[0] for row in cursor.fetchall())
+            if oversold:
+                raise ValueError(
+                    f"Not enough stock left to reserve in supplier prices {sorted(oversold)}"
+                )
+            return len(quantities)
+
+    RESERVE = """
+        UPDATE supplier_prices
+        SET available_stock = available_stock - reserved.quantity
+        FROM unnest(%(ids)s::bigint[], %(quantities)s::integer[])
+            AS reserved (id, quantity)
+        WHERE supplier_prices.id = reserved.id
+            AND supplier_prices.available_stock >= reserved.quantity
+        RETURNING supplier_prices.id
+    """
 
 
 class SupplierPriceFactory(factory.django.DjangoModelFactory):
@@ -9,7 +9,10 @@ class Transaction(Model):
         unique_together = ("rfq", "supplier_price")
 
     rfq = models.ForeignKey(
-        to="pricing.RFQ", on_delete=models.CASCADE, related_name="transactions"
+        to="pricing.RFQ",
+        on_delete=models.CASCADE,
+        related_name="transactions",
+        db_index=False,  # Covered by the (rfq, supplier_price) unique index
     )
     status = models.CharField(default="pending", max_length=100)
     supplier_price = models.ForeignKey(
@@ -19,7 +22,18 @@ class Transaction(Model):
     final_price = models.DecimalField(max_digits=21, decimal_places=5)
     analyzed_profit_margin = models.DecimalField(max_digits=8, decimal_places=5)
     quantity = models.PositiveIntegerField()
-    note = models.TextField(null=True, blank=True)
+    freight = models.DecimalField(
+        max_digits=21,
+        decimal_places=5,
+        default=0,
+        db_comment="Freight per unit from the supplier, set when allocated on landed cost",
+    )
+    rule = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        db_comment="ID of the pricing rule that decided the price",
+    )
 
     @property
     def profit(self):
@@ -0,0 +1,47 @@
+from rest_framework import serializers
+
+from bababos.pricing.services import pricing_cache
+
+
+class QuoteRequestSerializer(serializers.Serializer):
+    customer = serializers.CharField(help_text="Customer code")
+    sku = serializers.CharField(source="product", help_text="Product SKU")
+    quantity = serializers.IntegerField(min_value=1)
+
+    def validate_customer(self, code):
+        customer = pricing_cache.get_customer(code)
+        if customer is None:
+            raise serializers.ValidationError("Unknown customer.")
+        return customer
+
+    def validate_sku(self, sku):
+        product = pricing_cache.get_product(sku)
+        if product is None:
+            raise serializers.ValidationError("Unknown SKU.")
+        return product
+
+
+class QuoteSupplierSerializer(serializers.Serializer):
+    supplier_price = serializers.IntegerField(source="supplier_price_id")
+    supplier = serializers.SerializerMethodField()
+    price = serializers.DecimalField(max_digits=21, decimal_places=5)
+    quantity = serializers.IntegerField(source="purchased_stock")
+
+    def get_supplier(self, candidate):
+        return pricing_cache.get_supplier_code(candidate.supplier_id)
+
+
+class QuoteSerializer(serializers.Serializer):
+    """
+    The decision of an ``RFQAnalyzer``.
+    """
+
+    customer = serializers.CharField(source="customer.code")
+    sku = serializers.CharField(source="product.sku")
+    quantity = serializers.IntegerField()
+    chosen_price = serializers.DecimalField(max_digits=21, decimal_places=5)
+    final_price = serializers.DecimalField(max_digits=21, decimal_places=5)
+    profit_margin = serializers.DecimalField(max_digits=8, decimal_places=5)
+    rule = serializers.CharField(source="rule.rule_id")
+    note = serializers.CharField()
+    suppliers = QuoteSupplierSerializer(source="supplier_prices", many=True)
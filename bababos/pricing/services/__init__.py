@@ -1,4 +1,50 @@
+from .basket_allocation import BasketAllocator
+from .batch_pricing import BatchPricingEngine
+from .change_tracker import ChangeTracker
+from .importers import (
+    CustomerImporter,
+    PricelistImporter,
+    PurchaseOrderImporter,
+    RFQImporter,
+    SupplierImporter,
+)
 from .logistic_recommender import LogisticRecommender
+from .margin_policy import MarginPolicy
+from .parallel_recommender import ParallelSupplierRecommender
+from .pricing_cache import PricingCache, pricing_cache
+from .pricing_profiler import PricingProfiler
+from .pricing_rules import PricingRuleRegistry, pricing_rules
+from .quote_batcher import QuoteBatcher, quote_batcher
+from .rfq_report import RFQReport
+from .stock_allocation import StockAllocationIndex
+from .streaming_recommender import StreamingSupplierRecommender
 from .supplier_recommender import SupplierRecommender
+from .synthetic_dataset import SyntheticDataset
+from .transaction_writer import TransactionWriter
 
-__all__ = ["LogisticRecommender", "SupplierRecommender"]
+__all__ = [
+    "BasketAllocator",
+    "BatchPricingEngine",
+    "ChangeTracker",
+    "CustomerImporter",
+    "LogisticRecommender",
+    "MarginPolicy",
+    "ParallelSupplierRecommender",
+    "PricelistImporter",
+    "PricingCache",
+    "PricingProfiler",
+    "PricingRuleRegistry",
+    "PurchaseOrderImporter",
+    "QuoteBatcher",
+    "RFQImporter",
+    "RFQReport",
+    "StockAllocationIndex",
+    "StreamingSupplierRecommender",
+    "SupplierImporter",
+    "SupplierRecommender",
+    "SyntheticDataset",
+    "TransactionWriter",
+    "pricing_cache",
+    "pricing_rules",
+    "quote_batcher",
+]
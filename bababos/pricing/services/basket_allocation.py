@@ -0,0 +1,208 @@
+import time
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, List, NamedTuple
+
+from .stock_allocation import FREIGHT_PLACES, Allocation, StockAllocationIndex
+
+
+class BasketLine(NamedTuple):
+    rfq_id: int
+    product_id: int
+    quantity: int
+
+
+class BasketAllocator:
+    """
+    Allocate the RFQs a customer sends together as one basket, buying from
+    fewer suppliers when that costs less.
+
+    A basket costs the price of its units, the freight of everything a
+    supplier delivers in shared trips, and ``handling_cost`` per supplier
+    bought from. The RFQs are first allocated one by one as usual. Then a
+    greedy set cover runs on the same stock: the supplier with the lowest
+    cost per unit for what it can deliver of the rest of the basket is
+    picked, until the basket is filled. Its plan is kept if it costs less.
+
+    The set cover gives up once a basket took ``time_budget`` seconds, the
+    basket then keeps its RFQ by RFQ allocation.
+    """
+
+    def __init__(
+        self,
+        stock_index: StockAllocationIndex,
+        time_budget=0.05,
+        handling_cost=0,
+    ):
+        if stock_index.logistics is None:
+            raise ValueError("Basket allocation needs a stock index with logistics")
+        self.stock_index = stock_index
+        self.logistics = stock_index.logistics
+        self.time_budget = time_budget
+        self.handling_cost = Decimal(handling_cost)
+
+        self.baskets = 0
+        self.consolidated = 0
+        self.over_budget = 0
+        self.saved = Decimal(0)
+
+    def allocate(
+        self, lines: List[BasketLine], destination_id
+    ) -> Dict[int, List[Allocation]]:
+        """
+        Allocations of every RFQ of the basket, by RFQ ID.
+        """
+        deadline = time.perf_counter() + self.time_budget
+        self.baskets += 1
+        self.stock_index.load({line.product_id for line in lines})
+        stocks = {
+            line.product_id: self.stock_index.products[line.product_id]
+            for line in lines
+        }
+        before = {product_id: stock.get_state() for product_id, stock in stocks.items()}
+
+        allocations = {
+            line.rfq_id: self.stock_index.allocate(
+                line.product_id, line.quantity, destination_id
+            )
+            for line in lines
+        }
+        if len(lines) < 2:
+            return allocations
+
+        after = {product_id: stock.get_state() for product_id, stock in stocks.items()}
+        for product_id, state in before.items():
+            stocks[product_id].set_state(state)
+
+        plan = self.solve(lines, stocks, destination_id, deadline)
+        if plan is None:
+            self.over_budget += 1
+        else:
+            takes, cost = plan
+            saved = self.get_cost(lines, stocks, allocations, destination_id) - cost
+            if saved > 0:
+                self.consolidated += 1
+                self.saved += saved
+                return self.apply(lines, stocks, takes)
+
+        for product_id, state in after.items():
+            stocks[product_id].set_state(state)
+        return allocations
+
+    def solve(self, lines, stocks, destination_id, deadline):
+        """
+        Greedy set cover of the basket, ``(line, position, units, freight)``
+        takes and their cost, or ``None`` when out of time.
+        """
+        leftovers = {line.rfq_id: line.quantity for line in lines}
+        remaining = {}
+        offers = defaultdict(list)
+        for line in lines:
+            stock = stocks[line.product_id]
+            for position in range(stock.cursor, len(stock.remaining_stocks)):
+                if stock.remaining_stocks[position] > 0:
+                    remaining[line.product_id, position] = stock.remaining_stocks[
+                        position
+                    ]
+                    offers[stock.supplier_ids[position]].append((line, position))
+
+        takes = []
+        cost = Decimal(0)
+        while offers and any(leftovers.values()):
+            if time.perf_counter() > deadline:
+                return None
+
+            best = None
+            for supplier_id in sorted(offers):
+                offer = self.get_offer(
+                    offers[supplier_id], stocks, leftovers, remaining, destination_id
+                )
+                if offer is None:
+                    del offers[supplier_id]
+                elif best is None or offer[0] < best[0]:
+                    best = (*offer, supplier_id)
+            if best is None:
+                break
+
+            _, offer_cost, offer_takes, freight, supplier_id = best
+            for line, position, units in offer_takes:
+                leftovers[line.rfq_id] -= units
+                remaining[line.product_id, position] -= units
+                takes.append((line, position, units, freight))
+            cost += offer_cost
+            del offers[supplier_id]
+        return takes, cost
+
+    def get_offer(self, offers, stocks, leftovers, remaining, destination_id):
+        """
+        Cost per unit, cost, takes and freight per unit of buying what one
+        supplier can deliver of the rest of the basket.
+        """
+        taken = defaultdict(int)
+        takes = []
+        units = 0
+        goods = Decimal(0)
+        for line, position in offers:
+            key = line.product_id, position
+            take = min(leftovers[line.rfq_id], remaining[key] - taken[key])
+            if take <= 0:
+                continue
+            taken[key] += take
+            takes.append((line, position, take))
+            units += take
+            goods += stocks[line.product_id].prices[position] * take
+        if units == 0:
+            return None
+
+        line, position = offers[0]
+        freight = self.get_freight(
+            stocks[line.product_id].region_ids[position], destination_id, units
+        )
+        cost = goods + freight + self.handling_cost
+        return cost / units, cost, takes, (freight / units).quantize(FREIGHT_PLACES)
+
+    def get_cost(self, lines, stocks, allocations, destination_id):
+        """
+        Cost of the RFQ by RFQ allocations of a basket.
+        """
+        suppliers = defaultdict(int)
+        goods = Decimal(0)
+        for line in lines:
+            stock = stocks[line.product_id]
+            for allocation in allocations[line.rfq_id]:
+                position = stock.supplier_price_ids.index(allocation.supplier_price_id)
+                suppliers[
+                    stock.supplier_ids[position], stock.region_ids[position]
+                ] += allocation.purchased_stock
+                goods += allocation.price * allocation.purchased_stock
+        return (
+            goods
+            + sum(
+                self.get_freight(region_id, destination_id, units)
+                for (_, region_id), units in suppliers.items()
+            )
+            + self.handling_cost * len(suppliers)
+        )
+
+    def get_freight(self, source_id, destination_id, units) -> Decimal:
+        cost = self.logistics.get_cost(source_id, destination_id, units)
+        return Decimal(0) if cost is None else cost.total
+
+    @staticmethod
+    def apply(lines, stocks, takes) -> Dict[int, List[Allocation]]:
+        allocations = {line.rfq_id: [] for line in lines}
+        for line, position, units, freight in takes:
+            allocations[line.rfq_id].append(
+                stocks[line.product_id].take(position, units)._replace(freight=freight)
+            )
+        for stock in stocks.values():
+            stock.skip_sold_out()
+        return allocations
+
+    def get_stats(self):
+        return {
+            "baskets": self.baskets,
+            "consolidated": self.consolidated,
+            "over_budget": self.over_budget,
+            "saved": self.saved,
+        }
@@ -0,0 +1,413 @@
+import contextlib
+
+import numpy as np
+import pandas as pd
+from django.db.models import Exists, OuterRef
+
+from bababos.pricing.models import RFQ, CustomerProductPriceSummary, Transaction
+from bababos.utilities.utils import money
+
+from .basket_allocation import BasketAllocator, BasketLine
+from .margin_policy import MarginPolicy
+from .pricing_profiler import PricingProfiler
+from .pricing_rules import PricingRule, RFQFeatures, RuleTable, pricing_rules
+from .stock_allocation import Allocation, StockAllocationIndex
+from .supplier_recommender import RFQAnalyzer
+
+
+class BatchPricingEngine:
+    """
+    Price a batch of RFQs with the same decision tree as ``RFQAnalyzer``.
+
+    RFQs, PO summaries and supplier prices are loaded with one query each,
+    and the decision tree is evaluated on columns of the whole batch instead
+    of row by row. Prices are integer units (see
+    ``bababos.utilities.utils.money``) as in the scalar path, so the outcome
+    is identical, and ``Decimal`` again in ``decisions``.
+
+    When the stock index has logistics, suppliers are allocated on landed
+    cost to the customer's region, and the decision tree prices the supplier
+    price plus its freight per unit. With a ``basket_allocator``, the RFQs
+    of each customer in the batch are allocated together.
+
+    With a ``profiler``, every phase is timed for the whole batch. Profit
+    margins come from ``margin_policy``, loaded when not given, and the
+    branches of the decision tree from ``rule_table``, the compiled
+    ``pricing_rules`` when not given.
+    """
+
+    def __init__(
+        self,
+        rfqs=None,
+        stock_index: StockAllocationIndex | None = None,
+        summary_cache=None,
+        basket_allocator: BasketAllocator | None = None,
+        rfq_ids=None,
+        profiler: PricingProfiler | None = None,
+        margin_policy: MarginPolicy | None = None,
+        rule_table: RuleTable | None = None,
+    ):
+        self.rfqs = RFQ.objects.all() if rfqs is None else rfqs
+        # Order the RFQs take stock in, by ID when not given
+        self.rfq_ids = rfq_ids
+        self.stock_index = (
+            StockAllocationIndex() if stock_index is None else stock_index
+        )
+        # Keeps PO summaries between batches, see StreamingSupplierRecommender
+        self.summary_cache = summary_cache
+        self.basket_allocator = basket_allocator
+        self.profiler = profiler
+        self.margin_policy = (
+            RFQAnalyzer.load_margin_policy() if margin_policy is None else margin_policy
+        )
+        self.rule_table = pricing_rules.compile() if rule_table is None else rule_table
+
+        self.requests: pd.DataFrame | None = None
+        self.po_summaries: pd.DataFrame | None = None
+        self.allocations: pd.DataFrame | None = None
+        self.decisions: pd.DataFrame | None = None
+
+    def handle(self):
+        self.load()
+        with self.profile("candidate_suppliers"):
+            self.allocate()
+        with self.profile("profit_margin"):
+            self.set_profit_margins()
+        with self.profile("decision"):
+            self.decide()
+        return self
+
+    def profile(self, phase):
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        rfqs = (
+            len(self.requests) if self.requests is not None else len(self.rfq_ids or ())
+        )
+        return self.profiler.phase(phase, rfqs)
+
+    @property
+    def landed_cost(self):
+        return self.stock_index.logistics is not None
+
+    def load(self):
+        with self.profile("prefetch"):
+            self.load_requests()
+            self.stock_index.load(self.requests["product_id"].unique().tolist())
+        with self.profile("po_histories"):
+            self.load_po_summaries()
+        return self
+
+    def load_requests(self):
+        columns = ["rfq_id", "customer_id", "product_id", "quantity"]
+        fields = ["id", "customer_id", "product_id", "quantity"]
+        if self.landed_cost:
+            columns.append("region_id")
+            fields.append("customer__region_id")
+        self.requests = pd.DataFrame.from_records(
+            self.rfqs.order_by("id").values_list(*fields), columns=columns
+        ).astype("int64")
+        if self.rfq_ids is not None:
+            self.requests = (
+                self.requests.set_index("rfq_id").loc[self.rfq_ids].reset_index()
+            )
+        return self
+
+    def load_po_summaries(self):
+        self.po_summaries = self.build_po_summaries(self.get_po_summaries())
+        return self
+
+    @staticmethod
+    def build_po_summaries(rows) -> pd.DataFrame:
+        return pd.DataFrame.from_records(
+            [
+                (
+                    customer_id,
+                    product_id,
+                    po_count,
+                    len(prices),
+                    money.to_units(last_price),
+                    money.to_units(prices[0]),
+                    money.to_units(prices[-1]),
+                )
+                for customer_id, product_id, po_count, prices, last_price in rows
+            ],
+            columns=[
+                "customer_id",
+                "product_id",
+                "po_count",
+                "po_unique",
+                "po_price",
+                "po_min",
+                "po_max",
+            ],
+        ).astype("int64")
+
+    def get_po_summaries(self):
+        """
+        Customer ID, product ID, PO count, unique prices and last price of
+        the customer and product pairs of the batch that have PO histories.
+        """
+        if self.summary_cache is not None:
+            return self.summary_cache.get_many(
+                zip(
+                    self.requests["customer_id"].tolist(),
+                    self.requests["product_id"].tolist(),
+                )
+            )
+
+        requested = self.rfqs.filter(
+            customer_id=OuterRef("customer_id"), product_id=OuterRef("product_id")
+        )
+        return CustomerProductPriceSummary.objects.filter(
+            Exists(requested)
+        ).values_list("customer_id", "product_id", "po_count", "prices", "last_price")
+
+    def allocate(self):
+        """
+        Greedy allocation from the cheapest supplier, the same as
+        ``RFQAnalyzer.get_candidate_suppliers``, or from the lowest landed
+        cost. RFQs take stock out of the shared index in ID order, or in
+        the order of ``rfq_ids``. RFQs the decision tree leaves unpriced give
+        their stock back right away, see ``release_unpriced``.
+        """
+        po_features = self.get_po_features()
+        if self.basket_allocator is not None:
+            allocations = self.allocate_baskets(po_features)
+        else:
+            region_ids = (
+                self.requests["region_id"].tolist()
+                if self.landed_cost
+                else [None] * len(self.requests)
+            )
+            allocations = {}
+            for rfq_id, customer_id, product_id, quantity, region_id in zip(
+                self.requests["rfq_id"].tolist(),
+                self.requests["customer_id"].tolist(),
+                self.requests["product_id"].tolist(),
+                self.requests["quantity"].tolist(),
+                region_ids,
+            ):
+                allocations[rfq_id] = self.stock_index.allocate(
+                    product_id, quantity, region_id
+                )
+                self.release_unpriced(
+                    po_features.get((customer_id, product_id)),
+                    product_id,
+                    allocations[rfq_id],
+                )
+
+        rows = [
+            (rfq_id, *allocation)
+            for rfq_id in self.requests["rfq_id"].tolist()
+            for allocation in allocations[rfq_id]
+        ]
+        self.allocations = pd.DataFrame.from_records(
+            rows, columns=["rfq_id", *Allocation._fields]
+        ).astype(
+            {
+                "rfq_id": "int64",
+                "supplier_price_id": "int64",
+                "available_stock": "int64",
+                "purchased_stock": "int64",
+                "remaining_stock": "int64",
+            }
+        )
+        return self
+
+    def allocate_baskets(self, po_features):
+        """
+        Allocations by RFQ ID, the baskets go in the order of their first RFQ.
+        """
+        allocations = {}
+        for (customer_id, region_id), requests in self.requests.groupby(
+            ["customer_id", "region_id"], sort=False
+        ):
+            lines = [
+                BasketLine(*line)
+                for line in zip(
+                    requests["rfq_id"].tolist(),
+                    requests["product_id"].tolist(),
+                    requests["quantity"].tolist(),
+                )
+            ]
+            allocations.update(self.basket_allocator.allocate(lines, region_id))
+            for line in lines:
+                self.release_unpriced(
+                    po_features.get((customer_id, line.product_id)),
+                    line.product_id,
+                    allocations[line.rfq_id],
+                )
+        return allocations
+
+    def get_po_features(self):
+        """
+        PO fields of ``RFQFeatures`` by customer and product ID.
+        """
+        columns = ["po_count", "po_unique", "po_price", "po_min", "po_max"]
+        return dict(
+            zip(
+                zip(
+                    self.po_summaries["customer_id"].tolist(),
+                    self.po_summaries["product_id"].tolist(),
+                ),
+                zip(*(self.po_summaries[column].tolist() for column in columns)),
+            )
+        )
+
+    def release_unpriced(self, po_features, product_id, allocations):
+        """
+        Give the stock of an RFQ back to the index when its rule does not
+        price it, the RFQ keeps its allocations to be decided the same.
+        """
+        if not allocations:
+            return
+        bids = [money.to_units(allocation.price) for allocation in allocations]
+        if self.landed_cost:
+            bids = [
+                bid + money.to_units(allocation.freight)
+                for bid, allocation in zip(bids, allocations)
+            ]
+        rule = self.rule_table.match(
+            RFQFeatures.from_bids(po_features or (0,) * 5, bids)
+        )
+        if rule is None or rule.pricing is None:
+            self.stock_index.release(product_id, allocations)
+
+    def decide(self):
+        """
+        Match every RFQ with its pricing rule on the whole batch, then price
+        the RFQs of each rule together.
+        """
+        frame = self._get_features()
+        features = RFQFeatures(
+            *(frame[field].to_numpy() for field in RFQFeatures._fields)
+        )
+        numbers = self.rule_table.match_many(features)
+
+        n = len(frame)
+        self.priced = np.zeros(n, dtype=bool)
+        self.chosen_price = np.zeros(n, dtype="int64")
+        # Products of prices and margins do not fit int64
+        self.final_price = np.zeros(n, dtype=object)
+        self.profit_margin = frame["margin_units"].to_numpy(dtype=object).copy()
+
+        for number, rule in enumerate(self.rule_table.rules):
+            if rule.pricing is None:
+                continue
+            idx = np.flatnonzero(numbers == number)
+            if not len(idx):
+                continue
+            price = getattr(features, rule.price)[idx]
+            if rule.pricing == PricingRule.COMMON:
+                self._set_common_pricing(idx, price)
+            else:
+                self._set_margin_pricing(
+                    idx, getattr(features, rule.base)[idx], price, rule.clamp_max
+                )
+
+        self.decisions = pd.DataFrame(
+            {
+                "chosen_price": money.from_units_array(
+                    self.chosen_price, mask=self.priced
+                ),
+                "final_price": money.from_units_array(
+                    self.final_price, mask=self.priced
+                ),
+                "analyzed_profit_margin": money.from_units_array(
+                    self.profit_margin, money.RATIO_PLACES
+                ),
+                "rule": self.rule_table.get_rule_ids(numbers),
+            },
+            index=frame.index,
+            dtype=object,
+        )
+        return self
+
+    def _set_common_pricing(self, idx, price):
+        self.priced[idx] = True
+        self.chosen_price[idx] = price
+        self.final_price[idx] = money.add_margin(
+            price.astype(object), self.profit_margin[idx]
+        )
+
+    def _set_margin_pricing(self, idx, base, price, clamp_max):
+        """
+        ``RFQAnalyzer._set_margin_pricing`` of the rows ``idx``.
+        """
+        base, price = base.astype(object), price.astype(object)
+        # The margin of price over base, compared exactly with the bounds
+        difference = (price - base) * money.RATIO_SCALE
+        below = difference < RFQAnalyzer.MIN_PROFIT_UNITS * base
+        above = (difference > RFQAnalyzer.MAX_PROFIT_UNITS * base) & clamp_max
+        clamped = below | above
+
+        margin = money.get_ratio(price - base, base)
+        margin[below] = RFQAnalyzer.MIN_PROFIT_UNITS
+        margin[above] = RFQAnalyzer.MAX_PROFIT_UNITS
+        chosen = price.copy()
+        chosen[clamped] = (base if clamp_max else price)[clamped]
+        final = chosen.copy()
+        final[clamped] = money.add_margin(chosen[clamped], margin[clamped])
+
+        self.priced[idx] = True
+        self.chosen_price[idx] = chosen
+        self.final_price[idx] = final
+        self.profit_margin[idx] = margin
+
+    def get_transactions(self):
+        """
+        Unsaved ``Transaction`` per allocated supplier of every priced RFQ.
+        Branches the decision tree does not price yet are left out.
+        """
+        priced = self.decisions[self.decisions["chosen_price"].notna()]
+        rows = self.allocations.merge(priced, left_on="rfq_id", right_index=True)
+        return [
+            Transaction(
+                rfq_id=row.rfq_id,
+                supplier_price_id=row.supplier_price_id,
+                chosen_price=row.chosen_price,
+                final_price=row.final_price,
+                analyzed_profit_margin=row.analyzed_profit_margin,
+                quantity=int(row.purchased_stock),
+                freight=row.freight,
+                rule=row.rule,
+            )
+            for row in rows.itertuples(index=False)
+        ]
+
+    def set_profit_margins(self):
+        self.requests["margin_units"] = self.margin_policy.get_margins(
+            self.requests["quantity"].to_numpy(),
+            customer_ids=self.requests["customer_id"].to_numpy(),
+            product_ids=self.requests["product_id"].to_numpy(),
+            units=True,
+        )
+        return self
+
+    def _get_features(self):
+        """
+        PO summary and candidate suppliers of every RFQ, prices in units.
+        Reindexing keeps them int64, RFQs without any get 0.
+        """
+        frame = self.requests.set_index("rfq_id")
+        summaries = self.po_summaries.set_index(["customer_id", "product_id"]).reindex(
+            pd.MultiIndex.from_arrays([frame["customer_id"], frame["product_id"]]),
+            fill_value=0,
+        )
+        summaries.index = frame.index
+
+        prices = money.to_units_array(self.allocations["price"])
+        if self.landed_cost:
+            prices = prices + money.to_units_array(self.allocations["freight"])
+        suppliers = (
+            pd.Series(prices, index=self.allocations.index)
+            .groupby(self.allocations["rfq_id"])
+            .agg(
+                supplier_count="size",
+                supplier_unique="nunique",
+                supplier_min="min",
+                supplier_max="max",
+            )
+            .reindex(frame.index, fill_value=0)
+        )
+        return pd.concat([frame, summaries, suppliers], axis=1)
@@ -0,0 +1,54 @@
+from django.db.models import Exists, OuterRef, Q
+
+from bababos.pricing.models import PO, RFQ, MarginCurve, SupplierPrice, Transaction
+
+
+class ChangeTracker:
+    """
+    Find the RFQs whose pricing inputs were modified since ``since``.
+
+    An RFQ is affected when its own quantity changed, when a supplier price
+    of its product changed, when its customer's PO history for the product
+    changed, or when a margin curve that may apply to it changed: the one of
+    its customer and product, of its customer, of its product or the default
+    one. Stock is allocated per product in RFQ order, so every RFQ of an
+    affected product is priced again, not only the changed ones.
+    """
+
+    def __init__(self, since):
+        self.since = since
+
+    def get_product_ids(self):
+        changed_purchase_orders = PO.objects.filter(
+            customer_id=OuterRef("customer_id"),
+            product_id=OuterRef("product_id"),
+            modified__gte=self.since,
+        )
+        changed_margin_curves = MarginCurve.objects.filter(
+            Q(customer_id=OuterRef("customer_id")) | Q(customer=None),
+            Q(product_id=OuterRef("product_id")) | Q(product=None),
+            modified__gte=self.since,
+        )
+        changed_rfqs = RFQ.objects.filter(
+            Q(modified__gte=self.since)
+            | Exists(changed_purchase_orders)
+            | Exists(changed_margin_curves)
+        ).values("product_id")
+        changed_supplier_prices = SupplierPrice.objects.filter(
+            modified__gte=self.since
+        ).values("product_id")
+
+        return set(changed_rfqs.values_list("product_id", flat=True)).union(
+            changed_supplier_prices.values_list("product_id", flat=True)
+        )
+
+    def get_rfqs(self):
+        return RFQ.objects.filter(product_id__in=self.get_product_ids())
+
+    @staticmethod
+    def discard_pending_transactions(rfqs):
+        """
+        Pending transactions of RFQs priced again are replaced by the new
+        decision, transactions already acted on are kept.
+        """
+        return Transaction.objects.filter(rfq__in=rfqs, status="pending").delete()
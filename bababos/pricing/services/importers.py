@@ -0,0 +1,337 @@
+import csv
+import time
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from bababos.pricing.models import (
+    PO,
+    RFQ,
+    Customer,
+    CustomerProductPriceSummary,
+    Product,
+    Region,
+    Supplier,
+    SupplierPrice,
+)
+from bababos.utilities.utils import copy_objects
+
+
+class CsvImporter:
+    """
+    Stream a CSV file into the database chunk by chunk.
+
+    Foreign keys are resolved from dictionaries loaded once per import, and
+    every chunk is written with one ``COPY`` on PostgreSQL (``bulk_create``
+    elsewhere), instead of a few queries per row.
+    """
+
+    name = None
+    path = None
+    model = None
+    chunk_size = 5000
+
+    def __init__(self, path=None, chunk_size=None, stdout=None):
+        self.path = path or self.path
+        self.chunk_size = chunk_size or self.chunk_size
+        self.stdout = stdout
+
+        self.products = {}
+        self.unnamed_products = set()
+
+        self.read = 0
+        self.written = 0
+        self.skipped = 0
+        self.started_at = None
+
+    def handle(self):
+        self.started_at = time.perf_counter()
+        self.load()
+
+        with open(self.path, newline="") as csv_file:
+            reader = csv.reader(csv_file)
+            next(reader, None)
+            while chunk := list(islice(reader, self.chunk_size)):
+                written = self.write(self.build(chunk))
+                self.read += len(chunk)
+                self.written += written
+                self.skipped += len(chunk) - written
+                self.report()
+        return self
+
+    def load(self):
+        """
+        Load the lookups the rows are resolved against.
+        """
+
+    def build(self, rows):
+        raise NotImplementedError
+
+    def write(self, objects):
+        """
+        Insert ``objects``, return the number of rows written.
+        """
+        if connection.vendor == "postgresql":
+            copy_objects(self.model, objects)
+        else:
+            self.model.objects.bulk_create(objects, batch_size=self.chunk_size)
+        return len(objects)
+
+    def report(self):
+        if self.stdout is None:
+            return
+        seconds = time.perf_counter() - self.started_at
+        self.stdout.write(
+            f"{self.name}: {self.get_counts()} in {seconds:.1f}s "
+            f"({self.read / max(seconds, 1e-9):.0f} rows/s)"
+        )
+
+    def get_counts(self):
+        return f"{self.read} rows, {self.written} written, {self.skipped} skipped"
+
+    def load_products(self):
+        for product_id, sku, name in Product.objects.values_list("id", "sku", "name"):
+            self.products[sku] = product_id
+            if name is None:
+                self.unnamed_products.add(product_id)
+
+    def resolve_products(self, names):
+        """
+        IDs of the SKUs in ``names``, products not known yet are created.
+        Products without a name take the one given in ``names``.
+        """
+        missing = [sku for sku in names if sku not in self.products]
+        if missing:
+            Product.objects.bulk_create(
+                [Product(sku=sku, name=names[sku]) for sku in missing],
+                ignore_conflicts=True,
+            )
+            self.products.update(
+                Product.objects.filter(sku__in=missing).values_list("sku", "id")
+            )
+
+        renamed = [
+            Product(id=self.products[sku], name=name)
+            for sku, name in names.items()
+            if name and self.products[sku] in self.unnamed_products
+        ]
+        if renamed:
+            Product.objects.bulk_update(renamed, ["name"])
+            self.unnamed_products.difference_update(product.id for product in renamed)
+
+        return {sku: self.products[sku] for sku in names}
+
+
+class PartyImporter(CsvImporter):
+    """
+    Customers and suppliers, each with its own user. Rows whose user
+    already exists are skipped.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.regions = {}
+
+    def load(self):
+        self.regions = dict(Region.objects.values_list("name", "id"))
+
+    def build(self, rows):
+        rows = {row[0].lower(): row for row in rows if row[2] in self.regions}
+        existing = set(
+            User.objects.filter(username__in=rows).values_list("username", flat=True)
+        )
+        rows = {
+            username: row for username, row in rows.items() if username not in existing
+        }
+
+        User.objects.bulk_create([User(username=username) for username in rows])
+        users = dict(
+            User.objects.filter(username__in=rows).values_list("username", "id")
+        )
+        return [
+            self.model(
+                user_id=users[username],
+                code=row[0],
+                address=row[1],
+                region_id=self.regions[row[2]],
+            )
+            for username, row in rows.items()
+        ]
+
+
+class CustomerImporter(PartyImporter):
+    name = "customers"
+    path = "resources/customer.csv"
+    model = Customer
+
+
+class SupplierImporter(PartyImporter):
+    name = "suppliers"
+    path = "resources/supplier.csv"
+    model = Supplier
+
+
+class RFQImporter(CsvImporter):
+    name = "request for quotations"
+    path = "resources/rfq-customer.csv"
+    model = RFQ
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.customers = {}
+
+    def load(self):
+        self.load_products()
+        self.customers = dict(Customer.objects.values_list("code", "id"))
+
+    def build(self, rows):
+        rows = [row for row in rows if row[0] in self.customers]
+        products = self.resolve_products({row[1]: None for row in rows})
+        return [
+            RFQ(
+                customer_id=self.customers[row[0]],
+                product_id=products[row[1]],
+                quantity=int(row[2]),
+                unit=row[3],
+            )
+            for row in rows
+        ]
+
+
+class PricelistImporter(CsvImporter):
+    """
+    Supplier prices are upserted on ``(supplier, product)``, so the daily
+    full pricelist can be fed again. A changed price is a new version, the
+    previous one is kept as history with ``latest`` unset. A changed stock
+    updates the latest version in place, unchanged rows are skipped.
+    """
+
+    name = "pricelist"
+    path = "resources/pricelist.csv"
+    model = SupplierPrice
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.suppliers = {}
+        self.superseded = 0
+
+        field = SupplierPrice._meta.get_field("price")
+        self.price_exponent = Decimal(1).scaleb(-field.decimal_places)
+
+    def load(self):
+        self.load_products()
+        self.suppliers = dict(Supplier.objects.values_list("code", "id"))
+
+    def build(self, rows):
+        rows = [row for row in rows if row[0] in self.suppliers]
+        products = self.resolve_products({row[1]: None for row in rows})
+
+        # The last row of a supplier and product wins
+        supplier_prices = {
+            (self.suppliers[row[0]], products[row[1]]): SupplierPrice(
+                supplier_id=self.suppliers[row[0]],
+                product_id=products[row[1]],
+                price=Decimal(row[2]).quantize(
+                    self.price_exponent, rounding=ROUND_HALF_UP
+                ),
+                available_stock=int(row[3]),
+            )
+            for row in rows
+        }
+        return list(supplier_prices.values())
+
+    def write(self, objects):
+        latest = {
+            (supplier_id, product_id): (supplier_price_id, price, available_stock)
+            for supplier_price_id, supplier_id, product_id, price, available_stock in (
+                SupplierPrice.objects.filter(
+                    latest=True,
+                    supplier_id__in={obj.supplier_id for obj in objects},
+                    product_id__in={obj.product_id for obj in objects},
+                ).values_list(
+                    "id", "supplier_id", "product_id", "price", "available_stock"
+                )
+            )
+        }
+
+        now = timezone.now()
+        created, restocked, superseded = [], [], []
+        for supplier_price in objects:
+            key = (supplier_price.supplier_id, supplier_price.product_id)
+            if key not in latest:
+                created.append(supplier_price)
+                continue
+
+            supplier_price_id, price, available_stock = latest[key]
+            if price != supplier_price.price:
+                superseded.append(supplier_price_id)
+                created.append(supplier_price)
+            elif available_stock != supplier_price.available_stock:
+                restocked.append(
+                    SupplierPrice(
+                        id=supplier_price_id,
+                        available_stock=supplier_price.available_stock,
+                        modified=now,
+                    )
+                )
+
+        with transaction.atomic():
+            SupplierPrice.objects.filter(id__in=superseded).update(
+                latest=False, modified=now
+            )
+            SupplierPrice.objects.bulk_update(
+                restocked, ["available_stock", "modified"], batch_size=self.chunk_size
+            )
+            super().write(created)
+
+        self.superseded += len(superseded)
+        return len(created) + len(restocked)
+
+    def get_counts(self):
+        return f"{super().get_counts()}, {self.superseded} superseded"
+
+
+class PurchaseOrderImporter(CsvImporter):
+    name = "purchase orders"
+    path = "resources/historical-po.csv"
+    model = PO
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.customers = {}
+
+    def load(self):
+        self.load_products()
+        self.customers = dict(Customer.objects.values_list("code", "id"))
+
+    def build(self, rows):
+        rows = [row for row in rows if row[0] in self.customers]
+        names = {}
+        for row in rows:
+            names.setdefault(row[3], row[4])
+        products = self.resolve_products(names)
+        return [
+            PO(
+                customer_id=self.customers[row[0]],
+                product_id=products[row[3]],
+                quantity=int(row[5]),
+                ordered_at=timezone.make_aware(datetime.strptime(row[1], "%d/%m/%Y")),
+                unit=row[6],
+                price=row[7],
+            )
+            for row in rows
+        ]
+
+    @transaction.atomic
+    def write(self, objects):
+        # COPY sends no post_save, the summaries of the chunk are refreshed
+        written = super().write(objects)
+        CustomerProductPriceSummary.refresh(
+            (purchase_order.customer_id, purchase_order.product_id)
+            for purchase_order in objects
+        )
+        return written
@@ -1 +1,154 @@
-class LogisticRecommender: ...
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from bababos.pricing.models import Logistic, LogisticPrice, Region
+
+
+class LogisticCost(NamedTuple):
+    logistic_id: int
+    source_id: int
+    destination_id: int
+    trips: int
+    price: Decimal
+    total: Decimal
+
+
+class LogisticRecommender:
+    """
+    Region tree and logistic prices kept in memory, to cost the delivery of
+    a quantity from a supplier region to a customer region without queries.
+
+    The ancestors of every region, itself first and its root last, are
+    computed once. A route uses the prices of the most specific destination
+    ancestor that has any, and of that destination, the most specific
+    source ancestor. So a district without its own price falls back to its
+    city, then to its province.
+
+    The cheapest fleet for a quantity is the one with the lowest price for
+    all its trips, a trip carries up to the fleet's ``capacity``.
+    """
+
+    def __init__(self):
+        self.ancestors: Dict[int, Tuple[int, ...]] = {}
+        self.capacities: Dict[int, int] = {}
+        self.prices: Dict[Tuple[int, int], List[Tuple[int, Decimal]]] = {}
+        self.routes: Dict[Tuple[int, int], Optional[Tuple[int, int]]] = {}
+        # Columns of the fleet price matrices
+        self.logistic_ids = np.empty(0, dtype="int64")
+        self.capacity_array = np.empty(0, dtype="float64")
+        self.fleet_prices: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def load(self):
+        ancestors = {}
+        # Parents come before their children in tree order
+        for region_id, parent_id in Region.objects.order_by(
+            "tree_id", "lft"
+        ).values_list("id", "parent_id"):
+            ancestors[region_id] = (region_id,) + ancestors.get(parent_id, ())
+
+        prices = defaultdict(list)
+        for logistic_id, source_id, destination_id, price in (
+            LogisticPrice.objects.order_by("logistic_id")
+            .values_list("logistic_id", "source_id", "destination_id", "price")
+            .iterator()
+        ):
+            prices[source_id, destination_id].append((logistic_id, price))
+
+        self.ancestors = ancestors
+        self.capacities = dict(Logistic.objects.values_list("id", "capacity"))
+        self.prices = dict(prices)
+        self.routes = {}
+        self.logistic_ids = np.array(sorted(self.capacities), dtype="int64")
+        self.capacity_array = np.array(
+            [self.capacities[logistic_id] for logistic_id in self.logistic_ids],
+            dtype="float64",
+        )
+        self.fleet_prices = {}
+        return self
+
+    def get_route(self, source_id, destination_id) -> Optional[Tuple[int, int]]:
+        """
+        The (source, destination) regions whose prices apply between two
+        regions, or ``None`` when no ancestor pair has a price.
+        """
+        key = source_id, destination_id
+        if key not in self.routes:
+            self.routes[key] = next(
+                (
+                    (source, destination)
+                    for destination in self.ancestors.get(destination_id, ())
+                    for source in self.ancestors.get(source_id, ())
+                    if (source, destination) in self.prices
+                ),
+                None,
+            )
+        return self.routes[key]
+
+    def get_cost(self, source_id, destination_id, quantity) -> Optional[LogisticCost]:
+        """
+        The cheapest fleet to carry ``quantity`` between two regions, fewer
+        trips win a tie.
+        """
+        route = self.get_route(source_id, destination_id)
+        if route is None:
+            return None
+
+        cheapest = None
+        for logistic_id, price in self.prices[route]:
+            capacity = self.capacities[logistic_id]
+            trips = max(1, -(-quantity // capacity))
+            total = price * trips
+            if cheapest is None or (total, trips) < (cheapest.total, cheapest.trips):
+                cheapest = LogisticCost(logistic_id, *route, trips, price, total)
+        return cheapest
+
+    def get_fleet_prices(self, source_ids, destination_id) -> np.ndarray:
+        """
+        Price of every fleet, one column per ``logistic_ids``, from each of
+        ``source_ids`` to a destination. ``inf`` where a fleet has no price.
+        """
+        rows = []
+        for source_id in source_ids:
+            key = source_id, destination_id
+            if key not in self.fleet_prices:
+                row = np.full(len(self.logistic_ids), np.inf)
+                route = self.get_route(source_id, destination_id)
+                for logistic_id, price in self.prices.get(route, ()):
+                    row[np.searchsorted(self.logistic_ids, logistic_id)] = price
+                self.fleet_prices[key] = row
+            rows.append(self.fleet_prices[key])
+        return np.array(rows).reshape(len(rows), len(self.logistic_ids))
+
+    def get_freights(self, fleet_prices, quantities) -> np.ndarray:
+        """
+        Price of the cheapest fleet for each of ``quantities``, over the
+        rows of ``get_fleet_prices``. Rows without any price cost 0.
+        """
+        trips = np.maximum(
+            1, np.ceil(np.asarray(quantities)[:, None] / self.capacity_array)
+        )
+        totals = (trips * fleet_prices).min(axis=1, initial=np.inf)
+        totals[np.isinf(totals)] = 0
+        return totals
+
+    def get_distance(self, source_id, destination_id) -> Optional[int]:
+        """
+        Number of edges between two regions in the tree, ``None`` when they
+        are in different provinces.
+        """
+        source = self.ancestors[source_id]
+        destination = self.ancestors[destination_id]
+        if source[-1] != destination[-1]:
+            return None
+
+        common = 0
+        for source_ancestor, destination_ancestor in zip(
+            reversed(source), reversed(destination)
+        ):
+            if source_ancestor != destination_ancestor:
+                break
+            common += 1
+        return len(source) + len(destination) - 2 * common
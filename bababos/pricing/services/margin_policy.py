@@ -0,0 +1,195 @@
+import bisect
+import decimal
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bababos.pricing.models import MarginCurve
+from bababos.utilities.utils import money
+
+
+class CompiledMarginCurve:
+    """
+    A ``MarginCurve`` as sorted breakpoints and its margins in ratio units
+    (``10 ** -money.RATIO_PLACES``). A margin is found with a binary search and
+    linear curves interpolate in integers, exactly, rounded half to even.
+    Below the first and above the last breakpoint the margin is the one of
+    the nearest breakpoint.
+    """
+
+    def __init__(self, quantities, margins, interpolation=MarginCurve.LINEAR, key=None):
+        if not quantities or len(quantities) != len(margins):
+            raise ValueError("Every quantity breakpoint needs one margin")
+        if any(a >= b for a, b in zip(quantities, quantities[1:])):
+            raise ValueError("Quantity breakpoints must be ascending")
+        if interpolation not in (MarginCurve.LINEAR, MarginCurve.STEP):
+            raise ValueError(f"Unknown interpolation {interpolation!r}")
+
+        # (customer ID, product ID) the curve is stored for
+        self.key = key
+        self.quantities: List[int] = [int(quantity) for quantity in quantities]
+        self.units = [money.to_ratio_units(margin) for margin in margins]
+        self.interpolation = interpolation
+        self.breakpoints = np.array(self.quantities, dtype="int64")
+        self.memo: Dict[int, int] = {}
+
+    @classmethod
+    def compile(cls, curve: MarginCurve):
+        return cls(
+            curve.quantities,
+            curve.margins,
+            interpolation=curve.interpolation,
+            key=(curve.customer_id, curve.product_id),
+        )
+
+    def get_margin(self, quantity) -> decimal.Decimal:
+        return money.from_ratio_units(self.get_units(quantity))
+
+    def get_units(self, quantity) -> int:
+        quantity = int(quantity)
+        units = self.memo.get(quantity)
+        if units is None:
+            units = self.memo[quantity] = self.interpolate(
+                quantity, bisect.bisect_right(self.quantities, quantity)
+            )
+        return units
+
+    def get_units_array(self, quantities: np.ndarray) -> np.ndarray:
+        """
+        Ratio units of distinct quantities, searched for together.
+        """
+        positions = np.searchsorted(self.breakpoints, quantities, side="right")
+        units = np.empty(len(quantities), dtype=object)
+        for i, (quantity, position) in enumerate(
+            zip(quantities.tolist(), positions.tolist())
+        ):
+            unit = self.memo.get(quantity)
+            if unit is None:
+                unit = self.memo[quantity] = self.interpolate(quantity, position)
+            units[i] = unit
+        return units
+
+    def interpolate(self, quantity, position) -> int:
+        """
+        Ratio units of ``quantity``, which is at or after ``position``
+        breakpoints.
+        """
+        if position == 0:
+            return self.units[0]
+        if position == len(self.quantities) or self.interpolation == MarginCurve.STEP:
+            return self.units[position - 1]
+
+        start, end = self.quantities[position - 1], self.quantities[position]
+        lower, upper = self.units[position - 1], self.units[position]
+        width = end - start
+        return money.divide(
+            lower * width + (quantity - start) * (upper - lower),
+            width,
+            rounding=decimal.ROUND_HALF_EVEN,
+        )
+
+
+class MarginPolicy:
+    """
+    Profit margin of an RFQ from the most specific margin curve: the one of
+    its customer and product, of its customer, of its product, then the
+    default curve stored without both, then ``default``.
+    """
+
+    def __init__(self, curves: Iterable[MarginCurve] = (), default=None):
+        self.curves: Dict[Tuple, CompiledMarginCurve] = {
+            (curve.customer_id, curve.product_id): CompiledMarginCurve.compile(curve)
+            for curve in curves
+        }
+        if (None, None) not in self.curves:
+            if default is None:
+                raise ValueError("A default margin curve is needed")
+            self.curves[(None, None)] = CompiledMarginCurve(
+                default.quantities,
+                default.margins,
+                interpolation=default.interpolation,
+                key=(None, None),
+            )
+        self.default = self.curves[(None, None)]
+        self.scoped = len(self.curves) > 1
+
+        self.pair_curves = {}
+        self.customer_curves = {}
+        self.product_curves = {}
+        for (customer_id, product_id), curve in self.curves.items():
+            if customer_id is not None and product_id is not None:
+                self.pair_curves[(customer_id, product_id)] = curve
+            elif customer_id is not None:
+                self.customer_curves[customer_id] = curve
+            elif product_id is not None:
+                self.product_curves[product_id] = curve
+
+    @classmethod
+    def load(cls, default=None):
+        return cls(MarginCurve.objects.all(), default=default)
+
+    def get_curve(self, customer_id=None, product_id=None) -> CompiledMarginCurve:
+        if not self.scoped:
+            return self.default
+        for key in (
+            (customer_id, product_id),
+            (customer_id, None),
+            (None, product_id),
+        ):
+            curve = self.curves.get(key)
+            if curve is not None:
+                return curve
+        return self.default
+
+    def get_margin(self, quantity, customer_id=None, product_id=None):
+        return self.get_curve(customer_id, product_id).get_margin(quantity)
+
+    def get_margin_units(self, quantity, customer_id=None, product_id=None) -> int:
+        return self.get_curve(customer_id, product_id).get_units(quantity)
+
+    def get_margins(self, quantities, customer_ids=None, product_ids=None, units=False):
+        """
+        Margins of a vector of quantities, with the customer and product of
+        each one, as an array of ``Decimal``, or of ratio units with
+        ``units``. Every distinct quantity of a curve is interpolated once.
+        """
+        quantities = np.asarray(quantities, dtype="int64")
+        margins = np.empty(len(quantities), dtype=object)
+        for curve, rows in self.group_by_curve(quantities, customer_ids, product_ids):
+            codes, distinct = pd.factorize(quantities[rows])
+            margins[rows] = curve.get_units_array(distinct)[codes]
+        if units:
+            return margins
+        return money.from_units_array(margins, money.RATIO_PLACES)
+
+    def group_by_curve(self, quantities, customer_ids, product_ids):
+        if not self.scoped:
+            yield self.default, slice(None)
+            return
+
+        # IDs start at 1, 0 is an RFQ without customer or product
+        missing = np.zeros(len(quantities), dtype="int64")
+        customer_ids = missing if customer_ids is None else np.asarray(customer_ids)
+        product_ids = missing if product_ids is None else np.asarray(product_ids)
+
+        curves = [self.default]
+        row_curves = np.zeros(len(quantities), dtype="int64")
+        # Less specific curves first, the more specific ones replace them
+        for scoped, index, keys in (
+            (self.product_curves, pd.Index, product_ids),
+            (self.customer_curves, pd.Index, customer_ids),
+            (
+                self.pair_curves,
+                pd.MultiIndex.from_tuples,
+                pd.MultiIndex.from_arrays([customer_ids, product_ids]),
+            ),
+        ):
+            if not scoped:
+                continue
+            found = index(list(scoped)).get_indexer(keys)
+            row_curves[found >= 0] = found[found >= 0] + len(curves)
+            curves.extend(scoped.values())
+
+        for number, rows in pd.Series(row_curves).groupby(row_curves).indices.items():
+            yield curves[number], rows
@@ -0,0 +1,176 @@
+import heapq
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from django.db import connections
+from django.db.models import Count
+
+from bababos.pricing.models import RFQ
+from bababos.utilities.utils import get_peak_rss_mb
+
+from .pricing_profiler import PricingProfiler
+from .supplier_recommender import SupplierRecommender
+
+
+def decide_shard(
+    shard,
+    product_ids,
+    query,
+    batch_size,
+    flush_size,
+    update_conflicts,
+    landed_cost=False,
+    priority="id",
+    reserve_stock=False,
+    profile=False,
+):
+    """
+    Price the RFQs of ``query`` (see ``QuerySet.query``) with a product of
+    ``product_ids`` in a worker process, on its own database connection.
+    """
+    connections.close_all()
+    started_at = time.perf_counter()
+
+    rfqs = RFQ.objects.all()
+    rfqs.query = query
+
+    recommender = SupplierRecommender(
+        batch_size=batch_size,
+        flush_size=flush_size,
+        update_conflicts=update_conflicts,
+        landed_cost=landed_cost,
+        priority=priority,
+        reserve_stock=reserve_stock,
+        profile=profile,
+    ).handle(rfqs.filter(product_id__in=product_ids))
+
+    connections.close_all()
+    return {
+        "worker": shard,
+        "products": len(product_ids),
+        "rfqs": recommender.rfq_count,
+        "seconds": time.perf_counter() - started_at,
+        "queries": recommender.queries,
+        "peak_rss_mb": recommender.peak_rss_mb,
+        "reserved": recommender.reserved,
+        "profiler": recommender.profiler,
+        **recommender.get_stats(),
+    }
+
+
+class ParallelSupplierRecommender:
+    """
+    Run ``SupplierRecommender`` in a pool of worker processes.
+
+    RFQs are split into shards by product, so the stock of a product is only
+    ever allocated by one worker, in the same RFQ order as the serial run.
+    """
+
+    def __init__(
+        self,
+        workers,
+        batch_size=1000,
+        flush_size=1000,
+        update_conflicts=False,
+        landed_cost=False,
+        priority="id",
+        reserve_stock=False,
+        profile=False,
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.flush_size = flush_size
+        self.update_conflicts = update_conflicts
+        self.landed_cost = landed_cost
+        self.priority = priority
+        self.reserve_stock = reserve_stock
+        self.profile = profile
+
+        self.results: List[Dict] = []
+
+    def handle(self, rfqs=None):
+        rfqs = RFQ.objects.all() if rfqs is None else rfqs
+        if self.reserve_stock:
+            rfqs = SupplierRecommender.exclude_decided(rfqs)
+        shards = [shard for shard in self.get_shards(rfqs) if shard]
+
+        # Workers are forked, they must not share the parent's connection
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=len(shards) or 1,
+            mp_context=multiprocessing.get_context("fork"),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    decide_shard,
+                    shard,
+                    product_ids,
+                    # Pickling the queryset would evaluate it, its query keeps
+                    # the filters
+                    rfqs.query,
+                    self.batch_size,
+                    self.flush_size,
+                    self.update_conflicts,
+                    self.landed_cost,
+                    self.priority,
+                    self.reserve_stock,
+                    self.profile,
+                )
+                for shard, product_ids in enumerate(shards, start=1)
+            ]
+            self.results = [future.result() for future in futures]
+        return self
+
+    def get_shards(self, rfqs) -> List[List[int]]:
+        """
+        Spread products over the workers by their number of RFQs, the
+        busiest product first to the least loaded worker.
+        """
+        counts = (
+            rfqs.values("product_id")
+            .annotate(count=Count("id"))
+            .order_by("-count", "product_id")
+        )
+        shards = [[] for _ in range(self.workers)]
+        loads = [(0, shard) for shard in range(self.workers)]
+        for row in counts:
+            load, shard = heapq.heappop(loads)
+            shards[shard].append(row["product_id"])
+            heapq.heappush(loads, (load + row["count"], shard))
+        return shards
+
+    @property
+    def rfq_count(self):
+        return sum(result["rfqs"] for result in self.results)
+
+    @property
+    def queries(self):
+        return sum(result["queries"] for result in self.results)
+
+    @property
+    def peak_rss_mb(self):
+        return max(
+            [get_peak_rss_mb(), *[result["peak_rss_mb"] for result in self.results]]
+        )
+
+    @property
+    def profiler(self) -> PricingProfiler | None:
+        if not self.profile:
+            return None
+        profiler = PricingProfiler()
+        for result in self.results:
+            profiler.merge(result["profiler"])
+        return profiler
+
+    @property
+    def reserved(self):
+        # Every worker reserves the stock of its products with its transactions
+        return sum(result["reserved"] for result in self.results)
+
+    def get_stats(self):
+        return {
+            key: sum(result[key] for result in self.results)
+            for key in ["inserted", "skipped", "updated"]
+        }
@@ -0,0 +1,261 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, List
+
+from django.conf import settings
+
+from bababos.pricing.models import (
+    RFQ,
+    Customer,
+    CustomerProductPriceSummary,
+    Product,
+    Supplier,
+    SupplierPrice,
+)
+
+from .margin_policy import MarginPolicy
+from .supplier_recommender import RFQAnalyzer
+
+
+class CachedRFQAnalyzer(RFQAnalyzer):
+    """
+    ``RFQAnalyzer`` reading supplier prices and PO summaries from a
+    ``PricingCache``, or prices prefetched for a batch of quotes, instead of
+    the database.
+    """
+
+    def __init__(self, rfq, cache):
+        super().__init__(rfq)
+        self.cache = cache
+
+    @classmethod
+    def quote(cls, cache, customer, product, quantity):
+        """
+        Price ``quantity`` of ``product`` for ``customer`` without saving an
+        RFQ. Requests the pricing rules leave unpriced have no
+        ``chosen_price``.
+        """
+        rfq = RFQ(customer=customer, product=product, quantity=quantity)
+        return cls(rfq, cache).handle()
+
+    def get_supplier_prices(self):
+        return self.cache.get_supplier_prices(self.product.id)
+
+    def get_po_summary(self):
+        return self.cache.get_po_summary(self.customer.id, self.product.id)
+
+    def get_margin_policy(self):
+        return self.cache.get_margin_policy()
+
+
+class PricingCache:
+    """
+    Supplier prices per product, PO summaries per customer and the margin
+    curves, kept in the process to quote without querying the database.
+
+    Entries are dropped when this process saves or deletes a supplier price,
+    a PO or a margin curve (see ``bababos.pricing.signals``), and are loaded again after
+    ``max_age`` seconds, which bounds how stale they get after bulk writes
+    of other processes such as ``feed``. At most ``max_customers`` PO
+    summaries and customers, and ``max_products`` products are kept, the
+    least recently quoted are dropped first.
+    """
+
+    def __init__(self, max_age=300, max_customers=10_000, max_products=100_000):
+        self.max_age = max_age
+        self.max_customers = max_customers
+        self.max_products = max_products
+
+        # Customers by code and products by SKU, with the time they were loaded
+        self.customers: OrderedDict = OrderedDict()
+        self.products: OrderedDict = OrderedDict()
+        self.suppliers: Dict[int, str] = {}
+        self.supplier_prices: Dict[int, tuple] = {}
+        self.po_summaries: OrderedDict = OrderedDict()
+        self.margin_policy = None
+
+        # Loads started before an invalidation are not cached
+        self.version = 0
+        self.lock = threading.Lock()
+        self.warmed_at = None
+
+    def warm(self):
+        """
+        Load the latest supplier prices of every product in one query.
+        """
+        version = self.version
+        loaded_at = time.monotonic()
+        supplier_prices = defaultdict(list)
+        for supplier_price in self.query_supplier_prices():
+            supplier_prices[supplier_price.product_id].append(supplier_price)
+
+        with self.lock:
+            if version == self.version:
+                self.supplier_prices = {
+                    product_id: (loaded_at, prices)
+                    for product_id, prices in supplier_prices.items()
+                }
+                self.warmed_at = loaded_at
+        self.suppliers.update(Supplier.objects.values_list("id", "code"))
+        return self
+
+    def is_fresh(self, loaded_at):
+        return time.monotonic() - loaded_at < self.max_age
+
+    def get_customer(self, code) -> Customer | None:
+        return self.get_recent(
+            self.customers,
+            code,
+            lambda: Customer.objects.filter(code=code).first(),
+            self.max_customers,
+        )
+
+    def get_product(self, sku) -> Product | None:
+        return self.get_recent(
+            self.products,
+            sku,
+            lambda: Product.objects.filter(sku=sku).first(),
+            self.max_products,
+        )
+
+    def get_recent(self, entries: OrderedDict, key, load, max_size):
+        """
+        Entry ``key`` of ``entries``, from ``load`` when missing or stale.
+        At most ``max_size`` entries are kept, the least recently used are
+        dropped first. Nothing is kept when ``load`` finds nothing.
+        """
+        entry = entries.get(key)
+        if entry is None or not self.is_fresh(entry[0]):
+            version = self.version
+            loaded_at = time.monotonic()
+            value = load()
+            if value is None:
+                return None
+            entry = (loaded_at, value)
+            with self.lock:
+                if version == self.version:
+                    entries[key] = entry
+                    while len(entries) > max_size:
+                        entries.popitem(last=False)
+
+        with self.lock:
+            if key in entries:
+                entries.move_to_end(key)
+        return entry[1]
+
+    def get_supplier_code(self, supplier_id):
+        if supplier_id not in self.suppliers:
+            self.suppliers[supplier_id] = (
+                Supplier.objects.filter(id=supplier_id)
+                .values_list("code", flat=True)
+                .first()
+            )
+        return self.suppliers[supplier_id]
+
+    def get_supplier_prices(self, product_id) -> List[SupplierPrice]:
+        if self.warmed_at is None or not self.is_fresh(self.warmed_at):
+            self.warm()
+
+        entry = self.supplier_prices.get(product_id)
+        if entry is not None and self.is_fresh(entry[0]):
+            return entry[1]
+
+        version = self.version
+        loaded_at = time.monotonic()
+        supplier_prices = list(self.query_supplier_prices(product_id=product_id))
+        with self.lock:
+            if version == self.version:
+                self.supplier_prices[product_id] = (loaded_at, supplier_prices)
+        return supplier_prices
+
+    def get_po_summary(self, customer_id, product_id) -> CustomerProductPriceSummary:
+        entry = self.po_summaries.get(customer_id)
+        if entry is None or not self.is_fresh(entry[0]):
+            entry = self.load_po_summaries(customer_id)
+
+        with self.lock:
+            if customer_id in self.po_summaries:
+                self.po_summaries.move_to_end(customer_id)
+        summary = entry[1].get(product_id)
+        if summary is None:
+            # No PO history yet
+            summary = CustomerProductPriceSummary(
+                customer_id=customer_id, product_id=product_id
+            )
+        return summary
+
+    def load_po_summaries(self, customer_id):
+        version = self.version
+        loaded_at = time.monotonic()
+        po_summaries = {
+            summary.product_id: summary
+            for summary in CustomerProductPriceSummary.objects.filter(
+                customer_id=customer_id
+            )
+        }
+
+        entry = (loaded_at, po_summaries)
+        with self.lock:
+            if version == self.version:
+                self.po_summaries[customer_id] = entry
+                while len(self.po_summaries) > self.max_customers:
+                    self.po_summaries.popitem(last=False)
+        return entry
+
+    def get_margin_policy(self) -> MarginPolicy:
+        entry = self.margin_policy
+        if entry is not None and self.is_fresh(entry[0]):
+            return entry[1]
+
+        version = self.version
+        loaded_at = time.monotonic()
+        margin_policy = RFQAnalyzer.load_margin_policy()
+        with self.lock:
+            if version == self.version:
+                self.margin_policy = (loaded_at, margin_policy)
+        return margin_policy
+
+    @staticmethod
+    def query_supplier_prices(**filters):
+        return (
+            SupplierPrice.objects.filter(latest=True, **filters)
+            .only("supplier_id", "product_id", "price", "available_stock")
+            .order_by("product_id", "price", "id")
+        )
+
+    def invalidate_product(self, product_id):
+        with self.lock:
+            self.version += 1
+            self.supplier_prices.pop(product_id, None)
+
+    def invalidate_customer(self, customer_id):
+        with self.lock:
+            self.version += 1
+            self.po_summaries.pop(customer_id, None)
+
+    def invalidate_margin_policy(self):
+        with self.lock:
+            self.version += 1
+            self.margin_policy = None
+
+    def clear(self):
+        with self.lock:
+            self.version += 1
+            self.customers.clear()
+            self.products.clear()
+            self.suppliers.clear()
+            self.supplier_prices.clear()
+            self.po_summaries.clear()
+            self.margin_policy = None
+            self.warmed_at = None
+
+    def quote(self, customer, product, quantity) -> CachedRFQAnalyzer:
+        return CachedRFQAnalyzer.quote(self, customer, product, quantity)
+
+
+pricing_cache = PricingCache(
+    max_age=settings.PRICING_CACHE_MAX_AGE,
+    max_customers=settings.PRICING_CACHE_MAX_CUSTOMERS,
+    max_products=settings.PRICING_CACHE_MAX_PRODUCTS,
+)
@@ -0,0 +1,178 @@
+import bisect
+import contextlib
+import time
+from typing import Dict, Tuple
+
+
+class Histogram:
+    """
+    Cumulative bucket counts of per-RFQ values, as a Prometheus histogram.
+    """
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # The last bucket is +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value, weight=1):
+        """
+        ``weight`` observations of ``value``, the RFQs of a batch share the
+        cost of a phase.
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += weight
+        self.total += value * weight
+        self.count += weight
+
+    def merge(self, other: "Histogram"):
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.count += other.count
+        return self
+
+    def get_buckets(self) -> Dict[str, int]:
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip([*self.bounds, "+Inf"], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return buckets
+
+    def to_dict(self):
+        return {"sum": self.total, "count": self.count, "buckets": self.get_buckets()}
+
+
+class PricingProfiler:
+    """
+    Wall time and queries of every phase of pricing, with histograms of
+    their cost per RFQ.
+
+    Used as an execute wrapper of the connection to count queries. A phase
+    timed for a batch is observed once per RFQ of the batch, at its share
+    of the batch. Phases timed without RFQs, such as the last flush of the
+    writer, only add to the totals.
+    """
+
+    PHASES = [
+        "prefetch",
+        "po_histories",
+        "candidate_suppliers",
+        "profit_margin",
+        "decision",
+        "write",
+    ]
+    SECONDS_BUCKETS = (
+        0.00001,
+        0.00005,
+        0.0001,
+        0.0005,
+        0.001,
+        0.005,
+        0.01,
+        0.05,
+        0.1,
+        0.5,
+        1.0,
+    )
+    QUERIES_BUCKETS = (0, 0.001, 0.01, 0.1, 1, 2, 5, 10)
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds: Dict[str, float] = dict.fromkeys(self.PHASES, 0.0)
+        self.phase_queries: Dict[str, int] = dict.fromkeys(self.PHASES, 0)
+        self.seconds_histograms = {
+            phase: Histogram(self.SECONDS_BUCKETS) for phase in self.PHASES
+        }
+        self.queries_histograms = {
+            phase: Histogram(self.QUERIES_BUCKETS) for phase in self.PHASES
+        }
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    @contextlib.contextmanager
+    def phase(self, name, rfqs=1):
+        queries = self.queries
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(
+                name, time.perf_counter() - started_at, self.queries - queries, rfqs
+            )
+
+    def observe(self, phase, seconds, queries, rfqs=1):
+        self.seconds[phase] += seconds
+        self.phase_queries[phase] += queries
+        if rfqs:
+            self.seconds_histograms[phase].observe(seconds / rfqs, rfqs)
+            self.queries_histograms[phase].observe(queries / rfqs, rfqs)
+
+    def merge(self, other: "PricingProfiler"):
+        """
+        Add the phases of another profiler, of a worker process.
+        """
+        self.queries += other.queries
+        for phase in self.PHASES:
+            self.seconds[phase] += other.seconds[phase]
+            self.phase_queries[phase] += other.phase_queries[phase]
+            self.seconds_histograms[phase].merge(other.seconds_histograms[phase])
+            self.queries_histograms[phase].merge(other.queries_histograms[phase])
+        return self
+
+    def get_summary(self):
+        """
+        Seconds, queries, RFQs and milliseconds per RFQ of every phase.
+        """
+        return {
+            phase: {
+                "seconds": self.seconds[phase],
+                "queries": self.phase_queries[phase],
+                "rfqs": self.seconds_histograms[phase].count,
+                "ms_per_rfq": self.seconds[phase]
+                * 1000
+                / max(self.seconds_histograms[phase].count, 1),
+            }
+            for phase in self.PHASES
+        }
+
+    def to_dict(self):
+        return {
+            phase: {
+                **summary,
+                "seconds_per_rfq": self.seconds_histograms[phase].to_dict(),
+                "queries_per_rfq": self.queries_histograms[phase].to_dict(),
+            }
+            for phase, summary in self.get_summary().items()
+        }
+
+    def to_prometheus(self, prefix="bababos_pricing"):
+        """
+        The histograms and totals in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, histograms, help_text in [
+            ("phase_seconds", self.seconds_histograms, "Seconds per RFQ of a phase"),
+            ("phase_queries", self.queries_histograms, "Queries per RFQ of a phase"),
+        ]:
+            metric = f"{prefix}_{name}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+            for phase, histogram in histograms.items():
+                for bound, count in histogram.get_buckets().items():
+                    lines.append(
+                        f'{metric}_bucket{{phase="{phase}",le="{bound}"}} {count}'
+                    )
+                lines.append(f'{metric}_sum{{phase="{phase}"}} {histogram.total}')
+                lines.append(f'{metric}_count{{phase="{phase}"}} {histogram.count}')
+
+        for name, totals, help_text in [
+            ("phase_seconds_total", self.seconds, "Seconds spent in a phase"),
+            ("phase_queries_total", self.phase_queries, "Queries run in a phase"),
+        ]:
+            metric = f"{prefix}_{name}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for phase, total in totals.items():
+                lines.append(f'{metric}{{phase="{phase}"}} {total}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,294 @@
+from dataclasses import dataclass
+from typing import Callable, ClassVar, Dict, List, NamedTuple
+
+import numpy as np
+
+from bababos.utilities.utils import money
+
+
+class RFQFeatures(NamedTuple):
+    """
+    What the decision tree knows of an RFQ, prices in integer units (see
+    ``bababos.utilities.utils.money``). The fields are numbers for one RFQ,
+    or arrays for a batch of them, the rules are the same for both. Without
+    PO history or candidate suppliers, their fields are 0.
+    """
+
+    po_count: int
+    po_unique: int
+    po_price: int  # Last PO price
+    po_min: int
+    po_max: int
+    supplier_count: int
+    supplier_unique: int
+    supplier_min: int
+    supplier_max: int
+
+    @classmethod
+    def build(cls, po_summary, bids: List[int]):
+        prices = [money.to_units(price) for price in po_summary.prices]
+        last_price = po_summary.last_price
+        po_features = (
+            po_summary.po_count,
+            len(prices),
+            0 if last_price is None else money.to_units(last_price),
+            min(prices, default=0),
+            max(prices, default=0),
+        )
+        return cls.from_bids(po_features, bids)
+
+    @classmethod
+    def from_bids(cls, po_features, bids: List[int]):
+        """
+        The PO fields of ``po_features``, in order, and the supplier fields
+        of ``bids``.
+        """
+        return cls(
+            *po_features,
+            supplier_count=len(bids),
+            supplier_unique=len(set(bids)),
+            supplier_min=min(bids, default=0),
+            supplier_max=max(bids, default=0),
+        )
+
+
+@dataclass(frozen=True)
+class PricingRule:
+    """
+    A branch of the decision tree. RFQs matching ``predicate`` sell either
+    the ``price`` feature plus their profit margin (``COMMON``), or the
+    ``price`` feature within the profit bounds over the ``base`` feature
+    (``MARGIN``, see ``RFQAnalyzer._set_margin_pricing``). Rules without
+    ``pricing`` leave the RFQ unpriced.
+
+    ``predicate`` takes ``RFQFeatures`` and must work on numbers and on
+    arrays alike: compare with operators and combine with ``&``, ``|``.
+    """
+
+    COMMON: ClassVar[str] = "common"
+    MARGIN: ClassVar[str] = "margin"
+
+    rule_id: str
+    predicate: Callable[[RFQFeatures], bool]
+    note: str
+    pricing: str | None = None
+    price: str | None = None
+    base: str | None = None
+    clamp_max: bool = False
+
+    def __post_init__(self):
+        if self.pricing not in (None, self.COMMON, self.MARGIN):
+            raise ValueError(f"Unknown pricing {self.pricing!r}")
+        if self.pricing is not None and self.price not in RFQFeatures._fields:
+            raise ValueError(f"Rule {self.rule_id} prices an unknown feature")
+        if self.pricing == self.MARGIN and self.base not in RFQFeatures._fields:
+            raise ValueError(f"Rule {self.rule_id} needs a base feature")
+
+    def render_note(self, features: RFQFeatures) -> str:
+        return self.note.format(**features._asdict())
+
+
+class RuleTable:
+    """
+    Rules compiled into a dispatch table, the first matching rule decides.
+    """
+
+    def __init__(self, rules: List[PricingRule]):
+        self.rules = tuple(rules)
+        self.rule_ids = np.array([rule.rule_id for rule in self.rules], dtype=object)
+
+    def match(self, features: RFQFeatures) -> PricingRule | None:
+        for rule in self.rules:
+            if rule.predicate(features):
+                return rule
+        return None
+
+    def match_many(self, features: RFQFeatures) -> np.ndarray:
+        """
+        Number of the first rule every row of a batch matches, -1 for none.
+        Every predicate is evaluated once, on the whole batch.
+        """
+        rows = len(features.po_count)
+        if not self.rules:
+            return np.full(rows, -1, dtype="int64")
+        return np.select(
+            [
+                np.broadcast_to(np.asarray(rule.predicate(features), dtype=bool), rows)
+                for rule in self.rules
+            ],
+            np.arange(len(self.rules)),
+            default=-1,
+        )
+
+    def get_rule_ids(self, numbers: np.ndarray) -> np.ndarray:
+        rule_ids = np.full(len(numbers), None, dtype=object)
+        matched = numbers >= 0
+        rule_ids[matched] = self.rule_ids[numbers[matched]]
+        return rule_ids
+
+
+class PricingRuleRegistry:
+    """
+    The rules of the decision tree by ID, in the order they are tried.
+    Registering a rule with the ID of another one replaces it in place.
+    """
+
+    def __init__(self, rules=()):
+        self.rules: Dict[str, PricingRule] = {}
+        self.table: RuleTable | None = None
+        for rule in rules:
+            self.register(rule)
+
+    def __contains__(self, rule_id):
+        return rule_id in self.rules
+
+    def __getitem__(self, rule_id) -> PricingRule:
+        return self.rules[rule_id]
+
+    def register(self, rule: PricingRule, before: str | None = None):
+        """
+        Add ``rule`` after the others, or before the rule ``before``.
+        """
+        if before is None or rule.rule_id in self.rules:
+            self.rules[rule.rule_id] = rule
+        else:
+            rules = list(self.rules.values())
+            position = list(self.rules).index(before)
+            rules.insert(position, rule)
+            self.rules = {rule.rule_id: rule for rule in rules}
+        self.table = None
+        return self
+
+    def unregister(self, rule_id):
+        del self.rules[rule_id]
+        self.table = None
+        return self
+
+    def compile(self) -> RuleTable:
+        if self.table is None:
+            self.table = RuleTable(list(self.rules.values()))
+        return self.table
+
+
+def _single_po(features):
+    return features.po_count == 1
+
+
+def _single_supplier(features):
+    return features.supplier_count == 1
+
+
+DEFAULT_RULES = [
+    PricingRule(
+        "no_supplier",
+        lambda f: f.supplier_count == 0,
+        "No supplier price has stock",
+    ),
+    # Single PO history, single candidate supplier
+    PricingRule(
+        "single_po_single_supplier_lower",
+        lambda f: _single_po(f) & _single_supplier(f) & (f.po_price <= f.supplier_min),
+        "Single PO history, single supplier price, and last PO history price less than or equal with candidate supplier price",
+        PricingRule.COMMON,
+        price="supplier_min",
+    ),
+    PricingRule(
+        "single_po_single_supplier_higher",
+        lambda f: _single_po(f) & _single_supplier(f),
+        "Single PO history, single supplier price, and last PO history price greater than candidate supplier price",
+        PricingRule.MARGIN,
+        price="po_price",
+        base="supplier_min",
+        clamp_max=True,
+    ),
+    # Single PO history, multiple candidate suppliers
+    PricingRule(
+        "single_po_higher_bids",
+        lambda f: _single_po(f) & (f.supplier_max > f.po_price),
+        "Single PO history, {supplier_count} supplier prices, and has more than one higher supplier price compared with last PO history",
+        PricingRule.COMMON,
+        price="supplier_max",
+    ),
+    PricingRule(
+        "single_po_equal_bid",
+        lambda f: _single_po(f)
+        & (f.supplier_unique == 1)
+        & (f.supplier_min == f.po_price),
+        "Single PO history, {supplier_count} supplier prices, and has one unique supplier price that equal with last PO history",
+        PricingRule.COMMON,
+        price="supplier_min",
+    ),
+    PricingRule(
+        "single_po_lower_bid",
+        lambda f: _single_po(f) & (f.supplier_unique == 1),
+        "Single PO history, {supplier_count} supplier prices, and has one unique supplier price that less than last PO history",
+    ),
+    PricingRule(
+        "single_po_multiple_bids",
+        _single_po,
+        "Single PO history, {supplier_count} supplier prices, and has multiple unique supplier price",
+        PricingRule.MARGIN,
+        price="po_price",
+        base="supplier_max",
+    ),
+    # Several (or no) PO histories, single candidate supplier
+    PricingRule(
+        "unique_po_equal_supplier",
+        lambda f: _single_supplier(f)
+        & (f.po_unique == 1)
+        & (f.supplier_min == f.po_min),
+        "Has {po_count} PO histories but all unique, one supplier price, and supplier price equal with one unique PO history",
+    ),
+    PricingRule(
+        "unique_po_greater_supplier",
+        lambda f: _single_supplier(f)
+        & (f.po_unique == 1)
+        & (f.supplier_min > f.po_min),
+        "Has {po_count} PO histories but all unique, one supplier price, and supplier price greater than one unique PO history",
+        PricingRule.COMMON,
+        price="supplier_min",
+    ),
+    PricingRule(
+        "unique_po_lower_supplier",
+        lambda f: _single_supplier(f) & (f.po_unique == 1),
+        "Has {po_count} PO histories but all unique, one supplier price, and supplier price less than one unique PO history",
+        PricingRule.COMMON,
+        price="supplier_min",
+    ),
+    PricingRule(
+        "no_po_single_supplier",
+        lambda f: _single_supplier(f) & (f.po_unique == 0),
+        "No PO history, one supplier price",
+    ),
+    PricingRule(
+        "po_lower_supplier",
+        lambda f: _single_supplier(f) & (f.supplier_min < f.po_min),
+        "Has {po_count} PO histories, one supplier price, and supplier price less than min PO histories",
+    ),
+    PricingRule(
+        "po_greater_supplier",
+        lambda f: _single_supplier(f) & (f.supplier_min > f.po_max),
+        "Has {po_count} PO histories, one supplier price, and supplier price greater tha max PO histories",
+        PricingRule.COMMON,
+        price="supplier_min",
+    ),
+    PricingRule(
+        "po_between_supplier",
+        _single_supplier,
+        "Has {po_count} PO histories, one supplier price, and supplier price between PO histories",
+        PricingRule.COMMON,
+        price="supplier_min",
+    ),
+    # Several (or no) PO histories, multiple candidate suppliers
+    PricingRule(
+        "po_multiple_suppliers",
+        lambda f: f.supplier_count > 1,
+        "Has {po_count} PO histories, {supplier_count} supplier prices",
+        PricingRule.COMMON,
+        price="supplier_min",
+    ),
+]
+
+# Rules of RFQAnalyzer and BatchPricingEngine, register rules here to change
+# how every RFQ is priced
+pricing_rules = PricingRuleRegistry(DEFAULT_RULES)
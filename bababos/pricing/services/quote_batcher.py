@@ -0,0 +1,207 @@
+import asyncio
+import functools
+import operator
+import threading
+import time
+import weakref
+from collections import defaultdict, deque
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+
+from bababos.pricing.models import CustomerProductPriceSummary
+
+from .pricing_cache import CachedRFQAnalyzer, PricingCache, pricing_cache
+
+
+class PrefetchedPrices:
+    """
+    Supplier prices and PO summaries of a batch of quotes, fetched with one
+    query each for all its (customer, product) pairs. Margin curves are
+    shared with ``pricing_cache``.
+    """
+
+    def __init__(self, pairs):
+        pairs = set(pairs)
+        self.supplier_prices = defaultdict(list)
+
+        for supplier_price in PricingCache.query_supplier_prices(
+            product_id__in={product_id for _, product_id in pairs}
+        ):
+            self.supplier_prices[supplier_price.product_id].append(supplier_price)
+
+        self.po_summaries = {
+            (summary.customer_id, summary.product_id): summary
+            for summary in CustomerProductPriceSummary.objects.filter(
+                functools.reduce(
+                    operator.or_,
+                    [
+                        Q(customer_id=customer_id, product_id=product_id)
+                        for customer_id, product_id in pairs
+                    ],
+                )
+            )
+        }
+
+    def get_supplier_prices(self, product_id):
+        return self.supplier_prices.get(product_id, [])
+
+    def get_po_summary(self, customer_id, product_id):
+        summary = self.po_summaries.get((customer_id, product_id))
+        if summary is None:
+            # No PO history yet
+            summary = CustomerProductPriceSummary(
+                customer_id=customer_id, product_id=product_id
+            )
+        return summary
+
+    @staticmethod
+    def get_margin_policy():
+        return pricing_cache.get_margin_policy()
+
+
+class LoopQueue:
+    """
+    Quotes waiting for their batch on one event loop, with the timer that
+    sends it and the tasks pricing the batches sent. The loop is not kept,
+    the queue would keep it alive.
+    """
+
+    def __init__(self):
+        self.pending = []
+        self.timer = None
+        self.tasks = set()
+
+
+class QuoteBatcher:
+    """
+    Coalesce the quotes requested within ``window`` seconds of each other
+    into one batch, whose prices are fetched together and analyzed in a
+    thread, then hand every request its own result.
+
+    A batch is sent as soon as it has ``max_batch_size`` quotes. The fill of
+    the last ``history`` batches and the time their quotes waited in the
+    queue are kept for ``get_metrics``.
+
+    Futures belong to the event loop that created them, so every loop has
+    its own queue. Under ASGI all requests share one loop, under WSGI each
+    request runs on its own loop and is batched alone.
+    """
+
+    def __init__(self, window=0.005, max_batch_size=100, history=1000):
+        self.window = window
+        self.max_batch_size = max_batch_size
+
+        # Dropped once drained, or with their loop
+        self.queues: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+        self.batches = 0
+        self.quotes = 0
+        self.batch_sizes = deque(maxlen=history)
+        self.queue_waits = deque(maxlen=history * max_batch_size)
+
+    def get_queue(self, loop) -> LoopQueue:
+        with self.lock:
+            queue = self.queues.get(loop)
+            if queue is None:
+                queue = self.queues[loop] = LoopQueue()
+            return queue
+
+    def release(self, queue: LoopQueue, task):
+        """
+        Forget ``task`` once done, and the queue of the loop once it drains.
+        """
+        queue.tasks.discard(task)
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            drained = not queue.pending and queue.timer is None and not queue.tasks
+            if drained and self.queues.get(loop) is queue:
+                del self.queues[loop]
+
+    async def quote(self, customer, product, quantity) -> CachedRFQAnalyzer:
+        loop = asyncio.get_running_loop()
+        queue = self.get_queue(loop)
+        future = loop.create_future()
+        queue.pending.append(
+            ((customer, product, quantity), future, time.perf_counter())
+        )
+
+        if len(queue.pending) >= self.max_batch_size:
+            self.flush(queue)
+        elif queue.timer is None:
+            queue.timer = loop.call_later(self.window, self.flush, queue)
+        return await future
+
+    def flush(self, queue: LoopQueue):
+        if queue.timer is not None:
+            queue.timer.cancel()
+            queue.timer = None
+
+        batch, queue.pending = queue.pending, []
+        if batch:
+            # The loop only keeps weak references to its tasks
+            task = asyncio.get_running_loop().create_task(self.run(batch))
+            queue.tasks.add(task)
+            task.add_done_callback(functools.partial(self.release, queue))
+
+    async def run(self, batch):
+        sent_at = time.perf_counter()
+        with self.lock:
+            self.batches += 1
+            self.quotes += len(batch)
+            self.batch_sizes.append(len(batch))
+            self.queue_waits.extend(sent_at - queued_at for _, _, queued_at in batch)
+
+        try:
+            analyzers = await sync_to_async(self.price)(
+                [request for request, _, _ in batch]
+            )
+        except Exception as exception:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exception)
+            return
+
+        for (_, future, _), analyzer in zip(batch, analyzers):
+            if not future.done():
+                future.set_result(analyzer)
+
+    @staticmethod
+    def price(requests):
+        prices = PrefetchedPrices(
+            (customer.id, product.id) for customer, product, _ in requests
+        )
+        return [
+            CachedRFQAnalyzer.quote(prices, customer, product, quantity)
+            for customer, product, quantity in requests
+        ]
+
+    def get_metrics(self):
+        with self.lock:
+            batch_sizes = np.array(self.batch_sizes)
+            queue_waits = np.array(self.queue_waits) * 1000
+        p50, p99 = np.percentile(queue_waits, [50, 99]) if len(queue_waits) else (0, 0)
+        return {
+            "batches": self.batches,
+            "quotes": self.quotes,
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "mean_batch_size": float(batch_sizes.mean()) if len(batch_sizes) else 0,
+            "mean_batch_fill": (
+                float(batch_sizes.mean()) / self.max_batch_size
+                if len(batch_sizes)
+                else 0
+            ),
+            "full_batches": int((batch_sizes >= self.max_batch_size).sum()),
+            "queue_wait_p50_ms": float(p50),
+            "queue_wait_p99_ms": float(p99),
+        }
+
+
+quote_batcher = QuoteBatcher(
+    window=settings.QUOTE_BATCH_WINDOW,
+    max_batch_size=settings.QUOTE_BATCH_MAX_SIZE,
+)
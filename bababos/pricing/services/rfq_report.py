@@ -0,0 +1,139 @@
+import decimal
+from typing import Iterator, List, NamedTuple, Optional
+
+from django.db.models import Count, Exists, Min, OuterRef
+
+from bababos.pricing.models import (
+    RFQ,
+    CustomerProductPriceSummary,
+    SupplierPrice,
+    Transaction,
+)
+
+
+class ReportRow(NamedTuple):
+    rfq_id: int
+    customer: str
+    product: str
+    quantity: int
+    unit: str
+    po_count: int
+    last_po_price: Optional[decimal.Decimal]
+    supplier_prices: int
+    lowest_supplier_price: Optional[decimal.Decimal]
+    transaction_id: Optional[int]
+    supplier: Optional[str]
+    supplier_price: Optional[decimal.Decimal]
+    purchased: Optional[int]
+    chosen_price: Optional[decimal.Decimal]
+    profit_margin: Optional[decimal.Decimal]
+    final_price: Optional[decimal.Decimal]
+    freight: Optional[decimal.Decimal]
+    status: Optional[str]
+    rule: Optional[str]
+
+
+class RFQReport:
+    """
+    One row per transaction of every RFQ, or one row for an RFQ without
+    transactions, with its PO history and the latest supplier prices of
+    its product.
+
+    RFQs are read in ID order, ``chunk_size`` at a time, with four queries
+    per chunk whatever the number of POs, supplier prices and transactions.
+    """
+
+    FIELDS = ReportRow._fields
+
+    def __init__(self, rfqs=None, chunk_size=1000):
+        self.rfqs = RFQ.objects.all() if rfqs is None else rfqs
+        self.chunk_size = chunk_size
+        self.rfq_count = 0
+
+    def __iter__(self) -> Iterator[ReportRow]:
+        for chunk in self.get_chunks():
+            yield from self.get_rows(chunk)
+
+    def get_chunks(self) -> Iterator[List[tuple]]:
+        last_id = None
+        while True:
+            rfqs = self.rfqs.order_by("id")
+            if last_id is not None:
+                rfqs = rfqs.filter(id__gt=last_id)
+            chunk = list(
+                rfqs.values_list(
+                    "id",
+                    "customer__code",
+                    "product__sku",
+                    "quantity",
+                    "unit",
+                    "customer_id",
+                    "product_id",
+                )[: self.chunk_size]
+            )
+            if not chunk:
+                return
+            self.rfq_count += len(chunk)
+            yield chunk
+            last_id = chunk[-1][0]
+
+    def get_rows(self, chunk) -> Iterator[ReportRow]:
+        rfq_ids = [rfq[0] for rfq in chunk]
+        product_ids = {rfq[6] for rfq in chunk}
+
+        requested = RFQ.objects.filter(
+            pk__in=rfq_ids,
+            customer_id=OuterRef("customer_id"),
+            product_id=OuterRef("product_id"),
+        )
+        summaries = {
+            (customer_id, product_id): (po_count, last_price)
+            for customer_id, product_id, po_count, last_price in (
+                CustomerProductPriceSummary.objects.filter(
+                    Exists(requested)
+                ).values_list("customer_id", "product_id", "po_count", "last_price")
+            )
+        }
+        supplier_prices = {
+            product_id: (count, lowest)
+            for product_id, count, lowest in (
+                SupplierPrice.objects.filter(product_id__in=product_ids, latest=True)
+                .values("product_id")
+                .annotate(count=Count("id"), lowest=Min("price"))
+                .values_list("product_id", "count", "lowest")
+            )
+        }
+        transactions = {}
+        for transaction in (
+            Transaction.objects.filter(rfq_id__in=rfq_ids)
+            .select_related("supplier_price__supplier")
+            .order_by("rfq_id", "id")
+        ):
+            transactions.setdefault(transaction.rfq_id, []).append(transaction)
+
+        for rfq_id, customer, product, quantity, unit, customer_id, product_id in chunk:
+            rfq = (
+                rfq_id,
+                customer,
+                product,
+                quantity,
+                unit,
+                *summaries.get((customer_id, product_id), (0, None)),
+                *supplier_prices.get(product_id, (0, None)),
+            )
+            if rfq_id not in transactions:
+                yield ReportRow(*rfq, *[None] * 10)
+            for transaction in transactions.get(rfq_id, ()):
+                yield ReportRow(
+                    *rfq,
+                    transaction.id,
+                    transaction.supplier_price.supplier.code,
+                    transaction.supplier_price.price,
+                    transaction.quantity,
+                    transaction.chosen_price,
+                    transaction.analyzed_profit_margin,
+                    transaction.final_price,
+                    transaction.freight,
+                    transaction.status,
+                    transaction.rule,
+                )
@@ -0,0 +1,286 @@
+from decimal import Decimal
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from bababos.pricing.models import SupplierPrice
+
+from .logistic_recommender import LogisticRecommender
+
+FREIGHT_PLACES = Decimal("0.00001")
+
+
+class Allocation(NamedTuple):
+    supplier_price_id: int
+    price: Decimal
+    available_stock: int
+    purchased_stock: int
+    remaining_stock: int
+    # Per unit, only set by a landed cost allocation
+    freight: Decimal = Decimal(0)
+
+
+class ProductStock:
+    """
+    Supplier prices of one product sorted by price, with the stock that is
+    still left. Suppliers before ``cursor`` are sold out.
+    """
+
+    def __init__(self):
+        self.supplier_price_ids: List[int] = []
+        self.prices: List[Decimal] = []
+        self.available_stocks: List[int] = []
+        self.remaining_stocks: List[int] = []
+        self.region_ids: List[Optional[int]] = []
+        self.supplier_ids: List[Optional[int]] = []
+        self.cursor = 0
+        # Position of every supplier price ID, built when stock is released
+        self.positions: Dict[int, int] | None = None
+
+        # Landed cost allocations, see allocate_landed
+        self.price_array: np.ndarray | None = None
+        self.fleet_prices: Dict[int, np.ndarray] = {}
+
+    def append(
+        self,
+        supplier_price_id,
+        price,
+        available_stock,
+        region_id=None,
+        supplier_id=None,
+    ):
+        if available_stock <= 0:
+            return
+        self.supplier_price_ids.append(supplier_price_id)
+        self.prices.append(price)
+        self.available_stocks.append(available_stock)
+        self.remaining_stocks.append(available_stock)
+        self.region_ids.append(region_id)
+        self.supplier_ids.append(supplier_id)
+        self.positions = None
+
+    def allocate(self, quantity, positions=None) -> List[Allocation]:
+        """
+        Take ``quantity`` from the suppliers in ``positions`` order, from the
+        cheapest by default.
+        """
+        if positions is None:
+            positions = range(self.cursor, len(self.remaining_stocks))
+
+        allocations = []
+        leftover = quantity
+        for position in positions:
+            if leftover <= 0:
+                break
+            available_stock = self.remaining_stocks[position]
+            if available_stock == 0:
+                continue
+            purchased_stock = (
+                leftover if available_stock >= leftover else available_stock
+            )
+            leftover = leftover - purchased_stock
+            allocations.append(self.take(position, purchased_stock))
+
+        self.skip_sold_out()
+        return allocations
+
+    def take(self, position, quantity) -> Allocation:
+        available_stock = self.remaining_stocks[position]
+        self.remaining_stocks[position] = available_stock - quantity
+        return Allocation(
+            supplier_price_id=self.supplier_price_ids[position],
+            price=self.prices[position],
+            available_stock=available_stock,
+            purchased_stock=quantity,
+            remaining_stock=available_stock - quantity,
+        )
+
+    def release(self, supplier_price_id, quantity):
+        """
+        Give back ``quantity`` taken from a supplier price.
+        """
+        if self.positions is None:
+            self.positions = {
+                supplier_price_id: position
+                for position, supplier_price_id in enumerate(self.supplier_price_ids)
+            }
+        position = self.positions[supplier_price_id]
+        self.remaining_stocks[position] += quantity
+        self.cursor = min(self.cursor, position)
+
+    def skip_sold_out(self):
+        while (
+            self.cursor < len(self.remaining_stocks)
+            and self.remaining_stocks[self.cursor] == 0
+        ):
+            self.cursor += 1
+
+    def get_allocated_stocks(self) -> Dict[int, int]:
+        return {
+            supplier_price_id: available_stock - remaining_stock
+            for supplier_price_id, available_stock, remaining_stock in zip(
+                self.supplier_price_ids, self.available_stocks, self.remaining_stocks
+            )
+            if available_stock != remaining_stock
+        }
+
+    def get_state(self):
+        return list(self.remaining_stocks), self.cursor
+
+    def set_state(self, state):
+        remaining_stocks, self.cursor = state
+        self.remaining_stocks = list(remaining_stocks)
+
+    def allocate_landed(
+        self, quantity, destination_id, logistics: LogisticRecommender
+    ) -> List[Allocation]:
+        """
+        Take ``quantity`` from the suppliers with the lowest landed cost to
+        ``destination_id``: their price plus the freight of what they would
+        deliver, spread over its units. The freight of every supplier is
+        computed at once over the fleet price matrix of the destination.
+        """
+        if self.price_array is None:
+            self.price_array = np.array(self.prices, dtype="float64")
+        if destination_id not in self.fleet_prices:
+            self.fleet_prices[destination_id] = logistics.get_fleet_prices(
+                self.region_ids, destination_id
+            )
+
+        remaining = np.array(self.remaining_stocks[self.cursor :], dtype="int64")
+        deliveries = np.minimum(remaining, quantity)
+        freights = logistics.get_freights(
+            self.fleet_prices[destination_id][self.cursor :], deliveries
+        )
+        landed = self.price_array[self.cursor :] + freights / np.maximum(deliveries, 1)
+        # Stable, so equal landed costs keep the cheapest price first
+        order = np.argsort(landed, kind="stable")
+        positions = (self.cursor + order[remaining[order] > 0]).tolist()
+
+        allocations = self.allocate(quantity, positions)
+        return [
+            allocation._replace(
+                freight=self.get_freight(
+                    logistics,
+                    self.region_ids[position],
+                    destination_id,
+                    allocation.purchased_stock,
+                )
+            )
+            for position, allocation in zip(positions, allocations)
+        ]
+
+    @staticmethod
+    def get_freight(logistics, source_id, destination_id, quantity) -> Decimal:
+        """
+        Exact freight per unit of ``quantity`` delivered by one supplier.
+        """
+        cost = logistics.get_cost(source_id, destination_id, quantity)
+        if cost is None:
+            return Decimal(0)
+        return (cost.total / quantity).quantize(FREIGHT_PLACES)
+
+
+class StockAllocationIndex:
+    """
+    In-memory stock of every product priced in a run.
+
+    Supplier prices are loaded and sorted once per product, every allocation
+    takes its stock out, so RFQs later in the same run only see what is left.
+
+    With ``logistics``, RFQs that give their customer's region are allocated
+    on landed cost instead of price, see ``ProductStock.allocate_landed``.
+
+    It is also the ledger of the stock taken from every supplier price in
+    the run, see ``get_allocated_stocks``. Only priced RFQs hold stock,
+    unpriced ones ``release`` theirs.
+
+    With ``lock``, the supplier prices loaded are locked until the end of the
+    database transaction, so the stock another run reserves meanwhile is
+    not sold twice.
+    """
+
+    def __init__(self, logistics: LogisticRecommender | None = None, lock=False):
+        self.products: Dict[int, ProductStock] = {}
+        self.logistics = logistics
+        self.lock = lock
+        # Stock taken from the products discarded so far
+        self.discarded_allocations: Dict[int, int] = {}
+
+    def load(self, product_ids: Iterable[int]):
+        missing = set(product_ids).difference(self.products)
+        if not missing:
+            return self
+
+        for product_id in missing:
+            self.products[product_id] = ProductStock()
+
+        fields = ["id", "product_id", "price", "available_stock"]
+        if self.logistics is not None:
+            fields += ["supplier__region_id", "supplier_id"]
+        supplier_prices = (
+            SupplierPrice.objects.filter(product_id__in=missing, latest=True)
+            .order_by("product_id", "price", "id")
+            .values_list(*fields)
+        )
+        if self.lock:
+            supplier_prices = supplier_prices.select_for_update(of=("self",))
+        for supplier_price_id, product_id, *stock in supplier_prices:
+            self.products[product_id].append(supplier_price_id, *stock)
+        return self
+
+    def allocate(self, product_id, quantity, destination_id=None) -> List[Allocation]:
+        self.load([product_id])
+        if self.logistics is not None and destination_id is not None:
+            return self.products[product_id].allocate_landed(
+                quantity, destination_id, self.logistics
+            )
+        return self.products[product_id].allocate(quantity)
+
+    def release(self, product_id, allocations):
+        """
+        Give the stock of ``allocations`` back, for RFQs the decision tree
+        leaves unpriced, so later RFQs can buy it and it is not reserved.
+        """
+        stock = self.products[product_id]
+        for allocation in allocations:
+            stock.release(allocation.supplier_price_id, allocation.purchased_stock)
+        return self
+
+    def discard(self, product_ids: Iterable[int]):
+        """
+        Drop the stock of products whose RFQs are all priced, a product
+        allocated again afterwards would start from its full stock.
+        """
+        for product_id in product_ids:
+            stock = self.products.pop(product_id, None)
+            if stock is not None:
+                self.add_allocations(
+                    self.discarded_allocations, stock.get_allocated_stocks()
+                )
+        return self
+
+    def get_allocated_stocks(self) -> Dict[int, int]:
+        """
+        Stock taken from every supplier price in the run, by its ID. What
+        ``--reserve-stock`` reserves, it matches the written transactions.
+        """
+        allocated = dict(self.discarded_allocations)
+        for stock in self.products.values():
+            self.add_allocations(allocated, stock.get_allocated_stocks())
+        return allocated
+
+    @staticmethod
+    def add_allocations(total: Dict[int, int], allocations: Dict[int, int]):
+        for supplier_price_id, quantity in allocations.items():
+            total[supplier_price_id] = total.get(supplier_price_id, 0) + quantity
+        return total
+
+    def get_remaining_stocks(self) -> Dict[int, int]:
+        return {
+            supplier_price_id: remaining_stock
+            for stock in self.products.values()
+            for supplier_price_id, remaining_stock in zip(
+                stock.supplier_price_ids, stock.remaining_stocks
+            )
+        }
@@ -0,0 +1,193 @@
+import time
+from collections import OrderedDict
+from itertools import groupby, islice
+from operator import itemgetter
+
+from django.db import connection
+
+from bababos.pricing.models import RFQ, CustomerProductPriceSummary
+from bababos.utilities.utils import QueryCounter, get_peak_rss_mb, get_rss_mb
+
+from .batch_pricing import BatchPricingEngine
+from .supplier_recommender import SupplierRecommender
+
+
+class SummaryCache:
+    """
+    PO summaries of the last ``max_size`` customer and product pairs priced,
+    pairs without a PO history are remembered too.
+    """
+
+    def __init__(self, max_size=10_000):
+        self.max_size = max_size
+        self.summaries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, pairs):
+        pairs = list(dict.fromkeys(pairs))
+        missing = [pair for pair in pairs if pair not in self.summaries]
+        self.hits += len(pairs) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            self.summaries.update(self.load(missing))
+
+        rows = []
+        for pair in pairs:
+            self.summaries.move_to_end(pair)
+            if self.summaries[pair] is not None:
+                rows.append(self.summaries[pair])
+        self.resize(self.max_size)
+        return rows
+
+    @staticmethod
+    def load(pairs):
+        loaded = dict.fromkeys(pairs)
+        # RFQs come by product, a batch has many customers of a few
+        # products, so their cross product is barely more than the pairs
+        for row in CustomerProductPriceSummary.objects.filter(
+            customer_id__in={customer_id for customer_id, _ in pairs},
+            product_id__in={product_id for _, product_id in pairs},
+        ).values_list("customer_id", "product_id", "po_count", "prices", "last_price"):
+            if row[:2] in loaded:
+                loaded[row[:2]] = row
+        return loaded
+
+    def resize(self, max_size):
+        self.max_size = max_size
+        while len(self.summaries) > self.max_size:
+            self.summaries.popitem(last=False)
+
+
+class StreamingSupplierRecommender(SupplierRecommender):
+    """
+    ``SupplierRecommender`` with bounded memory, for runs too large to keep
+    every RFQ ID and the stock of every product in memory.
+
+    RFQs are streamed with a server-side cursor ordered by product, then
+    priority.
+    A product's stock is dropped as soon as its RFQs are priced. Each product
+    is still allocated in RFQ order, so the result is the same as the serial
+    run. PO summaries are kept across batches in an LRU of ``max_context``
+    pairs.
+
+    With ``max_memory`` (MB), the batch size and the LRU are halved while
+    the RSS is over the budget. The batch size grows back up to
+    ``batch_size`` while the RSS stays under half of the budget.
+    """
+
+    def __init__(
+        self,
+        batch_size=1000,
+        flush_size=1000,
+        update_conflicts=False,
+        max_context=10_000,
+        max_memory=None,
+        min_batch_size=50,
+        landed_cost=False,
+        priority="id",
+        reserve_stock=False,
+        profile=False,
+    ):
+        super().__init__(
+            batch_size=batch_size,
+            flush_size=flush_size,
+            update_conflicts=update_conflicts,
+            landed_cost=landed_cost,
+            priority=priority,
+            reserve_stock=reserve_stock,
+            profile=profile,
+        )
+        self.max_batch_size = batch_size
+        self.min_batch_size = min(min_batch_size, batch_size)
+        self.max_memory = max_memory
+        self.summary_cache = SummaryCache(max_context)
+
+    def handle(self, rfqs=None):
+        rfqs = RFQ.objects.all() if rfqs is None else rfqs
+        stream = self.stream_rfqs(rfqs)
+
+        counter = QueryCounter()
+        with (
+            self.reserving(),
+            connection.execute_wrapper(counter),
+            self.profile_queries(),
+            self.writer,
+        ):
+            while batch := list(islice(stream, self.batch_size)):
+                started_at = time.perf_counter()
+                last_product_id = batch[-1][1]
+                if self.reserve_stock:
+                    undecided = set(
+                        self.lock_stock(
+                            [rfq_id for rfq_id, _ in batch],
+                            {product_id for _, product_id in batch},
+                        )
+                    )
+                    batch = [row for row in batch if row[0] in undecided]
+                engine = BatchPricingEngine(
+                    RFQ.objects.filter(pk__in=[rfq_id for rfq_id, _ in batch]),
+                    stock_index=self.stock_index,
+                    summary_cache=self.summary_cache,
+                    rfq_ids=[rfq_id for rfq_id, _ in batch],
+                    profiler=self.profiler,
+                    margin_policy=self.get_margin_policy(),
+                ).handle()
+                with self.profile("write", len(batch)):
+                    self.writer.extend(engine.get_transactions())
+
+                # Only the last product of the batch may have RFQs left
+                self.stock_index.discard(
+                    set(self.stock_index.products) - {last_product_id}
+                )
+                self.rfq_count += len(batch)
+                self.batch_timings.append(
+                    (len(batch), time.perf_counter() - started_at)
+                )
+                self.adapt_batch_size()
+            with self.profile("write", 0):
+                self.writer.flush()
+
+        self.queries = counter.count
+        self.peak_rss_mb = get_peak_rss_mb()
+        return self
+
+    def stream_rfqs(self, rfqs):
+        """
+        ID and product ID of the RFQs, product by product in ``priority``
+        order. With the ``margin`` priority the RFQs of a product are sorted
+        once they are all read.
+        """
+        rfqs = self.order_rfqs(rfqs, "product_id")
+        if self.priority != "margin":
+            yield from rfqs.values_list("id", "product_id").iterator(
+                chunk_size=self.max_batch_size
+            )
+            return
+        rows = rfqs.values_list(*self.MARGIN_FIELDS).iterator(
+            chunk_size=self.max_batch_size
+        )
+        for _, product_rows in groupby(rows, key=itemgetter(1)):
+            for rfq_id, product_id, *_ in self.sort_by_margin(list(product_rows)):
+                yield rfq_id, product_id
+
+    def adapt_batch_size(self):
+        if self.max_memory is None:
+            return
+        rss = get_rss_mb()
+        if rss > self.max_memory:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+            self.summary_cache.resize(
+                max(self.max_batch_size, self.summary_cache.max_size // 2)
+            )
+        elif rss < self.max_memory / 2:
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+
+    def get_context_stats(self):
+        return {
+            "batch_size": self.batch_size,
+            "summaries": len(self.summary_cache.summaries),
+            "summary_hits": self.summary_cache.hits,
+            "summary_misses": self.summary_cache.misses,
+            "products": len(self.stock_index.products),
+        }
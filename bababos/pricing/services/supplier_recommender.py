@@ -1,208 +1,209 @@
+import contextlib
 import decimal
-from typing import List
-
-import django.db.utils
-from django.db.models import Prefetch
-
-from bababos.pricing.models import PO, RFQ, Supplier, Transaction, SupplierPrice
-from bababos.utilities.utils import Collection
-
-
+import time
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Subquery
+
+from bababos.pricing.models import (
+    RFQ,
+    CustomerProductPriceSummary,
+    MarginCurve,
+    SupplierPrice,
+    Transaction,
+)
+from bababos.utilities.utils import Collection, QueryCounter, get_peak_rss_mb, money
+
+from .basket_allocation import BasketAllocator
+from .logistic_recommender import LogisticRecommender
+from .margin_policy import MarginPolicy
+from .pricing_profiler import PricingProfiler
+from .pricing_rules import PricingRule, RFQFeatures, RuleTable, pricing_rules
+from .stock_allocation import StockAllocationIndex
+from .transaction_writer import TransactionWriter
+
+
+@dataclass(slots=True)
 class CandidateSupplierPrice:
-    supplier_price: SupplierPrice
+    """
+    Stock bought from one supplier price. Only IDs and numbers are kept,
+    the ``SupplierPrice`` is loaded the first time it is asked for.
+    """
+
+    supplier_price_id: int
     available_stock: int
     purchased_stock: int
     remaining_stock: int
-    price: float
-    total: float
-
-    def __init__(self, **kwargs):
-        for kwarg in kwargs:
-            setattr(self, kwarg, kwargs[kwarg])
+    price: decimal.Decimal
+    supplier_id: int | None = None
+    _supplier_price: SupplierPrice | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    @property
+    def total(self):
+        return self.price * self.purchased_stock
+
+    @property
+    def supplier_price(self) -> SupplierPrice:
+        if self._supplier_price is None:
+            self.resolve([self])
+        return self._supplier_price
+
+    @classmethod
+    def resolve(cls, candidates):
+        """
+        Load the ``SupplierPrice`` of every candidate with one query.
+        """
+        candidates = [
+            candidate for candidate in candidates if candidate._supplier_price is None
+        ]
+        supplier_prices = SupplierPrice.objects.select_related("supplier").in_bulk(
+            {candidate.supplier_price_id for candidate in candidates}
+        )
+        for candidate in candidates:
+            candidate._supplier_price = supplier_prices[candidate.supplier_price_id]
+            candidate.supplier_id = candidate._supplier_price.supplier_id
+        return candidates
 
     def __repr__(self):
         class_name = self.__class__.__name__
-        return f"<bababos...{class_name}: ({self.supplier_price.id})>"
+        return f"<bababos...{class_name}: ({self.supplier_price_id})>"
 
 
 class RFQAnalyzer:
 
     MIN_PROFIT = 10 / 100
     MAX_PROFIT = 50 / 100
+    MIN_PROFIT_UNITS = money.to_ratio_units(MIN_PROFIT)
+    MAX_PROFIT_UNITS = money.to_ratio_units(MAX_PROFIT)
 
-    # for simplicity,
-    # this number will same across product and supplier
+    # Default margin curve, customers and products can have their own in
+    # the margin_curves table, see MarginPolicy
     MIN_AMOUNT_FOR_MAX_PROFIT = 1
     MAX_AMOUNT_FOR_MIN_PROFIT = 100
 
-    def __init__(self, rfq: RFQ):
+    def __init__(
+        self,
+        rfq: RFQ,
+        stock_index: StockAllocationIndex | None = None,
+        profiler: PricingProfiler | None = None,
+        margin_policy: MarginPolicy | None = None,
+        rule_table: RuleTable | None = None,
+    ):
         self.rfq = rfq
-        self.customer = rfq.customer
-        self.product = rfq.product
+        self.stock_index = stock_index
+        self.profiler = profiler
+        self.margin_policy = margin_policy
+        self.rule_table = rule_table
+        with self.profile("prefetch"):
+            self.customer = rfq.customer
+            self.product = rfq.product
         self.quantity = rfq.quantity
 
         self.profit_margin: decimal.Decimal | None = None
         self.chosen_price: decimal.Decimal | None = None
         self.final_price: decimal.Decimal | None = None
+        # The same in integer units, see bababos.utilities.utils.money
+        self.margin_units: int | None = None
+        self.chosen_units: int | None = None
+        self.final_units: int | None = None
         self.supplier_prices = []
-        self.note: str | None = None
+        # The pricing rule that decided, and what it was decided on
+        self.rule: PricingRule | None = None
+        self.features: RFQFeatures | None = None
 
     def handle(self):
+        with self.profile("profit_margin"):
+            self.set_profit_margin(self.rfq.quantity)
+        with self.profile("po_histories"):
+            po_summary = self.get_po_summary()
+        with self.profile("candidate_suppliers"):
+            self.get_candidate_suppliers()
+        with self.profile("decision"):
+            self.decide(po_summary)
+        if self.chosen_price is None and self.stock_index is not None:
+            # Unpriced RFQs buy nothing, later RFQs can have their stock
+            self.stock_index.release(self.product.id, self.supplier_prices)
+        return self
 
-        self.set_profit_margin(self.rfq.quantity)
-
-        po_histories = self.get_po_histories()
-        self.get_candidate_suppliers()
-
-        if len(po_histories) == 1:
-
-            past_po = po_histories[0]
-
-            if len(self.supplier_prices) == 1:
-                supplier_price = self.supplier_prices[0]
-                if past_po.price <= supplier_price.price:
-                    self._set_common_pricing(supplier_price.price)
-                    self.set_note(
-                        "Single PO history, single supplier price, and last PO history price less than or equal with candidate supplier price"
-                    )
-
-                elif past_po.price > supplier_price.price:
-                    profit_margin = decimal.Decimal(
-                        (past_po.price - supplier_price.price) / supplier_price.price
-                    )
-                    if profit_margin < self.MIN_PROFIT:
-                        profit_margin = decimal.Decimal(self.MIN_PROFIT)
-                        self.chosen_price = supplier_price.price
-                        self.final_price = self.chosen_price + (
-                            self.chosen_price * profit_margin
-                        )
-                    elif profit_margin > self.MAX_PROFIT:
-                        profit_margin = decimal.Decimal(self.MAX_PROFIT)
-                        self.chosen_price = supplier_price.price
-                        self.final_price = self.chosen_price + (
-                            self.chosen_price * profit_margin
-                        )
-                    else:
-                        self.chosen_price = past_po.price
-                        self.final_price = past_po.price
-
-                    self.profit_margin = profit_margin
-                    self.set_note(
-                        "Single PO history, single supplier price, and last PO history price greater than candidate supplier price"
-                    )
+    def profile(self, phase):
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.phase(phase)
+
+    def decide(self, po_summary):
+        """
+        Price the RFQ with the first rule of ``rule_table`` it matches, in
+        integer units (see ``bababos.utilities.utils.money``), then set the
+        ``Decimal`` prices and margin.
+        """
+        bids = [
+            money.to_units(supplier_price.price)
+            for supplier_price in self.supplier_prices
+        ]
+        self.features = RFQFeatures.build(po_summary, bids)
+        self.rule = self.get_rule_table().match(self.features)
+
+        # Rules without pricing leave the RFQ unpriced
+        pricing = None if self.rule is None else self.rule.pricing
+        if pricing == PricingRule.COMMON:
+            self._set_common_pricing(getattr(self.features, self.rule.price))
+        elif pricing == PricingRule.MARGIN:
+            self._set_margin_pricing(
+                getattr(self.features, self.rule.base),
+                getattr(self.features, self.rule.price),
+                clamp_max=self.rule.clamp_max,
+            )
 
-                else:
-                    raise Exception("Something wrong!")
-
-            else:
-                higher_bids_than_po_history = []
-                unique_bids = []
-                for supplier_price in self.supplier_prices:
-                    if supplier_price.price not in unique_bids:
-                        unique_bids.append(supplier_price.price)
-                    if supplier_price.price > past_po.price:
-                        higher_bids_than_po_history.append(supplier_price.price)
-
-                if len(higher_bids_than_po_history) >= 1:
-                    chosen_price = max(higher_bids_than_po_history)
-                    self._set_common_pricing(chosen_price)
-                    self.set_note(
-                        f"Single PO history, {len(self.supplier_prices)} supplier prices, and has more than one higher supplier price compared with last PO history"
-                    )
+        self.profit_margin = money.from_ratio_units(self.margin_units)
+        if self.chosen_units is not None:
+            self.chosen_price = money.from_units(self.chosen_units)
+            self.final_price = money.from_units(self.final_units)
+        return self
 
-                else:
-
-                    if len(unique_bids) == 1:
-                        unique_bid = unique_bids[0]
-                        if unique_bid == past_po.price:
-                            self._set_common_pricing(unique_bid)
-                            self.set_note(
-                                f"Single PO history, {len(self.supplier_prices)} supplier prices, and has one unique supplier price that equal with last PO history"
-                            )
-                        else:
-                            ...
-
-                    else:
-                        max_bid = max(unique_bids)
-
-                        profit_margin = decimal.Decimal(
-                            (past_po.price - max_bid) / max_bid
-                        )
-                        if profit_margin < self.MIN_PROFIT:
-                            profit_margin = decimal.Decimal(self.MIN_PROFIT)
-                            self.chosen_price = past_po.price
-                            self.final_price = self.chosen_price + (
-                                self.chosen_price * profit_margin
-                            )
-                        else:
-                            self.chosen_price = past_po.price
-                            self.final_price = past_po.price
-
-                        self.profit_margin = profit_margin
-                        self.set_note(
-                            f"Single PO history, {len(self.supplier_prices)} supplier prices, and has multiple unique supplier price"
-                        )
+    def get_rule_table(self) -> RuleTable:
+        if self.rule_table is None:
+            self.rule_table = pricing_rules.compile()
+        return self.rule_table
 
-        else:
-            unique_past_po_prices = []
-            for po_history in po_histories:
-                if po_history.price not in unique_past_po_prices:
-                    unique_past_po_prices.append(po_history.price)
-
-            if len(self.supplier_prices) == 1:
-                supplier_price = self.supplier_prices[0]
-                if len(unique_past_po_prices) == 1:
-                    unique_past_po_price = unique_past_po_prices[0]
-                    if supplier_price.price == unique_past_po_price:
-                        print("A1.1")
-                    elif supplier_price.price > unique_past_po_price:
-                        self._set_common_pricing(supplier_price.price)
-                        self.set_note(
-                            f"Has {len(po_histories)} PO histories but all unique, one supplier price, and supplier price greater than one unique PO history"
-                        )
-                    else:
-                        self._set_common_pricing(supplier_price.price)
-                        self.set_note(
-                            f"Has {len(po_histories)} PO histories but all unique, one supplier price, and supplier price less than one unique PO history"
-                        )
-                else:
-                    if supplier_price.price < min(unique_past_po_prices):
-
-                        print("A2.1")
-                    elif supplier_price.price > max(unique_past_po_prices):
-                        self._set_common_pricing(supplier_price.price)
-                        self.set_note(
-                            f"Has {len(po_histories)} PO histories, one supplier price, and supplier price greater tha max PO histories"
-                        )
-                    else:
-                        self._set_common_pricing(supplier_price.price)
-                        self.set_note(
-                            f"Has {len(po_histories)} PO histories, one supplier price, and supplier price between PO histories"
-                        )
-
-            else:
-                # SP: [Decimal("1_261_261.26100"), Decimal("1_447_747.74800")] -> lowest: 1_261_261
-                # PO: [Decimal('2_542_785.00000'), Decimal('1_259_831.00000'), Decimal('1_321_171.00000')]
-                self._set_common_pricing(min([sp.price for sp in self.supplier_prices]))
-                self.set_note(
-                    f"Has {len(po_histories)} PO histories, {len(self.supplier_prices)} supplier prices"
-                )
-        return self
+    @property
+    def note(self) -> str | None:
+        if self.rule is None:
+            return None
+        return self.rule.render_note(self.features)
 
     def _set_common_pricing(self, chosen_price):
-        self.final_price = chosen_price + (chosen_price * self.profit_margin)
-        self.chosen_price = chosen_price
+        self.final_units = money.add_margin(chosen_price, self.margin_units)
+        self.chosen_units = chosen_price
+
+    def _set_margin_pricing(self, base, price, clamp_max):
+        """
+        Sell at ``price`` when its margin over ``base`` is within the profit
+        bounds, otherwise at ``base`` (or ``price`` without ``clamp_max``)
+        plus the bound. Bounds are compared exactly, on the ratio itself.
+        """
+        difference = (price - base) * money.RATIO_SCALE
+        if difference < self.MIN_PROFIT_UNITS * base:
+            self.margin_units = self.MIN_PROFIT_UNITS
+        elif clamp_max and difference > self.MAX_PROFIT_UNITS * base:
+            self.margin_units = self.MAX_PROFIT_UNITS
+        else:
+            self.margin_units = money.get_ratio(price - base, base)
+            self.chosen_units = self.final_units = price
+            return
+        self.chosen_units = base if clamp_max else price
+        self.final_units = money.add_margin(self.chosen_units, self.margin_units)
 
     def get_candidate_suppliers(self):
-        supplier_prices = (
-            Collection.of(self.product.supplier_prices.all())
-            .filter(product=self.product)
-            .order_by("price")
-            .get()
-        )
+        if self.stock_index is not None:
+            return self._get_allocated_suppliers()
+
         selected_suppliers = []
         leftover = self.quantity
-        for supplier_price in supplier_prices:
+        for supplier_price in self.get_supplier_prices():
             available_stock = supplier_price.available_stock
             price = supplier_price.price
             if available_stock > 0 and leftover > 0:
@@ -212,79 +213,302 @@ class RFQAnalyzer:
                 leftover = leftover - purchased_stock
                 selected_suppliers.append(
                     CandidateSupplierPrice(
-                        supplier_price=supplier_price,
+                        supplier_price_id=supplier_price.id,
                         available_stock=available_stock,
                         purchased_stock=purchased_stock,
                         remaining_stock=(available_stock - purchased_stock),
                         price=price,
-                        total=(price * purchased_stock),
+                        supplier_id=supplier_price.supplier_id,
                     )
                 )
 
         self.supplier_prices = selected_suppliers
         return self
 
-    def get_po_histories(self):
-        return Collection.of(self.customer.POs.all()).filter(product=self.product).get()
-
-    def set_profit_margin(self, quantity):
+    def get_supplier_prices(self):
+        return (
+            Collection.of(self.product.supplier_prices.filter(latest=True))
+            .filter(product_id=self.product.id)
+            .order_by("price")
+            .get()
+        )
 
-        if quantity > self.MAX_AMOUNT_FOR_MIN_PROFIT:
-            margin = self.MIN_PROFIT * 100
-        elif quantity < self.MIN_AMOUNT_FOR_MAX_PROFIT:
-            margin = self.MAX_PROFIT * 100
-        else:
+    def _get_allocated_suppliers(self):
+        self.supplier_prices = [
+            CandidateSupplierPrice(
+                supplier_price_id=allocation.supplier_price_id,
+                available_stock=allocation.available_stock,
+                purchased_stock=allocation.purchased_stock,
+                remaining_stock=allocation.remaining_stock,
+                price=allocation.price,
+            )
+            for allocation in self.stock_index.allocate(self.product.id, self.quantity)
+        ]
+        return self
 
-            margin = (self.MAX_PROFIT * 100) - (
-                (quantity - self.MIN_AMOUNT_FOR_MAX_PROFIT)
-                * (
-                    ((self.MAX_PROFIT * 100) - (self.MIN_PROFIT * 100))
-                    / (self.MAX_AMOUNT_FOR_MIN_PROFIT - self.MIN_AMOUNT_FOR_MAX_PROFIT)
-                )
+    def get_po_summary(self):
+        summary = CustomerProductPriceSummary.objects.filter(
+            customer_id=self.customer.id, product_id=self.product.id
+        ).first()
+        if summary is None:
+            # No PO history yet
+            summary = CustomerProductPriceSummary(
+                customer=self.customer, product=self.product
             )
-        self.profit_margin = decimal.Decimal(margin) / 100
+        return summary
 
-    def set_note(self, note):
-        self.note = note
-        return self
+    def set_profit_margin(self, quantity):
+        self.margin_units = self.get_margin_policy().get_margin_units(
+            quantity, customer_id=self.customer.id, product_id=self.product.id
+        )
+        self.profit_margin = money.from_ratio_units(self.margin_units)
+
+    def get_margin_policy(self) -> MarginPolicy:
+        if self.margin_policy is None:
+            self.margin_policy = self.load_margin_policy()
+        return self.margin_policy
+
+    @classmethod
+    def load_margin_policy(cls) -> MarginPolicy:
+        return MarginPolicy.load(default=cls.get_default_margin_curve())
+
+    @classmethod
+    def get_default_margin_curve(cls) -> MarginCurve:
+        return MarginCurve(
+            quantities=[cls.MIN_AMOUNT_FOR_MAX_PROFIT, cls.MAX_AMOUNT_FOR_MIN_PROFIT],
+            margins=[
+                decimal.Decimal(str(cls.MAX_PROFIT)),
+                decimal.Decimal(str(cls.MIN_PROFIT)),
+            ],
+            interpolation=MarginCurve.LINEAR,
+        )
+
+    @classmethod
+    def get_profit_margin(cls, quantity) -> decimal.Decimal:
+        """
+        Profit margin of ``quantity`` on the default curve.
+        """
+        return MarginPolicy(default=cls.get_default_margin_curve()).get_margin(quantity)
 
 
 class SupplierRecommender:
     """
     - Take the lowest price of supplier
     - Buy with more volume cheaper than buy few
+    - With ``landed_cost``, the lowest price includes the freight to the
+      customer, see ``LogisticRecommender``
+    - With ``basket_budget`` (seconds), the RFQs of a customer in a batch are
+      allocated together on landed cost, see ``BasketAllocator``
+    - RFQs take stock in ``priority`` order, see ``PRIORITIES``
+    - With ``reserve_stock``, only RFQs without transactions are priced, and
+      what they bought is taken out of the supplier prices in the database
+      transaction that writes them, see ``reserving``
+    - With ``profile``, the time and queries of every phase are recorded in
+      ``profiler``, see ``PricingProfiler``
     """
 
-    def handle(self):
+    # RFQ ordering of every priority, ties go to the oldest RFQ
+    PRIORITIES = {
+        "id": ["id"],
+        "created": ["created", "id"],
+        "tier": ["-customer__tier", "created", "id"],
+        # Then by expected margin, see ``sort_by_margin``
+        "margin": ["created", "id"],
+    }
+
+    # Fields of the RFQs ``sort_by_margin`` sorts
+    MARGIN_FIELDS = ["id", "product_id", "customer_id", "quantity", "cheapest_price"]
+
+    def __init__(
+        self,
+        batch_size=1000,
+        flush_size=1000,
+        update_conflicts=False,
+        landed_cost=False,
+        basket_budget=None,
+        handling_cost=0,
+        priority="id",
+        reserve_stock=False,
+        profile=False,
+    ):
+        if priority not in self.PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}")
+        self.batch_size = batch_size
+        self.priority = priority
+        self.reserve_stock = reserve_stock
+        # Supplier prices whose stock the run reserved
+        self.reserved = 0
+        self.rfq_count = 0
+        # RFQs and seconds of every batch
+        self.batch_timings: List[Tuple[int, float]] = []
+        self.queries = 0
+        self.peak_rss_mb = None
+        self.profiler = PricingProfiler() if profile else None
+        self.margin_policy: MarginPolicy | None = None
+        basket = basket_budget is not None
+        self.stock_index = StockAllocationIndex(
+            logistics=LogisticRecommender().load() if landed_cost or basket else None,
+            # Held until the reservation, see ``reserving``
+            lock=reserve_stock,
+        )
+        self.basket_allocator = (
+            BasketAllocator(
+                self.stock_index,
+                time_budget=basket_budget,
+                handling_cost=handling_cost,
+            )
+            if basket
+            else None
+        )
+        self.writer = TransactionWriter(
+            flush_size=flush_size, update_conflicts=update_conflicts
+        )
+
+    def handle(self, rfqs=None):
+        from .batch_pricing import BatchPricingEngine
 
         # Look at RFQ, where they want to ask for pricing
-        request_for_quotations = (
-            RFQ.objects.select_related("product", "customer")
-            .prefetch_related(
-                Prefetch(
-                    "customer__POs", queryset=PO.objects.select_related("product")
-                ),
-                "product__supplier_prices",
-            )
-            .only(
-                "quantity",
-                "product__sku",
-                "customer__code",
+        rfqs = RFQ.objects.all() if rfqs is None else rfqs
+        rfq_ids = self.get_rfq_ids(rfqs)
+
+        counter = QueryCounter()
+        with (
+            self.reserving(),
+            connection.execute_wrapper(counter),
+            self.profile_queries(),
+            self.writer,
+        ):
+            for start in range(0, len(rfq_ids), self.batch_size):
+                started_at = time.perf_counter()
+                batch = rfq_ids[start : start + self.batch_size]
+                if self.reserve_stock:
+                    batch = self.lock_stock(
+                        batch,
+                        RFQ.objects.filter(pk__in=batch)
+                        .values_list("product_id", flat=True)
+                        .distinct(),
+                    )
+                engine = BatchPricingEngine(
+                    RFQ.objects.filter(pk__in=batch),
+                    stock_index=self.stock_index,
+                    basket_allocator=self.basket_allocator,
+                    rfq_ids=batch,
+                    profiler=self.profiler,
+                    margin_policy=self.get_margin_policy(),
+                ).handle()
+                with self.profile("write", len(batch)):
+                    self.writer.extend(engine.get_transactions())
+                self.batch_timings.append(
+                    (len(batch), time.perf_counter() - started_at)
+                )
+            with self.profile("write", 0):
+                self.writer.flush()
+
+        self.rfq_count = len(rfq_ids)
+        self.queries = counter.count
+        self.peak_rss_mb = get_peak_rss_mb()
+        return self
+
+    def get_margin_policy(self) -> MarginPolicy:
+        # Loaded once per run, every batch uses the same curves
+        if self.margin_policy is None:
+            self.margin_policy = RFQAnalyzer.load_margin_policy()
+        return self.margin_policy
+
+    @contextlib.contextmanager
+    def reserving(self):
+        """
+        With ``reserve_stock``, the transactions of the run and the stock they
+        take are committed together, a failed run leaves both untouched.
+        """
+        if not self.reserve_stock:
+            yield
+            return
+        with transaction.atomic():
+            yield
+            self.reserved = self.reserve_stocks()
+
+    def lock_stock(self, rfq_ids, product_ids) -> List[int]:
+        """
+        Load and lock the stock of ``product_ids``, then drop the RFQs of
+        ``rfq_ids`` a concurrent run decided while this one waited for it.
+        """
+        self.stock_index.load(product_ids)
+        undecided = set(
+            self.exclude_decided(RFQ.objects.filter(pk__in=rfq_ids)).values_list(
+                "id", flat=True
             )
-            .iterator(chunk_size=100)
+        )
+        return [rfq_id for rfq_id in rfq_ids if rfq_id in undecided]
+
+    def profile(self, phase, rfqs):
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.phase(phase, rfqs)
+
+    def profile_queries(self):
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return connection.execute_wrapper(self.profiler)
+
+    def order_rfqs(self, rfqs, *leading):
+        """
+        RFQs to price in ``priority`` order, after the ``leading`` fields.
+        The expected margin is not known to the database, with the ``margin``
+        priority the RFQs are sorted on it by ``sort_by_margin``.
+        """
+        if self.reserve_stock:
+            rfqs = self.exclude_decided(rfqs)
+        if self.priority == "margin":
+            rfqs = rfqs.annotate(cheapest_price=self.get_cheapest_price())
+        return rfqs.order_by(*leading, *self.PRIORITIES[self.priority])
+
+    def get_rfq_ids(self, rfqs) -> List[int]:
+        rfqs = self.order_rfqs(rfqs)
+        if self.priority != "margin":
+            return list(rfqs.values_list("id", flat=True))
+        rows = self.sort_by_margin(list(rfqs.values_list(*self.MARGIN_FIELDS)))
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def exclude_decided(rfqs):
+        # Decided RFQs already hold their stock
+        return rfqs.exclude(Exists(Transaction.objects.filter(rfq=OuterRef("pk"))))
+
+    @staticmethod
+    def get_cheapest_price():
+        return Subquery(
+            SupplierPrice.objects.filter(product=OuterRef("product"), latest=True)
+            .order_by("price")
+            .values("price")[:1]
         )
 
-        for rfq in request_for_quotations:
-            analyzer = RFQAnalyzer(rfq).handle()
-            for supplier in analyzer.supplier_prices:
-                try:
-                    rfq.transactions.create(
-                        supplier_price=supplier.supplier_price,
-                        chosen_price=analyzer.chosen_price,
-                        final_price=analyzer.final_price,
-                        analyzed_profit_margin=analyzer.profit_margin,
-                        quantity=supplier.purchased_stock,
-                        note=analyzer.note,
-                    )
-                except django.db.utils.IntegrityError:
-                    continue
+    def sort_by_margin(self, rows):
+        """
+        Rows of ``MARGIN_FIELDS``, highest expected margin first: the profit
+        margin of the quantity on the margin curves of the run, times the
+        quantity at the cheapest supplier price of the product. Ties keep
+        their order.
+        """
+        if not rows:
+            return rows
+        _, product_ids, customer_ids, quantities, prices = zip(*rows)
+        margins = self.get_margin_policy().get_margins(
+            quantities, customer_ids, product_ids, units=True
+        )
+        expected = [
+            margin * quantity * (0 if price is None else money.to_units(price))
+            for margin, quantity, price in zip(margins, quantities, prices)
+        ]
+        order = sorted(range(len(rows)), key=lambda row: -expected[row])
+        return [rows[row] for row in order]
+
+    def reserve_stocks(self):
+        """
+        Write the stock taken in the run back to the supplier prices, in one
+        statement. Returns the number of supplier prices updated.
+        """
+        return SupplierPrice.reserve_stocks(self.stock_index.get_allocated_stocks())
+
+    def get_stats(self):
+        return self.writer.get_stats()
@@ -0,0 +1,286 @@
+import os
+
+from django.db import connection, transaction
+
+from bababos.pricing.models import CustomerProductPriceSummary, Region
+
+
+class SyntheticDataset:
+    """
+    Generate a large dataset inside PostgreSQL with ``generate_series``.
+
+    Every customer buys from a basket of ``basket_size`` products, so a
+    customer and product pair has a PO history like the real data has. All
+    codes and SKUs start with ``prefix``, and ``seed`` makes the dataset
+    reproducible.
+    """
+
+    def __init__(
+        self,
+        customers=1000,
+        products=5000,
+        suppliers=100,
+        purchase_orders_per_customer=100,
+        supplier_prices_per_product=3,
+        rfqs=1000,
+        basket_size=20,
+        prefix="SYN",
+        seed=0.42,
+    ):
+        self.customers = customers
+        self.products = products
+        self.suppliers = suppliers
+        self.purchase_orders_per_customer = purchase_orders_per_customer
+        self.supplier_prices_per_product = min(supplier_prices_per_product, suppliers)
+        self.rfqs = rfqs
+        self.basket_size = min(basket_size, products)
+        self.prefix = prefix
+        self.seed = seed
+
+    def get_params(self):
+        return {
+            "customers": self.customers,
+            "products": self.products,
+            "suppliers": self.suppliers,
+            "purchase_orders_per_customer": self.purchase_orders_per_customer,
+            "supplier_prices_per_product": self.supplier_prices_per_product,
+            "rfqs": self.rfqs,
+            "basket_size": self.basket_size,
+            "prefix": self.prefix,
+            "customer_code": f"{self.prefix}-C-%",
+            "supplier_code": f"{self.prefix}-S-%",
+            "sku": f"{self.prefix}-P-%",
+            "region_id": self.get_region().id,
+        }
+
+    def get_region(self):
+        return Region.objects.filter(parent=None).first() or Region.objects.create(
+            name="Synthetic"
+        )
+
+    @transaction.atomic
+    def generate(self):
+        params = self.get_params()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT setseed(%s)", [self.seed])
+            for statement in [
+                self.USERS,
+                self.CUSTOMERS,
+                self.SUPPLIERS,
+                self.PRODUCTS,
+                self.SUPPLIER_PRICES,
+                self.PURCHASE_ORDERS,
+                self.RFQS,
+            ]:
+                cursor.execute(statement, params)
+            CustomerProductPriceSummary.rebuild()
+            cursor.execute("ANALYZE")
+        return self
+
+    def export(self, directory):
+        """
+        Write the dataset as the CSV files read by ``feed``, return their
+        paths by importer name.
+        """
+        params = self.get_params()
+        paths = {}
+        with connection.cursor() as cursor:
+            for name, (filename, query) in self.EXPORTS.items():
+                paths[name] = os.path.join(directory, filename)
+                with open(paths[name], "w", newline="") as csv_file:
+                    cursor.copy_expert(
+                        f"COPY ({cursor.mogrify(query, params).decode()}) "
+                        f"TO STDOUT WITH CSV HEADER",
+                        csv_file,
+                    )
+        return paths
+
+    USERS = """
+        INSERT INTO auth_user (
+            password, is_superuser, username, first_name, last_name, email,
+            is_staff, is_active, date_joined
+        )
+        SELECT '!', false, lower(code), '', '', '', false, true, now()
+        FROM (
+            SELECT %(prefix)s || '-C-' || n AS code
+            FROM generate_series(1, %(customers)s) n
+            UNION ALL
+            SELECT %(prefix)s || '-S-' || n FROM generate_series(1, %(suppliers)s) n
+        ) codes
+    """
+
+    CUSTOMERS = """
+        INSERT INTO customers (created, modified, code, address, user_id, region_id)
+        SELECT now(), now(), upper(username), '', id, %(region_id)s
+        FROM auth_user
+        WHERE username LIKE lower(%(customer_code)s)
+    """
+
+    SUPPLIERS = """
+        INSERT INTO suppliers (created, modified, code, address, user_id, region_id)
+        SELECT now(), now(), upper(username), '', id, %(region_id)s
+        FROM auth_user
+        WHERE username LIKE lower(%(supplier_code)s)
+    """
+
+    PRODUCTS = """
+        INSERT INTO products (created, modified, sku, name)
+        SELECT now(), now(), %(prefix)s || '-P-' || n, 'Product ' || n
+        FROM generate_series(1, %(products)s) n
+    """
+
+    # Prices are spread around a base price per product, supplier prices
+    # mostly below it and PO prices mostly above it, so every branch of the
+    # analyzer runs
+    SUPPLIER_PRICES = """
+        WITH products AS (
+            SELECT id, row_number() OVER (ORDER BY id) AS n
+            FROM products WHERE sku LIKE %(sku)s
+        ),
+        suppliers AS (
+            SELECT array_agg(id ORDER BY id) AS ids, count(*) AS count
+            FROM suppliers WHERE code LIKE %(supplier_code)s
+        )
+        INSERT INTO supplier_prices (
+            created, modified, price, available_stock, product_id, supplier_id, latest
+        )
+        SELECT
+            now(), now(),
+            round(((100000 + products.id %% 900000) * (0.8 + random() * 0.3))::numeric, 5),
+            floor(random() * 200)::int,
+            products.id,
+            suppliers.ids[1 + (products.n * 7 + offset_n) %% suppliers.count],
+            true
+        FROM products
+        CROSS JOIN suppliers
+        CROSS JOIN generate_series(1, %(supplier_prices_per_product)s) offset_n
+    """
+
+    PURCHASE_ORDERS = """
+        WITH customers AS (
+            SELECT id, row_number() OVER (ORDER BY id) AS n
+            FROM customers WHERE code LIKE %(customer_code)s
+        ),
+        products AS (
+            SELECT array_agg(id ORDER BY id) AS ids, count(*) AS count
+            FROM products WHERE sku LIKE %(sku)s
+        ),
+        orders AS (
+            SELECT
+                customers.id AS customer_id,
+                products.ids[
+                    1 + (customers.n * 31 + floor(random() * %(basket_size)s)::int)
+                    %% products.count
+                ] AS product_id
+            FROM customers
+            CROSS JOIN products
+            CROSS JOIN generate_series(1, %(purchase_orders_per_customer)s)
+        )
+        INSERT INTO purchase_orders (
+            created, modified, ordered_at, quantity, unit, price, customer_id,
+            product_id
+        )
+        SELECT
+            now(), now(),
+            now() - random() * interval '730 days',
+            1 + floor(random() * 200)::int,
+            'Batang',
+            round(((100000 + product_id %% 900000) * (0.9 + random() * 0.6))::numeric, 5),
+            customer_id,
+            product_id
+        FROM orders
+    """
+
+    RFQS = """
+        WITH customers AS (
+            SELECT array_agg(id ORDER BY id) AS ids, count(*) AS count
+            FROM customers WHERE code LIKE %(customer_code)s
+        ),
+        products AS (
+            SELECT array_agg(id ORDER BY id) AS ids, count(*) AS count
+            FROM products WHERE sku LIKE %(sku)s
+        ),
+        requests AS (
+            SELECT 1 + floor(random() * customers.count)::int AS n
+            FROM customers
+            CROSS JOIN generate_series(1, %(rfqs)s)
+        )
+        INSERT INTO request_for_quotations (
+            created, modified, quantity, unit, customer_id, product_id
+        )
+        SELECT
+            now(), now(),
+            1 + floor(random() * 300)::int,
+            'Batang',
+            customers.ids[requests.n],
+            products.ids[
+                1 + (requests.n * 31 + floor(random() * %(basket_size)s)::int)
+                %% products.count
+            ]
+        FROM requests
+        CROSS JOIN customers
+        CROSS JOIN products
+    """
+
+    EXPORTS = {
+        "customers": (
+            "customer.csv",
+            """
+            SELECT customers.code AS "Customer ID", customers.address AS "Address",
+                regions.name AS "City", '' AS "State"
+            FROM customers JOIN regions ON regions.id = customers.region_id
+            WHERE customers.code LIKE %(customer_code)s
+            ORDER BY customers.id
+            """,
+        ),
+        "suppliers": (
+            "supplier.csv",
+            """
+            SELECT suppliers.code AS "Supplier_id", suppliers.address AS "Address",
+                regions.name AS "City", '' AS "State", '' AS "x"
+            FROM suppliers JOIN regions ON regions.id = suppliers.region_id
+            WHERE suppliers.code LIKE %(supplier_code)s
+            ORDER BY suppliers.id
+            """,
+        ),
+        "rfqs": (
+            "rfq-customer.csv",
+            """
+            SELECT customers.code AS "Customer ID", products.sku AS "SKU ID",
+                rfqs.quantity AS "Quantity", rfqs.unit AS "Unit"
+            FROM request_for_quotations rfqs
+            JOIN customers ON customers.id = rfqs.customer_id
+            JOIN products ON products.id = rfqs.product_id
+            WHERE customers.code LIKE %(customer_code)s
+            ORDER BY rfqs.id
+            """,
+        ),
+        "pricelist": (
+            "pricelist.csv",
+            """
+            SELECT suppliers.code AS "Supplier ID", products.sku AS "SKU ID",
+                supplier_prices.price AS "Price/unit",
+                supplier_prices.available_stock AS "Stock Available"
+            FROM supplier_prices
+            JOIN suppliers ON suppliers.id = supplier_prices.supplier_id
+            JOIN products ON products.id = supplier_prices.product_id
+            WHERE suppliers.code LIKE %(supplier_code)s AND supplier_prices.latest
+            ORDER BY supplier_prices.id
+            """,
+        ),
+        "purchase_orders": (
+            "historical-po.csv",
+            """
+            SELECT customers.code AS "customer ID",
+                to_char(orders.ordered_at, 'DD/MM/YYYY') AS "order date",
+                products.sku AS "sku_code", products.sku AS "SKU id",
+                products.name AS "sku_name", orders.quantity AS "order_qty",
+                orders.unit AS "order_unit", orders.price AS "unit_selling_price"
+            FROM purchase_orders orders
+            JOIN customers ON customers.id = orders.customer_id
+            JOIN products ON products.id = orders.product_id
+            WHERE customers.code LIKE %(customer_code)s
+            ORDER BY orders.id
+            """,
+        ),
+    }
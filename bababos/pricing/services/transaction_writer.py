@@ -0,0 +1,98 @@
+from typing import Iterable, List
+
+from bababos.pricing.models import Transaction
+
+
+class TransactionWriter:
+    """
+    Buffer ``Transaction`` rows and write them with one ``bulk_create``
+    per ``flush_size`` rows.
+
+    Rows already stored for the same ``(rfq, supplier_price)`` are skipped,
+    or overwritten when ``update_conflicts`` is set.
+    """
+
+    UNIQUE_FIELDS = ["rfq", "supplier_price"]
+    UPDATE_FIELDS = [
+        "chosen_price",
+        "final_price",
+        "analyzed_profit_margin",
+        "quantity",
+        "freight",
+        "rule",
+        "modified",
+    ]
+
+    def __init__(self, flush_size=1000, update_conflicts=False):
+        self.flush_size = flush_size
+        self.update_conflicts = update_conflicts
+
+        self.buffer: List[Transaction] = []
+        self.inserted = 0
+        self.skipped = 0
+        self.updated = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def add(self, transaction: Transaction):
+        self.buffer.append(transaction)
+        if len(self.buffer) >= self.flush_size:
+            self.flush()
+        return self
+
+    def extend(self, transactions: Iterable[Transaction]):
+        for transaction in transactions:
+            self.add(transaction)
+        return self
+
+    def flush(self):
+        if not self.buffer:
+            return self
+
+        # The same key twice in one statement is rejected by
+        # ON CONFLICT DO UPDATE, keep only one row per key.
+        rows = {}
+        for transaction in self.buffer:
+            key = (transaction.rfq_id, transaction.supplier_price_id)
+            if self.update_conflicts or key not in rows:
+                rows[key] = transaction
+        duplicates = len(self.buffer) - len(rows)
+        self.buffer = []
+
+        existing = set(
+            Transaction.objects.filter(
+                rfq_id__in={rfq_id for rfq_id, _ in rows},
+                supplier_price_id__in={
+                    supplier_price_id for _, supplier_price_id in rows
+                },
+            ).values_list("rfq_id", "supplier_price_id")
+        )
+        conflicts = len(existing.intersection(rows))
+
+        if self.update_conflicts:
+            Transaction.objects.bulk_create(
+                rows.values(),
+                update_conflicts=True,
+                unique_fields=self.UNIQUE_FIELDS,
+                update_fields=self.UPDATE_FIELDS,
+            )
+            self.updated += conflicts
+        else:
+            Transaction.objects.bulk_create(rows.values(), ignore_conflicts=True)
+            self.skipped += conflicts
+
+        self.skipped += duplicates
+        self.inserted += len(rows) - conflicts
+        return self
+
+    def get_stats(self):
+        return {
+            "inserted": self.inserted,
+            "skipped": self.skipped,
+            "updated": self.updated,
+        }
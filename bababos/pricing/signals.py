@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bababos.pricing.models import (
+    PO,
+    CustomerProductPriceSummary,
+    MarginCurve,
+    SupplierPrice,
+)
+from bababos.pricing.services import pricing_cache
+
+
+@receiver([post_save, post_delete], sender=SupplierPrice)
+def invalidate_supplier_prices(sender, instance, **kwargs):
+    pricing_cache.invalidate_product(instance.product_id)
+
+
+@receiver(post_save, sender=PO)
+def summarize_saved_purchase_order(sender, instance, created, **kwargs):
+    if created:
+        CustomerProductPriceSummary.add(instance)
+    else:
+        CustomerProductPriceSummary.refresh(
+            [(instance.customer_id, instance.product_id)]
+        )
+
+
+@receiver(post_delete, sender=PO)
+def summarize_deleted_purchase_order(sender, instance, **kwargs):
+    CustomerProductPriceSummary.refresh([(instance.customer_id, instance.product_id)])
+
+
+@receiver([post_save, post_delete], sender=PO)
+def invalidate_po_histories(sender, instance, **kwargs):
+    pricing_cache.invalidate_customer(instance.customer_id)
+
+
+@receiver([post_save, post_delete], sender=MarginCurve)
+def invalidate_margin_policy(sender, instance, **kwargs):
+    pricing_cache.invalidate_margin_policy()
@@ -0,0 +1,163 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
+
+from babel.numbers import format_currency
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from parameterized import parameterized
+
+from bababos.pricing.management.commands.analyze import Command
+from bababos.pricing.models import (
+    CustomerFactory,
+    POFactory,
+    ProductFactory,
+    RFQFactory,
+    SupplierFactory,
+    SupplierPriceFactory,
+)
+from bababos.pricing.services import RFQReport, SupplierRecommender
+
+
+class TestAnalyze(TestCase):
+    def setUp(self) -> None:
+        customer = CustomerFactory(code="C-1")
+        self.products = [ProductFactory(sku=f"SKU-{i}") for i in range(2)]
+        for product in self.products:
+            for price in [800_000, 820_000]:
+                POFactory(customer=customer, product=product, quantity=1, price=price)
+            for price in [700_000, 710_000]:
+                SupplierPriceFactory(
+                    supplier=SupplierFactory(),
+                    product=product,
+                    price=price,
+                    available_stock=10,
+                )
+        self.rfqs = [
+            RFQFactory(customer=customer, product=self.products[0], quantity=15),
+            RFQFactory(customer=customer, product=self.products[1], quantity=5),
+            RFQFactory(customer=customer, product=self.products[1], quantity=20),
+        ]
+        SupplierRecommender().handle()
+
+    def test_rfq_queries(self):
+        stdout = io.StringIO()
+
+        # RFQ, PO histories, supplier prices and transactions
+        with self.assertNumQueries(4):
+            call_command("analyze", self.rfqs[0].id, stdout=stdout)
+
+        self.assertIn("## Transactions", stdout.getvalue())
+
+    @parameterized.expand(
+        [
+            ("integer", Decimal("1968468")),
+            ("cents", Decimal("1968468.46800")),
+            ("round_up", Decimal("0.005")),
+            ("negative", Decimal("-12500.5")),
+        ]
+    )
+    def test_format_currency(self, _, amount):
+        self.assertEqual(
+            Command.format_currency(amount),
+            format_currency(amount, "IDR", locale="id_ID"),
+        )
+
+    @parameterized.expand([("one_chunk", 1000, 5), ("chunk_per_rfq", 1, 13)])
+    def test_report_queries(self, _, chunk_size, queries):
+        report = RFQReport(chunk_size=chunk_size)
+
+        with self.assertNumQueries(queries):
+            rows = list(report)
+
+        # The second RFQ has no price, it is reported without transactions
+        # and the third one buys the stock it left
+        self.assertEqual(
+            [(row.rfq_id, row.purchased) for row in rows],
+            [
+                (self.rfqs[0].id, 10),
+                (self.rfqs[0].id, 5),
+                (self.rfqs[1].id, None),
+                (self.rfqs[2].id, 10),
+                (self.rfqs[2].id, 10),
+            ],
+        )
+        self.assertEqual(rows[2][9:], (None,) * 10)
+        self.assertEqual(
+            rows[0]._replace(last_po_price=None)[:9],
+            (
+                self.rfqs[0].id,
+                "C-1",
+                "SKU-0",
+                15,
+                self.rfqs[0].unit,
+                2,
+                None,
+                2,
+                700_000,
+            ),
+        )
+        self.assertIn(rows[0].last_po_price, [800_000, 820_000])
+        self.assertEqual(
+            [row.rule for row in rows],
+            ["po_multiple_suppliers"] * 2 + [None] + ["po_multiple_suppliers"] * 2,
+        )
+
+    def test_csv(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "report.csv")
+            call_command(
+                "analyze",
+                "--range",
+                self.rfqs[1].id,
+                self.rfqs[2].id,
+                "--format",
+                "csv",
+                "--output",
+                path,
+                stdout=io.StringIO(),
+            )
+            with open(path, newline="") as csv_file:
+                rows = list(csv.DictReader(csv_file))
+
+        self.assertEqual(
+            [(row["rfq_id"], row["purchased"]) for row in rows],
+            [
+                (str(self.rfqs[1].id), ""),
+                (str(self.rfqs[2].id), "10"),
+                (str(self.rfqs[2].id), "10"),
+            ],
+        )
+        self.assertEqual(rows[0]["lowest_supplier_price"], "700000.00000")
+        self.assertEqual(rows[1]["rule"], "po_multiple_suppliers")
+
+    def test_json(self):
+        stdout = io.StringIO()
+
+        call_command(
+            "analyze",
+            self.rfqs[0].id,
+            self.rfqs[1].id,
+            "--format",
+            "json",
+            stdout=stdout,
+        )
+
+        rows = json.loads(stdout.getvalue())
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["chosen_price"], "700000.00000")
+        self.assertIsNone(rows[2]["transaction_id"])
+
+    def test_table(self):
+        stdout = io.StringIO()
+
+        call_command("analyze", self.rfqs[0].id, self.rfqs[1].id, stdout=stdout)
+
+        self.assertIn("Rp700.000,00", stdout.getvalue())
+
+    def test_nothing_to_analyze(self):
+        with self.assertRaises(CommandError):
+            call_command("analyze", stdout=io.StringIO())
@@ -0,0 +1,183 @@
+import io
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from bababos.pricing.models import (
+    CustomerFactory,
+    LogisticFactory,
+    LogisticPriceFactory,
+    POFactory,
+    ProductFactory,
+    RegionFactory,
+    RFQFactory,
+    SupplierFactory,
+    SupplierPriceFactory,
+    Transaction,
+)
+from bababos.pricing.services import (
+    BasketAllocator,
+    LogisticRecommender,
+    SupplierRecommender,
+)
+from bababos.pricing.services.basket_allocation import BasketLine
+from bababos.pricing.services.stock_allocation import StockAllocationIndex
+
+
+class TestBasketAllocator(TestCase):
+    def setUp(self) -> None:
+        self.warehouse = RegionFactory(name="Cilincing")
+        self.destination = RegionFactory(name="Kabupaten Bekasi")
+        LogisticPriceFactory(
+            logistic=LogisticFactory(fleet_type="Tronton", capacity=100),
+            source=self.warehouse,
+            destination=self.destination,
+            price=1000,
+        )
+
+        self.products = [ProductFactory(sku=f"SKU-{i}") for i in range(2)]
+        suppliers = [SupplierFactory(region=self.warehouse) for _ in range(3)]
+        # The first supplier has both products, each of the others is cheaper
+        # for one of them
+        self.supplier_prices = {
+            (supplier, product): SupplierPriceFactory(
+                supplier=suppliers[supplier],
+                product=self.products[product],
+                price=price,
+                available_stock=15,
+            )
+            for supplier, product, price in [
+                (0, 0, 100),
+                (0, 1, 120),
+                (1, 0, 95),
+                (2, 1, 115),
+            ]
+        }
+        self.lines = [
+            BasketLine(rfq_id=1, product_id=self.products[0].id, quantity=10),
+            BasketLine(rfq_id=2, product_id=self.products[1].id, quantity=10),
+        ]
+
+    def get_allocator(self, **kwargs):
+        stock_index = StockAllocationIndex(logistics=LogisticRecommender().load())
+        return BasketAllocator(stock_index, **kwargs)
+
+    def get_allocated(self, allocations):
+        supplier_prices = {
+            supplier_price.id: key
+            for key, supplier_price in self.supplier_prices.items()
+        }
+        return {
+            rfq_id: [
+                (
+                    supplier_prices[allocation.supplier_price_id],
+                    allocation.purchased_stock,
+                    allocation.freight,
+                )
+                for allocation in rfq_allocations
+            ]
+            for rfq_id, rfq_allocations in allocations.items()
+        }
+
+    def test_consolidate(self):
+        allocator = self.get_allocator()
+
+        allocations = allocator.allocate(self.lines, self.destination.id)
+
+        # One trip for both RFQs costs less than a trip from each cheaper one
+        self.assertEqual(
+            self.get_allocated(allocations),
+            {1: [((0, 0), 10, Decimal(50))], 2: [((0, 1), 10, Decimal(50))]},
+        )
+        self.assertEqual(
+            allocator.get_stats(),
+            {"baskets": 1, "consolidated": 1, "over_budget": 0, "saved": Decimal(900)},
+        )
+        self.assertEqual(
+            allocator.stock_index.get_remaining_stocks()[self.supplier_prices[0, 0].id],
+            5,
+        )
+
+    def test_over_budget(self):
+        allocator = self.get_allocator(time_budget=0)
+
+        allocations = allocator.allocate(self.lines, self.destination.id)
+
+        self.assertEqual(allocator.over_budget, 1)
+        self.assertEqual(
+            self.get_allocated(allocations),
+            {1: [((1, 0), 10, Decimal(100))], 2: [((2, 1), 10, Decimal(100))]},
+        )
+        self.assertEqual(
+            allocator.stock_index.get_remaining_stocks(),
+            {
+                self.supplier_prices[0, 0].id: 15,
+                self.supplier_prices[0, 1].id: 15,
+                self.supplier_prices[1, 0].id: 5,
+                self.supplier_prices[2, 1].id: 5,
+            },
+        )
+
+    def test_keep_cheaper_rfq_allocations(self):
+        LogisticPriceFactory(
+            logistic=LogisticFactory(fleet_type="Pickup", capacity=1),
+            source=self.warehouse,
+            destination=self.destination,
+            price=1,
+        )
+        allocator = self.get_allocator(handling_cost=0)
+
+        allocations = allocator.allocate(self.lines, self.destination.id)
+
+        # Freight is 1 per unit, the cheapest supplier of each RFQ wins
+        self.assertEqual(
+            self.get_allocated(allocations),
+            {1: [((1, 0), 10, Decimal(1))], 2: [((2, 1), 10, Decimal(1))]},
+        )
+        self.assertEqual(allocator.consolidated, 0)
+
+    def test_share_stock(self):
+        allocator = self.get_allocator()
+        lines = [*self.lines, BasketLine(3, self.products[0].id, 10)]
+
+        allocations = allocator.allocate(lines, self.destination.id)
+
+        self.assertEqual(
+            sum(a.purchased_stock for a in allocations[1] + allocations[3]), 20
+        )
+        self.assertEqual(
+            sum(allocator.stock_index.get_remaining_stocks().values()), 60 - 30
+        )
+
+    def test_requires_logistics(self):
+        with self.assertRaises(ValueError):
+            BasketAllocator(StockAllocationIndex())
+
+    def test_decide_basket(self):
+        customer = CustomerFactory(region=self.destination)
+        for product in self.products:
+            POFactory(customer=customer, product=product, quantity=1, price=400)
+            RFQFactory(customer=customer, product=product, quantity=10)
+
+        stdout = io.StringIO()
+        call_command("decide", "--basket", stdout=stdout)
+
+        self.assertIn("Baskets: 1, 1 consolidated saving 900", stdout.getvalue())
+        self.assertEqual(
+            list(
+                Transaction.objects.order_by("rfq_id").values_list(
+                    "supplier_price_id", "chosen_price", "freight"
+                )
+            ),
+            [
+                (self.supplier_prices[0, 0].id, Decimal(150), Decimal(50)),
+                (self.supplier_prices[0, 1].id, Decimal(170), Decimal(50)),
+            ],
+        )
+
+    def test_supplier_recommender_basket(self):
+        recommender = SupplierRecommender(basket_budget=1, handling_cost=500)
+
+        self.assertIsNotNone(recommender.stock_index.logistics)
+        self.assertEqual(recommender.basket_allocator.handling_cost, 500)
@@ -0,0 +1,382 @@
+import random
+from decimal import Decimal
+
+from django.test import TestCase
+from parameterized import parameterized
+
+from bababos.pricing.models import (
+    RFQ,
+    CustomerFactory,
+    LogisticFactory,
+    LogisticPriceFactory,
+    POFactory,
+    ProductFactory,
+    RegionFactory,
+    RFQFactory,
+    SupplierFactory,
+    SupplierPriceFactory,
+    Transaction,
+)
+from bababos.pricing.services import SupplierRecommender
+from bababos.pricing.services.batch_pricing import BatchPricingEngine
+from bababos.pricing.services.stock_allocation import StockAllocationIndex
+from bababos.pricing.services.supplier_recommender import RFQAnalyzer
+
+
+class TestBatchPricingEngine(TestCase):
+    def setUp(self) -> None:
+        self.product = ProductFactory(sku="SKU-1")
+        self.customer = CustomerFactory()
+
+    def assertSameDecisions(self, rfqs, engine):
+        """
+        The batch result of every RFQ, and the rule that decided it, must be
+        exactly what ``RFQAnalyzer`` gives when the RFQs share stock in ID
+        order.
+        """
+        stock_index = StockAllocationIndex()
+        for rfq in sorted(rfqs, key=lambda rfq: rfq.id):
+            decision = engine.decisions.loc[rfq.id]
+            analyzer = RFQAnalyzer(
+                RFQ.objects.get(pk=rfq.id), stock_index=stock_index
+            ).handle()
+
+            self.assertEqual(decision["chosen_price"], analyzer.chosen_price)
+            self.assertEqual(decision["final_price"], analyzer.final_price)
+            self.assertEqual(decision["analyzed_profit_margin"], analyzer.profit_margin)
+            self.assertEqual(decision["rule"], analyzer.rule.rule_id)
+
+            allocations = engine.allocations[engine.allocations["rfq_id"] == rfq.id]
+            self.assertEqual(
+                list(allocations["supplier_price_id"]),
+                [candidate.supplier_price_id for candidate in analyzer.supplier_prices],
+            )
+            self.assertEqual(
+                list(allocations["purchased_stock"]),
+                [candidate.purchased_stock for candidate in analyzer.supplier_prices],
+            )
+
+    @parameterized.expand(
+        [
+            ("single_po_single_supplier_lower", 500, [700_000], [(730_000, 500)]),
+            ("single_po_single_supplier_equal", 5, [730_000], [(730_000, 5)]),
+            ("single_po_single_supplier_min_clamp", 500, [740_000], [(730_000, 500)]),
+            ("single_po_single_supplier_max_clamp", 5, [1_500_000], [(730_000, 5)]),
+            ("single_po_single_supplier_keep_po", 5, [900_000], [(730_000, 5)]),
+            ("single_po_single_supplier_on_min", 5, [803_000], [(730_000, 5)]),
+            ("single_po_single_supplier_on_max", 5, [1_095_000], [(730_000, 5)]),
+            (
+                "single_po_higher_bids",
+                500,
+                [700_000],
+                [(730_000, 300), (750_000, 200)],
+            ),
+            (
+                "single_po_equal_bid",
+                500,
+                [700_000],
+                [(700_000, 300), (700_000, 200)],
+            ),
+            (
+                "single_po_lower_unique_bid",
+                500,
+                [800_000],
+                [(700_000, 300), (700_000, 200)],
+            ),
+            (
+                "single_po_multiple_bids_min_clamp",
+                500,
+                [800_000],
+                [(730_000, 300), (750_000, 200)],
+            ),
+            (
+                "single_po_multiple_bids_keep_po",
+                500,
+                [1_000_000],
+                [(730_000, 300), (750_000, 200)],
+            ),
+            ("unique_po_equal_supplier", 500, [600_000, 600_000], [(600_000, 500)]),
+            ("unique_po_greater_supplier", 500, [600_000, 600_000], [(750_000, 500)]),
+            ("unique_po_lower_supplier", 500, [800_000, 800_000], [(750_000, 500)]),
+            ("po_lower_supplier", 500, [800_000, 900_000], [(750_000, 500)]),
+            ("po_greater_supplier", 500, [600_000, 700_000], [(750_000, 500)]),
+            ("po_between_supplier", 500, [600_000, 800_000], [(750_000, 500)]),
+            ("po_on_min_supplier", 500, [750_000, 800_000], [(750_000, 500)]),
+            (
+                "po_multiple_suppliers",
+                500,
+                [600_000, 800_000],
+                [(730_000, 300), (750_000, 200)],
+            ),
+            (
+                "no_po_multiple_suppliers",
+                500,
+                [],
+                [(730_000, 300), (750_000, 200)],
+            ),
+            ("no_po_single_supplier", 500, [], [(730_000, 500)]),
+            ("single_po_no_supplier", 500, [700_000], []),
+            ("out_of_stock", 500, [700_000, 800_000], [(730_000, 0)]),
+            (
+                "partial_stock",
+                500,
+                [700_000],
+                [(750_000, 100), (730_000, 100), (740_000, 0)],
+            ),
+        ]
+    )
+    def test_same_as_rfq_analyzer(self, _, rfq_qty, po_prices, suppliers):
+        for price in po_prices:
+            POFactory(
+                customer=self.customer, product=self.product, quantity=1, price=price
+            )
+        for price, stock in suppliers:
+            SupplierPriceFactory(
+                supplier=SupplierFactory(),
+                product=self.product,
+                price=price,
+                available_stock=stock,
+            )
+        rfq = RFQFactory(customer=self.customer, product=self.product, quantity=rfq_qty)
+
+        engine = BatchPricingEngine(RFQ.objects.filter(pk=rfq.pk)).handle()
+
+        self.assertSameDecisions([rfq], engine)
+
+        # Without a shared index the analyzer sees the same full stock
+        analyzer = RFQAnalyzer(RFQ.objects.get(pk=rfq.pk)).handle()
+        self.assertEqual(
+            engine.decisions.loc[rfq.id]["chosen_price"], analyzer.chosen_price
+        )
+
+    def test_unpriced_rfq_gives_stock_back(self):
+        # Two PO prices over the supplier price, the first RFQ is unpriced
+        for price in [800_000, 900_000]:
+            POFactory(
+                customer=self.customer, product=self.product, quantity=1, price=price
+            )
+        other = CustomerFactory()
+        POFactory(customer=other, product=self.product, quantity=1, price=700_000)
+        supplier_price = SupplierPriceFactory(
+            supplier=SupplierFactory(),
+            product=self.product,
+            price=730_000,
+            available_stock=30,
+        )
+        rfqs = [
+            RFQFactory(customer=customer, product=self.product, quantity=20)
+            for customer in [self.customer, other]
+        ]
+
+        engine = BatchPricingEngine().handle()
+
+        self.assertSameDecisions(rfqs, engine)
+        self.assertEqual(engine.decisions.loc[rfqs[0].id, "rule"], "po_lower_supplier")
+        self.assertEqual(
+            [(t.rfq_id, t.quantity) for t in engine.get_transactions()],
+            [(rfqs[1].id, 20)],
+        )
+        self.assertEqual(
+            engine.stock_index.get_allocated_stocks(), {supplier_price.id: 20}
+        )
+
+    @parameterized.expand(
+        [("min", 803_000, Decimal("0.1")), ("max", 1_095_000, Decimal("0.5"))]
+    )
+    def test_margin_on_profit_bound(self, _, po_price, margin):
+        # Exactly 10% or 50% over the supplier price, the PO price is kept
+        POFactory(
+            customer=self.customer, product=self.product, quantity=1, price=po_price
+        )
+        SupplierPriceFactory(
+            supplier=SupplierFactory(),
+            product=self.product,
+            price=730_000,
+            available_stock=5,
+        )
+        RFQFactory(customer=self.customer, product=self.product, quantity=5)
+
+        decision = BatchPricingEngine().handle().decisions.iloc[0]
+
+        self.assertEqual(
+            (
+                decision["chosen_price"],
+                decision["final_price"],
+                decision["analyzed_profit_margin"],
+            ),
+            (po_price, po_price, margin),
+        )
+
+    def test_same_as_rfq_analyzer_on_random_batch(self):
+        randomizer = random.Random(7)
+        products = [ProductFactory(sku=f"SKU-R{i}") for i in range(6)]
+        customers = [
+            CustomerFactory(code=f"C{i}", user__username=f"customer-{i}")
+            for i in range(4)
+        ]
+        suppliers = [
+            SupplierFactory(code=f"S{i}", user__username=f"supplier-{i}")
+            for i in range(5)
+        ]
+        prices = [700_000, 730_000, 750_000, 800_000]
+
+        for product in products:
+            for supplier in randomizer.sample(suppliers, randomizer.randint(0, 4)):
+                SupplierPriceFactory(
+                    supplier=supplier,
+                    product=product,
+                    price=randomizer.choice(prices),
+                    available_stock=randomizer.choice([0, 5, 50, 300]),
+                )
+            for customer in customers:
+                for _ in range(randomizer.randint(0, 3)):
+                    POFactory(
+                        customer=customer,
+                        product=product,
+                        quantity=1,
+                        price=randomizer.choice(prices),
+                    )
+
+        rfqs = [
+            RFQFactory(
+                customer=randomizer.choice(customers),
+                product=randomizer.choice(products),
+                quantity=randomizer.choice([1, 5, 50, 99, 250]),
+            )
+            for _ in range(40)
+        ]
+
+        engine = BatchPricingEngine(RFQ.objects.all()).handle()
+
+        self.assertEqual(len(engine.decisions), len(rfqs))
+        self.assertSameDecisions(rfqs, engine)
+
+    def test_supplier_recommender_writes_batch_transactions(self):
+        POFactory(
+            customer=self.customer, product=self.product, quantity=1, price=800_000
+        )
+        for price, stock in [(730_000, 300), (750_000, 200)]:
+            SupplierPriceFactory(
+                supplier=SupplierFactory(),
+                product=self.product,
+                price=price,
+                available_stock=stock,
+            )
+        rfqs = [
+            RFQFactory(customer=self.customer, product=self.product, quantity=400),
+            RFQFactory(customer=self.customer, product=self.product, quantity=400),
+        ]
+
+        SupplierRecommender(batch_size=1).handle()
+
+        stock_index = StockAllocationIndex()
+        for rfq in rfqs:
+            analyzer = RFQAnalyzer(rfq, stock_index=stock_index).handle()
+            transactions = Transaction.objects.filter(rfq=rfq).order_by("id")
+            self.assertEqual(
+                [
+                    (t.supplier_price_id, t.quantity, t.chosen_price, t.final_price)
+                    for t in transactions
+                ],
+                [
+                    (
+                        candidate.supplier_price_id,
+                        candidate.purchased_stock,
+                        analyzer.chosen_price,
+                        round(analyzer.final_price, 5),
+                    )
+                    for candidate in analyzer.supplier_prices
+                ],
+            )
+
+        # The second RFQ only gets the 100 units left over by the first one
+        self.assertEqual(
+            sum(
+                Transaction.objects.filter(rfq=rfqs[1]).values_list(
+                    "quantity", flat=True
+                )
+            ),
+            100,
+        )
+
+    def test_landed_cost(self):
+        near = RegionFactory(name="Kabupaten Bekasi")
+        self.customer.region = near
+        self.customer.save()
+        far = RegionFactory(name="Cilincing")
+        LogisticPriceFactory(
+            logistic=LogisticFactory(fleet_type="Tronton", capacity=22),
+            source=far,
+            destination=near,
+            price=3_450_000,
+        )
+        POFactory(
+            customer=self.customer, product=self.product, quantity=1, price=800_000
+        )
+        supplier_prices = [
+            SupplierPriceFactory(
+                supplier=SupplierFactory(region=region),
+                product=self.product,
+                price=price,
+                available_stock=300,
+            )
+            for region, price in [(far, 580_000), (near, 750_000)]
+        ]
+        RFQFactory(customer=self.customer, product=self.product, quantity=20)
+
+        SupplierRecommender(landed_cost=True).handle()
+
+        # 580_000 plus a Tronton for 20 units costs more than 750_000
+        self.assertEqual(
+            list(
+                Transaction.objects.values_list(
+                    "supplier_price_id", "chosen_price", "freight"
+                )
+            ),
+            [(supplier_prices[1].id, Decimal(750_000), Decimal(0))],
+        )
+
+        Transaction.objects.all().delete()
+        RFQ.objects.update(quantity=300)
+
+        SupplierRecommender(landed_cost=True).handle()
+
+        # 14 trips over 300 units, the supplier price plus its freight is priced
+        self.assertEqual(
+            list(
+                Transaction.objects.values_list(
+                    "supplier_price_id", "chosen_price", "freight"
+                )
+            ),
+            [(supplier_prices[0].id, Decimal(741_000), Decimal(161_000))],
+        )
+
+    def test_landed_cost_without_logistics(self):
+        POFactory(
+            customer=self.customer, product=self.product, quantity=1, price=800_000
+        )
+        for price in [730_000, 750_000]:
+            SupplierPriceFactory(
+                supplier=SupplierFactory(),
+                product=self.product,
+                price=price,
+                available_stock=300,
+            )
+        for quantity in [20, 400]:
+            RFQFactory(customer=self.customer, product=self.product, quantity=quantity)
+
+        SupplierRecommender().handle()
+        expected = list(Transaction.objects.order_by("id").values())
+        Transaction.objects.all().delete()
+        SupplierRecommender(landed_cost=True).handle()
+
+        self.assertEqual(
+            [
+                {**row, "id": None, "created": None, "modified": None}
+                for row in Transaction.objects.order_by("id").values()
+            ],
+            [
+                {**row, "id": None, "created": None, "modified": None}
+                for row in expected
+            ],
+        )
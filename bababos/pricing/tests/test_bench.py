@@ -0,0 +1,184 @@
+import json
+import tracemalloc
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from bababos.pricing.models import (
+    PO,
+    RFQ,
+    Customer,
+    MarginCurve,
+    SupplierPrice,
+    Transaction,
+)
+from bababos.pricing.services import MarginPolicy
+from bababos.pricing.services.supplier_recommender import CandidateSupplierPrice
+
+
+class TestBench(TestCase):
+    def test_report(self):
+        stdout = StringIO()
+
+        with mock.patch.object(
+            MarginPolicy, "load", wraps=MarginPolicy.load
+        ) as load_margin_policy:
+            call_command(
+                "bench",
+                customers=3,
+                products=20,
+                suppliers=4,
+                purchase_orders_per_customer=5,
+                rfqs=10,
+                analyze_sample=4,
+                batch_size=4,
+                stdout=stdout,
+            )
+
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(report["dataset"]["customers"], 3)
+        self.assertEqual(
+            {name: result["rows"] for name, result in report["feed"].items()},
+            {
+                "customers": 3,
+                "suppliers": 4,
+                "rfqs": 10,
+                "pricelist": 60,
+                "purchase_orders": 15,
+            },
+        )
+        self.assertEqual(report["decide"]["rfqs"], 10)
+        self.assertEqual(report["analyze"]["rfqs"], 4)
+        for phase in ["decide", "analyze"]:
+            self.assertGreater(report[phase]["queries"], 0)
+            self.assertLessEqual(report[phase]["p50_ms"], report[phase]["p95_ms"])
+            self.assertEqual(report[phase]["phases"]["decision"]["queries"], 0)
+        # The margin curves are loaded once by decide and once by the analyzer
+        self.assertEqual(load_margin_policy.call_count, 2)
+
+        # The dataset is rolled back
+        self.assertFalse(Customer.objects.exists())
+        self.assertFalse(RFQ.objects.exists())
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_keep(self):
+        call_command(
+            "bench", customers=2, products=5, rfqs=3, keep=True, stdout=StringIO()
+        )
+
+        self.assertEqual(Customer.objects.filter(code__startswith="BENCH-").count(), 2)
+        self.assertEqual(RFQ.objects.count(), 3)
+
+
+class TestBenchIndexes(TransactionTestCase):
+    def test_indexes_restored(self):
+        applied = set(MigrationRecorder(connection).applied_migrations())
+        stdout = StringIO()
+
+        call_command(
+            "bench_indexes",
+            generate=True,
+            customers=2,
+            products=5,
+            suppliers=2,
+            purchase_orders_per_customer=3,
+            rfqs=4,
+            sample=2,
+            repeat=1,
+            json=True,
+            stdout=stdout,
+        )
+
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(report["sample"], 2)
+        # The indexes are switched without unapplying any migration
+        self.assertEqual(
+            set(MigrationRecorder(connection).applied_migrations()), applied
+        )
+        self.assertFalse(MarginCurve.objects.exists())
+        with connection.cursor() as cursor:
+            for model, name in [
+                (PO, "purchase_orders_history_idx"),
+                (SupplierPrice, "supplier_prices_latest_idx"),
+            ]:
+                constraints = connection.introspection.get_constraints(
+                    cursor, model._meta.db_table
+                )
+                self.assertIn(name, constraints)
+                self.assertFalse(
+                    [name for name in constraints if name.endswith("_bench_idx")]
+                )
+
+
+class ModelCandidateSupplierPrice:
+    """
+    The candidate before it was slotted: attributes set from keyword
+    arguments in the instance dict, holding the ``SupplierPrice`` model.
+    """
+
+    def __init__(self, **kwargs):
+        for kwarg in kwargs:
+            setattr(self, kwarg, kwargs[kwarg])
+
+
+class TestCandidateMemory(SimpleTestCase):
+    def test_ids_smaller_than_models(self):
+        models = self.measure(self.build_model_candidates, 1000)
+        ids = self.measure(self.build_candidates, 1000)
+
+        self.assertLess(ids["bytes_per_candidate"], models["bytes_per_candidate"])
+
+    @staticmethod
+    def measure(build, count):
+        # Prices are shared the same way rows of one product share them
+        prices = [Decimal(700_000 + i % 1000) for i in range(1000)]
+        tracemalloc.start()
+        try:
+            candidates = build(count, prices)
+            size, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del candidates
+        return {"bytes": size, "bytes_per_candidate": size / count, "peak": peak}
+
+    @staticmethod
+    def build_model_candidates(count, prices):
+        candidates = []
+        for i in range(count):
+            price = prices[i % len(prices)]
+            candidates.append(
+                ModelCandidateSupplierPrice(
+                    supplier_price=SupplierPrice(
+                        id=i,
+                        supplier_id=i % 100,
+                        product_id=i % 5000,
+                        price=price,
+                        available_stock=100,
+                    ),
+                    available_stock=100,
+                    purchased_stock=40,
+                    remaining_stock=60,
+                    price=price,
+                    total=price * 40,
+                )
+            )
+        return candidates
+
+    @staticmethod
+    def build_candidates(count, prices):
+        return [
+            CandidateSupplierPrice(
+                supplier_price_id=i,
+                available_stock=100,
+                purchased_stock=40,
+                remaining_stock=60,
+                price=prices[i % len(prices)],
+                supplier_id=i % 100,
+            )
+            for i in range(count)
+        ]
@@ -0,0 +1,170 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from parameterized import parameterized
+
+from bababos.pricing.models import (
+    CustomerFactory,
+    MarginCurve,
+    POFactory,
+    PricingRun,
+    ProductFactory,
+    RFQFactory,
+    SupplierFactory,
+    SupplierPriceFactory,
+    Transaction,
+)
+from bababos.pricing.services import ChangeTracker
+
+
+class TestChangeTracker(TestCase):
+    def setUp(self) -> None:
+        self.customers = [CustomerFactory(), CustomerFactory()]
+        self.products = [ProductFactory(sku="SKU-1"), ProductFactory(sku="SKU-2")]
+        self.supplier_prices = [
+            SupplierPriceFactory(
+                supplier=SupplierFactory(),
+                product=product,
+                price=730_000,
+                available_stock=100,
+            )
+            for product in self.products
+        ]
+        self.rfqs = [
+            RFQFactory(customer=customer, product=product, quantity=10)
+            for customer in self.customers
+            for product in self.products
+        ]
+        self.since = timezone.now()
+
+    def test_nothing_changed(self):
+        self.assertEqual(list(ChangeTracker(self.since).get_rfqs()), [])
+
+    def test_supplier_price_changed(self):
+        self.supplier_prices[0].price = 740_000
+        self.supplier_prices[0].save()
+
+        self.assertEqual(
+            set(ChangeTracker(self.since).get_rfqs()),
+            {self.rfqs[0], self.rfqs[2]},
+        )
+
+    def test_purchase_order_changed(self):
+        POFactory(
+            customer=self.customers[0],
+            product=self.products[1],
+            quantity=1,
+            price=800_000,
+        )
+        # Another customer's history of a product nobody asks a quotation for
+        POFactory(
+            customer=self.customers[1],
+            product=ProductFactory(sku="SKU-3"),
+            quantity=1,
+            price=800_000,
+        )
+
+        self.assertEqual(
+            set(ChangeTracker(self.since).get_rfqs()),
+            {self.rfqs[1], self.rfqs[3]},
+        )
+
+    def test_rfq_changed(self):
+        self.rfqs[3].quantity = 20
+        self.rfqs[3].save()
+
+        self.assertEqual(
+            set(ChangeTracker(self.since).get_rfqs()),
+            {self.rfqs[1], self.rfqs[3]},
+        )
+
+    @parameterized.expand(
+        [
+            ("default", None, None, [0, 1, 2, 3, 4]),
+            ("customer", 0, None, [0, 1, 2, 3]),
+            ("product", None, 1, [1, 3]),
+            ("customer_and_product", 1, 2, [4]),
+        ]
+    )
+    def test_margin_curve_changed(self, _, customer, product, rfqs):
+        self.products.append(ProductFactory(sku="SKU-3"))
+        self.rfqs.append(
+            RFQFactory(
+                customer=self.customers[1], product=self.products[2], quantity=10
+            )
+        )
+        curve = MarginCurve.objects.create(
+            customer=None if customer is None else self.customers[customer],
+            product=None if product is None else self.products[product],
+            quantities=[1],
+            margins=[Decimal("0.2")],
+        )
+        since = timezone.now()
+        self.assertEqual(list(ChangeTracker(since).get_rfqs()), [])
+
+        curve.margins = [Decimal("0.3")]
+        curve.save()
+
+        self.assertEqual(
+            set(ChangeTracker(since).get_rfqs()), {self.rfqs[rfq] for rfq in rfqs}
+        )
+
+    def test_incremental_decide(self):
+        for rfq in self.rfqs:
+            POFactory(
+                customer=rfq.customer, product=rfq.product, quantity=1, price=800_000
+            )
+        call_command("decide", stdout=open("/dev/null", "w"))
+        self.assertEqual(Transaction.objects.count(), 4)
+
+        PricingRun.objects.update(started_at=timezone.now() + timedelta(seconds=1))
+        call_command("decide", "--incremental", stdout=open("/dev/null", "w"))
+        run = PricingRun.objects.latest("id")
+        self.assertTrue(run.incremental)
+        self.assertEqual(run.rfq_count, 0)
+
+        PricingRun.objects.update(started_at=timezone.now())
+        self.supplier_prices[1].price = 760_000
+        self.supplier_prices[1].save()
+        call_command("decide", "--incremental", stdout=open("/dev/null", "w"))
+
+        run = PricingRun.objects.latest("id")
+        self.assertEqual(run.rfq_count, 2)
+        self.assertEqual(run.inserted, 2)
+        self.assertEqual(
+            set(
+                Transaction.objects.filter(rfq__product=self.products[1]).values_list(
+                    "chosen_price", flat=True
+                )
+            ),
+            {760_000},
+        )
+        self.assertEqual(Transaction.objects.count(), 4)
+
+    def test_incremental_decide_margin_curve(self):
+        for rfq in self.rfqs:
+            POFactory(
+                customer=rfq.customer, product=rfq.product, quantity=1, price=700_000
+            )
+        call_command("decide", stdout=open("/dev/null", "w"))
+
+        PricingRun.objects.update(started_at=timezone.now())
+        MarginCurve.objects.create(
+            product=self.products[0], quantities=[1], margins=[Decimal("0.3")]
+        )
+        call_command("decide", "--incremental", stdout=open("/dev/null", "w"))
+
+        run = PricingRun.objects.latest("id")
+        self.assertEqual(run.rfq_count, 2)
+        self.assertEqual(
+            dict(Transaction.objects.values_list("rfq_id", "analyzed_profit_margin")),
+            {
+                self.rfqs[0].id: Decimal("0.3"),
+                self.rfqs[1].id: Decimal("0.46364"),
+                self.rfqs[2].id: Decimal("0.3"),
+                self.rfqs[3].id: Decimal("0.46364"),
+            },
+        )
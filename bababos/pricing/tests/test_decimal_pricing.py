@@ -0,0 +1,312 @@
+import decimal
+import operator
+import random
+
+import numpy as np
+import pandas as pd
+from django.test import TestCase
+
+from bababos.pricing.models import RFQ
+from bababos.pricing.services import BatchPricingEngine, MarginPolicy
+from bababos.pricing.services.supplier_recommender import RFQAnalyzer
+from bababos.utilities.utils import money
+
+
+class DecimalPricingEngine(BatchPricingEngine):
+    """
+    The decision tree before integer units: prices and margins are
+    ``Decimal`` in object columns, compared with the float profit bounds.
+    """
+
+    @staticmethod
+    def build_po_summaries(rows):
+        return pd.DataFrame.from_records(
+            [
+                (
+                    customer_id,
+                    product_id,
+                    po_count,
+                    len(prices),
+                    last_price,
+                    prices[0],
+                    prices[-1],
+                )
+                for customer_id, product_id, po_count, prices, last_price in rows
+            ],
+            columns=[
+                "customer_id",
+                "product_id",
+                "po_count",
+                "po_unique",
+                "po_price",
+                "po_min",
+                "po_max",
+            ],
+        ).astype({"customer_id": "int64", "product_id": "int64", "po_price": object})
+
+    def set_profit_margins(self):
+        self.requests["profit_margin"] = self.margin_policy.get_margins(
+            self.requests["quantity"].to_numpy(),
+            customer_ids=self.requests["customer_id"].to_numpy(),
+            product_ids=self.requests["product_id"].to_numpy(),
+        )
+        return self
+
+    def decide(self):
+        frame = self._get_features()
+
+        n = len(frame)
+        chosen_price = np.full(n, None, dtype=object)
+        final_price = np.full(n, None, dtype=object)
+        profit_margin = frame["profit_margin"].to_numpy(dtype=object).copy()
+        rule = np.full(n, None, dtype=object)
+
+        po_count = frame["po_count"].to_numpy()
+        po_unique = frame["po_unique"].to_numpy()
+        po_price = frame["po_price"].to_numpy(dtype=object)
+        po_min = frame["po_min"].to_numpy(dtype=object)
+        po_max = frame["po_max"].to_numpy(dtype=object)
+        supplier_count = frame["supplier_count"].to_numpy()
+        supplier_unique = frame["supplier_unique"].to_numpy()
+        supplier_min = frame["supplier_min"].to_numpy(dtype=object)
+        supplier_max = frame["supplier_max"].to_numpy(dtype=object)
+
+        def common_pricing(mask, price, key):
+            idx = np.flatnonzero(mask)
+            chosen_price[idx] = price[idx]
+            final_price[idx] = price[idx] + (price[idx] * profit_margin[idx])
+            rule[idx] = key
+
+        def margin_pricing(mask, base, price, key, clamp_max):
+            idx = np.flatnonzero(mask)
+            margin = (price[idx] - base[idx]) / base[idx]
+            below = margin < RFQAnalyzer.MIN_PROFIT
+            above = (margin > RFQAnalyzer.MAX_PROFIT) & clamp_max
+            margin[below] = decimal.Decimal(RFQAnalyzer.MIN_PROFIT)
+            margin[above] = decimal.Decimal(RFQAnalyzer.MAX_PROFIT)
+            clamped = below | above
+
+            chosen = price[idx].copy()
+            chosen[clamped] = (base if clamp_max else price)[idx][clamped]
+            final = chosen.copy()
+            final[clamped] = chosen[clamped] + (chosen[clamped] * margin[clamped])
+
+            chosen_price[idx] = chosen
+            final_price[idx] = final
+            profit_margin[idx] = margin
+            rule[idx] = key
+
+        single_po = po_count == 1
+        single_supplier = supplier_count == 1
+        has_supplier = supplier_count > 0
+
+        # Single PO history, single candidate supplier
+        branch = single_po & single_supplier
+        lower = branch & self._compare(po_price, supplier_min, branch, operator.le)
+        common_pricing(lower, supplier_min, "single_po_single_supplier_lower")
+        margin_pricing(
+            branch & ~lower,
+            supplier_min,
+            po_price,
+            "single_po_single_supplier_higher",
+            clamp_max=True,
+        )
+
+        # Single PO history, multiple candidate suppliers
+        branch = single_po & ~single_supplier & has_supplier
+        higher = branch & self._compare(supplier_max, po_price, branch, operator.gt)
+        common_pricing(higher, supplier_max, "single_po_higher_bids")
+        branch = branch & ~higher
+        equal = (
+            branch
+            & (supplier_unique == 1)
+            & self._compare(supplier_min, po_price, branch, operator.eq)
+        )
+        common_pricing(equal, supplier_min, "single_po_equal_bid")
+        margin_pricing(
+            branch & (supplier_unique > 1),
+            supplier_max,
+            po_price,
+            "single_po_multiple_bids",
+            clamp_max=False,
+        )
+
+        # Several (or no) PO histories, single candidate supplier
+        branch = ~single_po & single_supplier & (po_unique == 1)
+        greater = branch & self._compare(supplier_min, po_min, branch, operator.gt)
+        less = branch & self._compare(supplier_min, po_min, branch, operator.lt)
+        common_pricing(greater, supplier_min, "unique_po_greater_supplier")
+        common_pricing(less, supplier_min, "unique_po_lower_supplier")
+
+        branch = ~single_po & single_supplier & (po_unique > 1)
+        greater = branch & self._compare(supplier_min, po_max, branch, operator.gt)
+        between = branch & self._compare(supplier_min, po_min, branch, operator.ge)
+        common_pricing(greater, supplier_min, "po_greater_supplier")
+        common_pricing(between & ~greater, supplier_min, "po_between_supplier")
+
+        # Several (or no) PO histories, multiple candidate suppliers
+        branch = ~single_po & ~single_supplier & has_supplier
+        common_pricing(branch, supplier_min, "po_multiple_suppliers")
+
+        self.decisions = pd.DataFrame(
+            {
+                "chosen_price": chosen_price,
+                "final_price": final_price,
+                "analyzed_profit_margin": profit_margin,
+                "rule": rule,
+            },
+            index=frame.index,
+            dtype=object,
+        )
+        return self
+
+    def _get_features(self):
+        frame = self.requests.set_index("rfq_id")
+        frame = frame.join(
+            self.po_summaries.set_index(["customer_id", "product_id"]),
+            on=["customer_id", "product_id"],
+        )
+
+        prices = self.allocations["price"]
+        if self.landed_cost:
+            prices = prices + self.allocations["freight"]
+        suppliers = prices.groupby(self.allocations["rfq_id"]).agg(
+            supplier_count="size",
+            supplier_unique="nunique",
+            supplier_min="min",
+            supplier_max="max",
+        )
+        frame = frame.join(suppliers)
+
+        counts = ["po_count", "po_unique", "supplier_count", "supplier_unique"]
+        frame[counts] = frame[counts].fillna(0).astype(int)
+        return frame
+
+    @staticmethod
+    def _compare(left, right, mask, compare):
+        """
+        Element-wise ``Decimal`` comparison, evaluated only where ``mask`` holds
+        so missing values on the other rows are never compared.
+        """
+        result = np.zeros(len(mask), dtype=bool)
+        idx = np.flatnonzero(mask)
+        result[idx] = [
+            compare(value, other) for value, other in zip(left[idx], right[idx])
+        ]
+        return result
+
+
+class TestDecimalPricing(TestCase):
+    """
+    The decision tree on integer units against the ``Decimal`` one it
+    replaced, on synthetic RFQs.
+    """
+
+    def test_same_as_decimal(self):
+        requests, summaries, allocations = self.generate(20_000, seed=0.42)
+
+        expected = self.price(DecimalPricingEngine, requests, summaries, allocations)
+        actual = self.price(BatchPricingEngine, requests, summaries, allocations)
+
+        # Rounded to the stored places, integer units decide as Decimal did
+        self.assertEqual(self.count_mismatches(expected.decisions, actual.decisions), 0)
+
+    @staticmethod
+    def price(engine_class, requests, summaries, allocations):
+        """
+        The PO summaries, the profit margins and the decision tree of one
+        batch of every RFQ.
+        """
+        engine = engine_class(
+            RFQ.objects.none(),
+            margin_policy=MarginPolicy(default=RFQAnalyzer.get_default_margin_curve()),
+        )
+        engine.requests = requests.copy()
+        engine.allocations = allocations
+        engine.po_summaries = engine.build_po_summaries(summaries)
+        engine.set_profit_margins()
+        engine.decide()
+        return engine
+
+    @staticmethod
+    def count_mismatches(expected, actual):
+        """
+        RFQs whose decisions differ once rounded to the stored 5 places.
+        """
+        columns = ["chosen_price", "final_price", "analyzed_profit_margin"]
+
+        def stored(decisions):
+            # None never equals itself in a frame comparison
+            return decisions[columns].map(
+                lambda value: "" if value is None else money.to_units(value)
+            )
+
+        differ = (stored(expected) != stored(actual)).any(axis=1)
+        # Rules are compared on priced RFQs, the tree used to name no other
+        priced = expected["chosen_price"].notna()
+        differ |= priced & (expected["rule"] != actual["rule"])
+        return int(differ.sum())
+
+    @staticmethod
+    def generate(count, seed):
+        """
+        RFQs, the PO summaries of most of their customer and product pairs,
+        and zero to three allocated supplier prices around the PO prices, so
+        every branch of the decision tree is taken.
+        """
+        rng = random.Random(seed)
+
+        def price(around):
+            units = int(around * rng.uniform(0.7, 1.3) * money.SCALE)
+            return money.from_units(units)
+
+        customers, products = max(count // 20, 1), max(count // 50, 1)
+        requests = [
+            (rfq_id, rng.randint(1, customers), rng.randint(1, products))
+            for rfq_id in range(1, count + 1)
+        ]
+        bases = {}
+        summaries = []
+        for pair in dict.fromkeys(
+            (customer, product) for _, customer, product in requests
+        ):
+            bases[pair] = rng.randint(500_000, 2_000_000)
+            if rng.random() < 0.2:
+                continue
+            po_count = rng.choice([1, 1, 2, 3, 5])
+            prices = sorted({price(bases[pair]) for _ in range(po_count)})
+            if po_count > 1 and rng.random() < 0.3:
+                prices = prices[:1]
+            summaries.append((*pair, po_count, prices, rng.choice(prices)))
+
+        last_prices = {summary[:2]: summary[4] for summary in summaries}
+        allocations = []
+        for rfq_id, customer, product in requests:
+            base = bases[(customer, product)]
+            bids = [price(base) for _ in range(rng.choice([0, 1, 1, 2, 3]))]
+            if bids and rng.random() < 0.2:
+                # Bids equal to the last PO price, or to each other
+                bids = [last_prices.get((customer, product), bids[0])] * len(bids)
+            for bid in sorted(bids):
+                allocations.append((rfq_id, len(allocations) + 1, bid, 10, 10, 0))
+
+        requests = pd.DataFrame.from_records(
+            [
+                (rfq_id, customer, product, rng.randint(1, 150))
+                for rfq_id, customer, product in requests
+            ],
+            columns=["rfq_id", "customer_id", "product_id", "quantity"],
+        )
+        allocations = pd.DataFrame.from_records(
+            allocations,
+            columns=[
+                "rfq_id",
+                "supplier_price_id",
+                "price",
+                "available_stock",
+                "purchased_stock",
+                "remaining_stock",
+            ],
+        )
+        allocations["freight"] = decimal.Decimal(0)
+        return requests, summaries, allocations
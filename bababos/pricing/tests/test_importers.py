@@ -0,0 +1,179 @@
+import os
+import tempfile
+from decimal import Decimal
+
+from django.test import TestCase
+
+from bababos.pricing.models import (
+    PO,
+    RFQ,
+    Customer,
+    CustomerFactory,
+    CustomerProductPriceSummary,
+    Product,
+    ProductFactory,
+    RegionFactory,
+    Supplier,
+    SupplierFactory,
+    SupplierPrice,
+    SupplierPriceFactory,
+)
+from bababos.pricing.services import (
+    CustomerImporter,
+    PricelistImporter,
+    PurchaseOrderImporter,
+    RFQImporter,
+    SupplierImporter,
+)
+
+
+class TestImporters(TestCase):
+    def setUp(self) -> None:
+        self.region = RegionFactory(name="Kabupaten Bekasi")
+        self.customer = CustomerFactory(
+            code="M1-ABDI-11", user__username="m1-abdi-11", region=self.region
+        )
+        self.supplier = SupplierFactory(code="S1-JAY-1", region=self.region)
+
+    def write_csv(self, content):
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", delete=False, newline=""
+        ) as csv_file:
+            csv_file.write(content)
+        self.addCleanup(os.remove, csv_file.name)
+        return csv_file.name
+
+    def test_customers(self):
+        path = self.write_csv(
+            "Customer ID,Address,City,State\n"
+            "M1-ABDI-11,Setu,Kabupaten Bekasi,Jawa Barat\n"
+            "M1-SUGP-11,Gn. Putri,Kabupaten Bekasi,Jawa Barat\n"
+            "M1-UNKN-11,Nowhere,Kota Atlantis,Jawa Barat\n"
+        )
+
+        importer = CustomerImporter(path=path, chunk_size=2).handle()
+
+        self.assertEqual((importer.read, importer.written, importer.skipped), (3, 1, 2))
+        customer = Customer.objects.get(code="M1-SUGP-11")
+        self.assertEqual(customer.user.username, "m1-sugp-11")
+        self.assertEqual(customer.address, "Gn. Putri")
+        self.assertEqual(customer.region, self.region)
+
+    def test_suppliers(self):
+        path = self.write_csv(
+            "Supplier_id,Address,City,State,x\n"
+            "S1-BJN-1,Jatikramat,Kabupaten Bekasi,Jawa Barat,\n"
+        )
+
+        SupplierImporter(path=path).handle()
+
+        self.assertTrue(
+            Supplier.objects.filter(code="S1-BJN-1", region=self.region).exists()
+        )
+
+    def test_rfqs(self):
+        product = ProductFactory(sku="UNP-120")
+        path = self.write_csv(
+            "Customer ID,SKU ID,Quantity,Unit\n"
+            "M1-ABDI-11,UNP-120,10,Batang\n"
+            "M1-ABDI-11,UNP-200,6,Batang\n"
+            "M1-UNKN-11,UNP-120,1,Batang\n"
+        )
+
+        importer = RFQImporter(path=path, chunk_size=2).handle()
+
+        self.assertEqual((importer.read, importer.written, importer.skipped), (3, 2, 1))
+        self.assertEqual(
+            list(
+                RFQ.objects.order_by("id").values_list(
+                    "customer", "product__sku", "quantity", "unit"
+                )
+            ),
+            [
+                (self.customer.id, "UNP-120", 10, "Batang"),
+                (self.customer.id, "UNP-200", 6, "Batang"),
+            ],
+        )
+        self.assertEqual(Product.objects.get(sku="UNP-120"), product)
+
+    def test_pricelist(self):
+        path = self.write_csv(
+            "Supplier ID,SKU ID,Price/unit,Stock Available\n"
+            "S1-JAY-1,PLT-SPHC1000,5596216.216,1\n"
+            "S1-UNKN-1,PLT-SPHC1000,5596216.216,1\n"
+        )
+
+        importer = PricelistImporter(path=path).handle()
+
+        self.assertEqual(importer.skipped, 1)
+        supplier_price = SupplierPrice.objects.get()
+        self.assertEqual(supplier_price.supplier, self.supplier)
+        self.assertEqual(supplier_price.product.sku, "PLT-SPHC1000")
+        self.assertEqual(supplier_price.price, Decimal("5596216.216"))
+        self.assertEqual(supplier_price.available_stock, 1)
+
+    def test_purchase_orders(self):
+        ProductFactory(sku="SIK-060060-IBB", name=None)
+        path = self.write_csv(
+            "customer ID,order date,sku_code,SKU id,sku_name,order_qty,order_unit,unit_selling_price\n"
+            "M1-ABDI-11,20/12/2022,SIK-4040,SIK-040040-IBB,Siku 40 mm,142,Batang,143694\n"
+            "M1-ABDI-11,21/12/2022,SIK-4040,SIK-040040-IBB,Besi Siku 40 mm,10,Batang,143000\n"
+            "M1-ABDI-11,21/12/2022,SIK-6060,SIK-060060-IBB,Siku 60 mm,112,Batang,324775\n"
+        )
+
+        PurchaseOrderImporter(path=path, chunk_size=2).handle()
+
+        self.assertEqual(
+            dict(Product.objects.values_list("sku", "name")),
+            {"SIK-040040-IBB": "Siku 40 mm", "SIK-060060-IBB": "Siku 60 mm"},
+        )
+        purchase_order = PO.objects.order_by("id").first()
+        self.assertEqual(purchase_order.customer, self.customer)
+        self.assertEqual(purchase_order.quantity, 142)
+        self.assertEqual(purchase_order.price, 143694)
+        self.assertEqual(purchase_order.ordered_at.date().isoformat(), "2022-12-20")
+        self.assertEqual(PO.objects.count(), 3)
+        summary = CustomerProductPriceSummary.objects.get(product__sku="SIK-040040-IBB")
+        self.assertEqual(summary.po_count, 2)
+        self.assertEqual(summary.prices, [Decimal(143000), Decimal(143694)])
+        self.assertEqual(summary.last_price, Decimal(143000))
+
+    def test_pricelist_upsert(self):
+        product = ProductFactory(sku="PLT-SPHC0400")
+        SupplierPriceFactory(
+            supplier=self.supplier, product=product, price=1000, available_stock=3
+        )
+        path = self.write_csv(
+            "Supplier ID,SKU ID,Price/unit,Stock Available\n"
+            "S1-JAY-1,PLT-SPHC0400,1000,3\n"
+            "S1-JAY-1,PLT-SPHC0500,2000,5\n"
+        )
+        PricelistImporter(path=path).handle()
+        path = self.write_csv(
+            "Supplier ID,SKU ID,Price/unit,Stock Available\n"
+            "S1-JAY-1,PLT-SPHC0400,1000,7\n"
+            "S1-JAY-1,PLT-SPHC0500,2100,5\n"
+        )
+
+        importer = PricelistImporter(path=path).handle()
+
+        self.assertEqual(
+            (importer.written, importer.skipped, importer.superseded), (2, 0, 1)
+        )
+        self.assertEqual(
+            list(
+                SupplierPrice.objects.order_by("id").values_list(
+                    "product__sku", "price", "available_stock", "latest"
+                )
+            ),
+            [
+                ("PLT-SPHC0400", 1000, 7, True),
+                ("PLT-SPHC0500", 2000, 5, False),
+                ("PLT-SPHC0500", 2100, 5, True),
+            ],
+        )
+
+        importer = PricelistImporter(path=path).handle()
+
+        self.assertEqual((importer.written, importer.skipped), (0, 2))
+        self.assertEqual(SupplierPrice.objects.count(), 3)
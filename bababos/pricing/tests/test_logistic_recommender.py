@@ -0,0 +1,167 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from parameterized import parameterized
+
+from bababos.pricing.models import (
+    LogisticFactory,
+    LogisticPrice,
+    LogisticPriceFactory,
+    Region,
+    RegionFactory,
+)
+from bababos.pricing.services import LogisticRecommender
+
+
+class TestLogisticRecommender(TestCase):
+    def setUp(self) -> None:
+        self.regions = {}
+        for name, parent in [
+            ("DKI Jakarta", None),
+            ("Kota Jakarta Utara", "DKI Jakarta"),
+            ("Cilincing", "Kota Jakarta Utara"),
+            ("Koja", "Kota Jakarta Utara"),
+            ("Jawa Barat", None),
+            ("Kabupaten Bekasi", "Jawa Barat"),
+            ("Cikarang", "Kabupaten Bekasi"),
+            ("Cikarang Selatan", "Kabupaten Bekasi"),
+            ("Kota Depok", "Jawa Barat"),
+        ]:
+            self.regions[name] = RegionFactory(
+                name=name, parent=self.regions.get(parent)
+            )
+
+        self.fuso = LogisticFactory(fleet_type="Fuso", capacity=8)
+        self.tronton = LogisticFactory(fleet_type="Tronton", capacity=22)
+        for logistic, source, destination, price in [
+            (self.fuso, "Cilincing", "Kabupaten Bekasi", 1_800_000),
+            (self.tronton, "Cilincing", "Kabupaten Bekasi", 3_450_000),
+            (self.fuso, "Cilincing", "Cikarang", 1_700_000),
+            (self.fuso, "Kota Jakarta Utara", "Jawa Barat", 2_000_000),
+        ]:
+            LogisticPriceFactory(
+                logistic=logistic,
+                source=self.regions[source],
+                destination=self.regions[destination],
+                price=price,
+            )
+
+    def get_cost(self, source, destination, quantity):
+        return (
+            LogisticRecommender()
+            .load()
+            .get_cost(self.regions[source].id, self.regions[destination].id, quantity)
+        )
+
+    @parameterized.expand(
+        [
+            ("own_price", "Cilincing", "Cikarang", ("Cilincing", "Cikarang")),
+            (
+                "destination_city",
+                "Cilincing",
+                "Cikarang Selatan",
+                ("Cilincing", "Kabupaten Bekasi"),
+            ),
+            (
+                "source_city",
+                "Koja",
+                "Cikarang Selatan",
+                ("Kota Jakarta Utara", "Jawa Barat"),
+            ),
+            (
+                "destination_province",
+                "Cilincing",
+                "Kota Depok",
+                ("Kota Jakarta Utara", "Jawa Barat"),
+            ),
+            ("no_price", "Cikarang", "Cilincing", None),
+        ]
+    )
+    def test_route(self, _, source, destination, expected):
+        recommender = LogisticRecommender().load()
+
+        route = recommender.get_route(
+            self.regions[source].id, self.regions[destination].id
+        )
+
+        if expected is not None:
+            expected = tuple(self.regions[name].id for name in expected)
+        self.assertEqual(route, expected)
+
+    @parameterized.expand(
+        [
+            ("one_fuso", "Cikarang Selatan", 8, "Fuso", 1, 1_800_000),
+            ("tronton_over_fusos", "Cikarang Selatan", 9, "Tronton", 1, 3_450_000),
+            ("tronton_trips", "Cikarang Selatan", 30, "Tronton", 2, 6_900_000),
+            ("fuso_trips", "Cikarang", 30, "Fuso", 4, 6_800_000),
+            ("nothing", "Cikarang Selatan", 0, "Fuso", 1, 1_800_000),
+        ]
+    )
+    def test_cheapest_fleet(self, _, destination, quantity, fleet_type, trips, total):
+        cost = self.get_cost("Cilincing", destination, quantity)
+
+        self.assertEqual(
+            (cost.logistic_id, cost.trips, cost.total),
+            (
+                {"Fuso": self.fuso, "Tronton": self.tronton}[fleet_type].id,
+                trips,
+                Decimal(total),
+            ),
+        )
+
+    def test_no_cost(self):
+        self.assertIsNone(self.get_cost("Cikarang", "Cilincing", 10))
+
+    def test_lookups_without_queries(self):
+        recommender = LogisticRecommender().load()
+        region_ids = [region.id for region in self.regions.values()]
+
+        with self.assertNumQueries(0):
+            for source_id in region_ids:
+                for destination_id in region_ids:
+                    recommender.get_cost(source_id, destination_id, 25)
+                    recommender.get_distance(source_id, destination_id)
+
+    @parameterized.expand(
+        [
+            ("same", "Cilincing", "Cilincing", 0),
+            ("siblings", "Cilincing", "Koja", 2),
+            ("parent", "Cilincing", "Kota Jakarta Utara", 1),
+            ("province", "Cikarang", "Kota Depok", 3),
+            ("other_province", "Cilincing", "Cikarang", None),
+        ]
+    )
+    def test_distance(self, _, source, destination, expected):
+        recommender = LogisticRecommender().load()
+
+        self.assertEqual(
+            recommender.get_distance(
+                self.regions[source].id, self.regions[destination].id
+            ),
+            expected,
+        )
+
+
+class TestFeedLogisticPrices(TestCase):
+    def test_feed_once(self):
+        from bababos.pricing.management.commands.feed import Command
+
+        command = Command()
+        command.feed_regions()
+        command.feed_logistics()
+
+        with self.assertNumQueries(4):
+            command.feed_logistic_prices()
+        command.feed_logistic_prices()
+
+        self.assertEqual(LogisticPrice.objects.count(), 18)
+        cost = (
+            LogisticRecommender()
+            .load()
+            .get_cost(
+                Region.objects.get(name="Cilincing").id,
+                Region.objects.get(name="Cikarang Selatan").id,
+                10,
+            )
+        )
+        self.assertEqual(cost.total, Decimal(3_450_000))
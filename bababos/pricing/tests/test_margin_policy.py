@@ -0,0 +1,226 @@
+import random
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from parameterized import parameterized
+
+from bababos.pricing.models import (
+    CustomerFactory,
+    MarginCurve,
+    POFactory,
+    ProductFactory,
+    RFQFactory,
+    SupplierFactory,
+    SupplierPriceFactory,
+    Transaction,
+)
+from bababos.pricing.services import MarginPolicy, SupplierRecommender, pricing_cache
+from bababos.pricing.services.margin_policy import CompiledMarginCurve
+from bababos.pricing.services.supplier_recommender import RFQAnalyzer
+
+
+class TestMarginPolicy(TestCase):
+    def setUp(self) -> None:
+        pricing_cache.clear()
+        self.customers = [CustomerFactory(code=f"C-{i}") for i in range(2)]
+        self.products = [ProductFactory(sku=f"SKU-{i}") for i in range(2)]
+
+    @staticmethod
+    def get_float_margin(quantity):
+        # How the margin was computed before the curves
+        if quantity > 100:
+            return 0.1
+        if quantity < 1:
+            return 0.5
+        return (50 - (quantity - 1) * (40 / 99)) / 100
+
+    def test_default_curve(self):
+        policy = RFQAnalyzer.load_margin_policy()
+
+        for quantity in range(0, 150):
+            margin = policy.get_margin(quantity)
+            self.assertAlmostEqual(
+                float(margin), self.get_float_margin(quantity), places=12
+            )
+            self.assertEqual(margin, RFQAnalyzer.get_profit_margin(quantity))
+
+        # 0.5 - 0.4 / 99, rounded half to even on the 20th place
+        self.assertEqual(policy.get_margin(2), Decimal("0.49595959595959595960"))
+        self.assertEqual(policy.get_margin(100), Decimal("0.1"))
+
+    @parameterized.expand(
+        [
+            ("below", 5, Decimal("0.30000")),
+            ("first", 10, Decimal("0.30000")),
+            ("between", 30, Decimal("0.30000")),
+            ("second", 50, Decimal("0.20000")),
+            ("above", 1000, Decimal("0.05000")),
+        ]
+    )
+    def test_step(self, _, quantity, margin):
+        curve = CompiledMarginCurve(
+            [10, 50, 200],
+            [Decimal("0.3"), Decimal("0.2"), Decimal("0.05")],
+            interpolation=MarginCurve.STEP,
+        )
+
+        self.assertEqual(curve.get_margin(quantity), margin)
+
+    @parameterized.expand(
+        [
+            ("first", 0, Decimal("0.2")),
+            ("round_down", 1, Decimal("0.13333333333333333333")),
+            ("round_up", 2, Decimal("0.06666666666666666667")),
+            ("last", 3, Decimal("0")),
+        ]
+    )
+    def test_linear_is_exact(self, _, quantity, margin):
+        curve = CompiledMarginCurve([0, 3], [Decimal("0.2"), Decimal("0")])
+
+        self.assertEqual(curve.get_margin(quantity), margin)
+
+    def test_rounds_half_to_even(self):
+        curve = CompiledMarginCurve([0, 2], [Decimal("0"), Decimal("1E-20")])
+        odd = CompiledMarginCurve([0, 2], [Decimal("1E-20"), Decimal("2E-20")])
+
+        self.assertEqual(curve.get_margin(1), Decimal("0"))
+        self.assertEqual(odd.get_margin(1), Decimal("2E-20"))
+
+    def test_precedence(self):
+        customer, other_customer = self.customers
+        product, other_product = self.products
+        curves = {
+            "customer_product": (customer, product),
+            "customer": (customer, None),
+            "product": (None, product),
+            "default": (None, None),
+        }
+        for i, (customer_, product_) in enumerate(curves.values()):
+            MarginCurve.objects.create(
+                customer=customer_,
+                product=product_,
+                quantities=[1],
+                margins=[Decimal(i + 1) / 100],
+            )
+
+        policy = MarginPolicy.load()
+
+        self.assertEqual(policy.get_margin(5, customer.id, product.id), Decimal("0.01"))
+        self.assertEqual(
+            policy.get_margin(5, customer.id, other_product.id), Decimal("0.02")
+        )
+        self.assertEqual(
+            policy.get_margin(5, other_customer.id, product.id), Decimal("0.03")
+        )
+        self.assertEqual(
+            policy.get_margin(5, other_customer.id, other_product.id), Decimal("0.04")
+        )
+        self.assertEqual(policy.get_margin(5), Decimal("0.04"))
+
+    def test_built_in_default(self):
+        with self.assertRaises(ValueError):
+            MarginPolicy.load()
+
+        MarginCurve.objects.create(
+            customer=self.customers[0], quantities=[1], margins=[Decimal("0.2")]
+        )
+        policy = RFQAnalyzer.load_margin_policy()
+
+        self.assertEqual(policy.get_margin(1, self.customers[0].id), Decimal("0.2"))
+        self.assertEqual(policy.get_margin(1, self.customers[1].id), Decimal("0.5"))
+
+    def test_batch_same_as_scalar(self):
+        MarginCurve.objects.create(
+            customer=self.customers[0],
+            quantities=[1, 20, 500],
+            margins=[Decimal("0.4"), Decimal("0.25"), Decimal("0.08")],
+        )
+        MarginCurve.objects.create(
+            product=self.products[1],
+            interpolation=MarginCurve.STEP,
+            quantities=[10, 100],
+            margins=[Decimal("0.3"), Decimal("0.15")],
+        )
+        random.seed(23)
+        rows = [
+            (
+                random.randint(0, 700),
+                random.choice(self.customers).id,
+                random.choice(self.products).id,
+            )
+            for _ in range(500)
+        ]
+        quantities, customer_ids, product_ids = map(list, zip(*rows))
+
+        margins = RFQAnalyzer.load_margin_policy().get_margins(
+            quantities, customer_ids=customer_ids, product_ids=product_ids
+        )
+
+        policy = RFQAnalyzer.load_margin_policy()
+        self.assertEqual(
+            margins.tolist(),
+            [policy.get_margin(*row) for row in rows],
+        )
+
+    @parameterized.expand(
+        [
+            ("empty", [], []),
+            ("missing_margin", [1, 10], [Decimal("0.1")]),
+            ("descending", [10, 1], [Decimal("0.1"), Decimal("0.2")]),
+        ]
+    )
+    def test_invalid_curve(self, _, quantities, margins):
+        with self.assertRaises(ValueError):
+            CompiledMarginCurve(quantities, margins)
+        with self.assertRaises(ValidationError):
+            MarginCurve(quantities=quantities, margins=margins).clean()
+
+    def test_decide_uses_curves(self):
+        customer, other_customer = self.customers
+        product = self.products[0]
+        SupplierPriceFactory(
+            supplier=SupplierFactory(), product=product, price=100, available_stock=50
+        )
+        for customer_ in self.customers:
+            POFactory(customer=customer_, product=product, price=90, quantity=1)
+        MarginCurve.objects.create(
+            customer=customer,
+            interpolation=MarginCurve.STEP,
+            quantities=[1, 10],
+            margins=[Decimal("0.3"), Decimal("0.2")],
+        )
+        rfqs = [
+            RFQFactory(customer=customer, product=product, quantity=12),
+            RFQFactory(customer=other_customer, product=product, quantity=12),
+        ]
+
+        SupplierRecommender().handle()
+
+        transactions = Transaction.objects.order_by("rfq_id")
+        self.assertEqual(
+            [
+                (transaction.analyzed_profit_margin, transaction.final_price)
+                for transaction in transactions
+            ],
+            [
+                (Decimal("0.2"), Decimal("120")),
+                (Decimal("0.45556"), Decimal("145.55556")),
+            ],
+        )
+        self.assertEqual(
+            RFQAnalyzer(rfqs[0]).handle().profit_margin,
+            transactions[0].analyzed_profit_margin,
+        )
+
+    def test_saved_curve_invalidates_cache(self):
+        default = pricing_cache.get_margin_policy()
+        self.assertIs(pricing_cache.get_margin_policy(), default)
+
+        MarginCurve.objects.create(
+            customer=self.customers[0], quantities=[1], margins=[Decimal("0.2")]
+        )
+
+        policy = pricing_cache.get_margin_policy()
+        self.assertIsNot(policy, default)
+        self.assertEqual(policy.get_margin(1, self.customers[0].id), Decimal("0.2"))
@@ -0,0 +1,104 @@
+from django.test import TransactionTestCase
+
+from bababos.pricing.models import (
+    RFQ,
+    CustomerFactory,
+    POFactory,
+    ProductFactory,
+    RFQFactory,
+    SupplierFactory,
+    SupplierPrice,
+    SupplierPriceFactory,
+    Transaction,
+)
+from bababos.pricing.services import ParallelSupplierRecommender, SupplierRecommender
+
+
+class TestParallelSupplierRecommender(TransactionTestCase):
+    def setUp(self) -> None:
+        customer = CustomerFactory()
+        suppliers = [SupplierFactory() for _ in range(2)]
+        self.products = [ProductFactory(sku=f"SKU-{i}") for i in range(4)]
+        for i, product in enumerate(self.products):
+            POFactory(customer=customer, product=product, quantity=1, price=800_000)
+            for supplier in suppliers:
+                SupplierPriceFactory(
+                    supplier=supplier,
+                    product=product,
+                    price=730_000 + i * 10_000,
+                    available_stock=100,
+                )
+        for product, quantity in [
+            (0, 150),
+            (0, 20),
+            (1, 80),
+            (2, 40),
+            (3, 120),
+            (0, 50),
+        ]:
+            RFQFactory(
+                customer=customer, product=self.products[product], quantity=quantity
+            )
+
+    @staticmethod
+    def get_transactions():
+        return list(
+            Transaction.objects.order_by("rfq_id", "supplier_price_id").values_list(
+                "rfq_id",
+                "supplier_price_id",
+                "chosen_price",
+                "final_price",
+                "analyzed_profit_margin",
+                "quantity",
+                "rule",
+            )
+        )
+
+    def test_shards_by_product(self):
+        shards = ParallelSupplierRecommender(workers=2).get_shards(RFQ.objects.all())
+
+        self.assertEqual(len(shards), 2)
+        self.assertEqual(
+            sorted(sum(shards, [])), sorted(product.id for product in self.products)
+        )
+
+    def test_same_as_serial(self):
+        SupplierRecommender().handle()
+        serial = self.get_transactions()
+        Transaction.objects.all().delete()
+
+        recommender = ParallelSupplierRecommender(workers=2).handle()
+
+        self.assertEqual(self.get_transactions(), serial)
+        self.assertEqual(recommender.rfq_count, 6)
+        self.assertEqual(recommender.get_stats()["inserted"], len(serial))
+
+    def test_reserve_stock(self):
+        recommender = SupplierRecommender(reserve_stock=True).handle()
+        serial = self.get_transactions()
+        stocks = dict(SupplierPrice.objects.values_list("id", "available_stock"))
+        Transaction.objects.all().delete()
+        SupplierPrice.objects.update(available_stock=100)
+
+        parallel = ParallelSupplierRecommender(workers=2, reserve_stock=True).handle()
+
+        self.assertEqual(self.get_transactions(), serial)
+        self.assertEqual(parallel.reserved, recommender.reserved)
+        self.assertEqual(
+            dict(SupplierPrice.objects.values_list("id", "available_stock")), stocks
+        )
+
+    def test_filtered_rfqs(self):
+        rfqs = RFQ.objects.filter(quantity__lt=100)
+        SupplierRecommender().handle(rfqs)
+        serial = self.get_transactions()
+        Transaction.objects.all().delete()
+
+        recommender = ParallelSupplierRecommender(workers=2).handle(rfqs)
+
+        self.assertEqual(self.get_transactions(), serial)
+        self.assertEqual(recommender.rfq_count, 4)
+        self.assertEqual(
+            set(Transaction.objects.values_list("rfq__quantity", flat=True)),
+            {20, 80, 40, 50},
+        )
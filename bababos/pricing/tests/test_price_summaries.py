@@ -0,0 +1,94 @@
+import datetime
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from bababos.pricing.models import (
+    PO,
+    CustomerFactory,
+    CustomerProductPriceSummary,
+    POFactory,
+    ProductFactory,
+)
+
+
+class TestCustomerProductPriceSummary(TestCase):
+    def setUp(self) -> None:
+        self.customer = CustomerFactory(code="M1-ABDI-11", user__username="m1-abdi-11")
+        self.product = ProductFactory(sku="SKU-1")
+
+    def order(self, price, days_ago, product=None):
+        return POFactory(
+            customer=self.customer,
+            product=product or self.product,
+            price=price,
+            quantity=1,
+            unit="Batang",
+            ordered_at=timezone.now() - datetime.timedelta(days=days_ago),
+        )
+
+    def get_summary(self):
+        return CustomerProductPriceSummary.objects.get(
+            customer=self.customer, product=self.product
+        )
+
+    def assertSummary(self, po_count, prices, last_price):
+        summary = self.get_summary()
+        self.assertEqual(summary.po_count, po_count)
+        self.assertEqual(summary.prices, [Decimal(price) for price in prices])
+        self.assertEqual(summary.last_price, Decimal(last_price))
+
+    def test_saved_purchase_orders_are_added(self):
+        self.order(800_000, days_ago=3)
+        self.order(700_000, days_ago=1)
+        # Fed late, but ordered before the others
+        self.order(800_000, days_ago=5)
+
+        self.assertSummary(3, [700_000, 800_000], 700_000)
+        self.assertEqual(self.get_summary().min_price, Decimal(700_000))
+        self.assertEqual(self.get_summary().max_price, Decimal(800_000))
+
+    def test_updated_purchase_order_is_refreshed(self):
+        self.order(800_000, days_ago=3)
+        purchase_order = self.order(700_000, days_ago=1)
+
+        purchase_order.price = 750_000
+        purchase_order.save()
+
+        self.assertSummary(2, [750_000, 800_000], 750_000)
+
+    def test_deleted_purchase_orders_are_refreshed(self):
+        first = self.order(800_000, days_ago=3)
+        last = self.order(700_000, days_ago=1)
+
+        last.delete()
+        self.assertSummary(1, [800_000], 800_000)
+
+        first.delete()
+        self.assertFalse(CustomerProductPriceSummary.objects.exists())
+
+    def test_rebuild(self):
+        self.order(800_000, days_ago=3)
+        self.order(700_000, days_ago=1)
+        self.order(650_000, days_ago=2, product=ProductFactory(sku="SKU-2"))
+        expected = list(
+            CustomerProductPriceSummary.objects.order_by("product_id").values_list(
+                "customer_id", "product_id", "po_count", "prices", "last_price"
+            )
+        )
+        # Bulk writes send no signal
+        PO.objects.filter(product=self.product, price=700_000).update(price=720_000)
+        expected[0] = (*expected[0][:3], [Decimal(720_000), Decimal(800_000)], 720_000)
+
+        call_command("rebuild_price_summaries", stdout=open("/dev/null", "w"))
+
+        self.assertEqual(
+            list(
+                CustomerProductPriceSummary.objects.order_by("product_id").values_list(
+                    "customer_id", "product_id", "po_count", "prices", "last_price"
+                )
+            ),
+            expected,
+        )
@@ -0,0 +1,155 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from parameterized import parameterized
+
+from bababos.pricing.models import (
+    RFQ,
+    CustomerFactory,
+    POFactory,
+    ProductFactory,
+    RFQFactory,
+    SupplierFactory,
+    SupplierPriceFactory,
+)
+from bababos.pricing.services import (
+    PricingProfiler,
+    StreamingSupplierRecommender,
+    SupplierRecommender,
+)
+from bababos.pricing.services.supplier_recommender import RFQAnalyzer
+
+
+class TestPricingProfiler(TestCase):
+    def test_batch_share(self):
+        profiler = PricingProfiler()
+
+        profiler.observe("decision", 0.02, 4, rfqs=10)
+        profiler.observe("write", 0.5, 1, rfqs=0)
+
+        histogram = profiler.seconds_histograms["decision"]
+        self.assertEqual(histogram.count, 10)
+        self.assertEqual(histogram.get_buckets()["0.001"], 0)
+        self.assertEqual(histogram.get_buckets()["0.005"], 10)
+        self.assertEqual(profiler.queries_histograms["decision"].get_buckets()["1"], 10)
+        self.assertEqual(
+            profiler.get_summary()["write"],
+            {"seconds": 0.5, "queries": 1, "rfqs": 0, "ms_per_rfq": 500.0},
+        )
+
+    def test_merge(self):
+        profiler = PricingProfiler()
+        profiler.observe("prefetch", 0.01, 2, rfqs=5)
+        other = PricingProfiler()
+        other.observe("prefetch", 0.03, 1, rfqs=5)
+
+        profiler.merge(other)
+
+        self.assertEqual(profiler.get_summary()["prefetch"]["queries"], 3)
+        self.assertEqual(profiler.seconds_histograms["prefetch"].count, 10)
+        self.assertAlmostEqual(profiler.seconds_histograms["prefetch"].total, 0.04)
+
+    def test_prometheus(self):
+        profiler = PricingProfiler()
+        profiler.observe("po_histories", 0.002, 1, rfqs=2)
+
+        lines = profiler.to_prometheus().splitlines()
+
+        self.assertIn("# TYPE bababos_pricing_phase_seconds histogram", lines)
+        self.assertIn(
+            'bababos_pricing_phase_seconds_bucket{phase="po_histories",le="0.001"} 2',
+            lines,
+        )
+        self.assertIn(
+            'bababos_pricing_phase_seconds_bucket{phase="po_histories",le="+Inf"} 2',
+            lines,
+        )
+        self.assertIn(
+            'bababos_pricing_phase_seconds_count{phase="po_histories"} 2', lines
+        )
+        self.assertIn(
+            'bababos_pricing_phase_queries_total{phase="po_histories"} 1', lines
+        )
+
+
+class TestProfiledPricing(TestCase):
+    def setUp(self) -> None:
+        products = [ProductFactory(sku=f"SKU-{i}") for i in range(2)]
+        customer = CustomerFactory()
+        for product in products:
+            SupplierPriceFactory(
+                supplier=SupplierFactory(),
+                product=product,
+                price=730_000,
+                available_stock=100,
+            )
+            POFactory(customer=customer, product=product, quantity=1, price=800_000)
+            for quantity in [10, 20]:
+                RFQFactory(customer=customer, product=product, quantity=quantity)
+
+    @parameterized.expand(
+        [("serial", SupplierRecommender), ("stream", StreamingSupplierRecommender)]
+    )
+    def test_phases(self, _, recommender_class):
+        recommender = recommender_class(batch_size=2, profile=True).handle()
+
+        summary = recommender.profiler.get_summary()
+        self.assertEqual(list(summary), PricingProfiler.PHASES)
+        for phase in PricingProfiler.PHASES:
+            self.assertEqual(summary[phase]["rfqs"], 4, phase)
+        # RFQs and supplier prices, then PO summaries, of each of 2 batches
+        self.assertEqual(summary["prefetch"]["queries"], 4)
+        self.assertEqual(summary["po_histories"]["queries"], 2)
+        self.assertEqual(summary["decision"]["queries"], 0)
+        self.assertGreater(summary["write"]["queries"], 0)
+
+    def test_disabled(self):
+        recommender = SupplierRecommender().handle()
+
+        self.assertIsNone(recommender.profiler)
+
+    def test_analyzer(self):
+        profiler = PricingProfiler()
+
+        rfqs = list(RFQ.objects.order_by("id"))
+        with connection.execute_wrapper(profiler):
+            for rfq in rfqs:
+                RFQAnalyzer(rfq, profiler=profiler).handle()
+
+        summary = profiler.get_summary()
+        self.assertEqual(summary["prefetch"]["rfqs"], 4)
+        self.assertEqual(summary["prefetch"]["queries"], 8)
+        self.assertEqual(summary["po_histories"]["queries"], 4)
+        self.assertEqual(summary["decision"]["queries"], 0)
+
+    def test_decide_profile(self):
+        stdout = io.StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            json_path = os.path.join(directory, "profile.json")
+            prometheus_path = os.path.join(directory, "profile.prom")
+
+            call_command(
+                "decide",
+                "--profile",
+                "--profile-json",
+                json_path,
+                "--profile-prometheus",
+                prometheus_path,
+                stdout=stdout,
+            )
+
+            with open(json_path) as json_file:
+                profile = json.load(json_file)
+            with open(prometheus_path) as prometheus_file:
+                prometheus = prometheus_file.read()
+
+        self.assertIn("Phase po_histories: ", stdout.getvalue())
+        self.assertEqual(profile["decision"]["seconds_per_rfq"]["count"], 4)
+        self.assertIn(
+            'bababos_pricing_phase_seconds_count{phase="write"} 4', prometheus
+        )
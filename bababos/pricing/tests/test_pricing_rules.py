@@ -0,0 +1,171 @@
+import random
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from parameterized import parameterized
+
+from bababos.pricing.models import (
+    RFQ,
+    CustomerFactory,
+    POFactory,
+    ProductFactory,
+    RFQFactory,
+    SupplierFactory,
+    SupplierPriceFactory,
+    Transaction,
+)
+from bababos.pricing.services import (
+    PricingRuleRegistry,
+    SupplierRecommender,
+    pricing_rules,
+)
+from bababos.pricing.services.batch_pricing import BatchPricingEngine
+from bababos.pricing.services.pricing_rules import (
+    DEFAULT_RULES,
+    PricingRule,
+    RFQFeatures,
+)
+from bababos.pricing.services.supplier_recommender import RFQAnalyzer
+
+
+class TestRuleTable(SimpleTestCase):
+    def test_batch_same_as_scalar(self):
+        table = pricing_rules.compile()
+        rng = random.Random(25)
+        rows = []
+        for _ in range(2000):
+            po_prices = sorted({rng.randint(1, 4) for _ in range(rng.randint(0, 3))})
+            bids = [rng.randint(1, 4) for _ in range(rng.randint(0, 3))]
+            rows.append(
+                RFQFeatures(
+                    po_count=len(po_prices) + rng.randint(0, 1) * bool(po_prices),
+                    po_unique=len(po_prices),
+                    po_price=rng.choice(po_prices) if po_prices else 0,
+                    po_min=min(po_prices, default=0),
+                    po_max=max(po_prices, default=0),
+                    supplier_count=len(bids),
+                    supplier_unique=len(set(bids)),
+                    supplier_min=min(bids, default=0),
+                    supplier_max=max(bids, default=0),
+                )
+            )
+        features = RFQFeatures(*map(np.array, zip(*rows)))
+
+        rule_ids = table.get_rule_ids(table.match_many(features))
+
+        self.assertEqual(rule_ids.tolist(), [table.match(row).rule_id for row in rows])
+        # Every branch of the tree is taken
+        self.assertEqual(set(rule_ids), {rule.rule_id for rule in DEFAULT_RULES})
+
+    def test_register(self):
+        registry = PricingRuleRegistry(DEFAULT_RULES)
+        table = registry.compile()
+        self.assertIs(registry.compile(), table)
+
+        first = PricingRule("first", lambda f: f.po_count > 9, "First")
+        registry.register(first, before="no_supplier")
+        replaced = PricingRule("no_supplier", lambda f: f.supplier_count < 0, "None")
+        registry.register(replaced)
+        registry.unregister("po_multiple_suppliers")
+
+        rules = registry.compile().rules
+        self.assertIsNot(registry.compile(), table)
+        self.assertEqual(rules[:2], (first, replaced))
+        self.assertEqual(len(rules), len(DEFAULT_RULES))
+        self.assertNotIn("po_multiple_suppliers", registry)
+
+    def test_unmatched(self):
+        table = PricingRuleRegistry().compile()
+        features = RFQFeatures(*[np.zeros(3, dtype="int64")] * 9)
+
+        self.assertIsNone(table.match(RFQFeatures(*[0] * 9)))
+        self.assertEqual(
+            table.get_rule_ids(table.match_many(features)).tolist(), [None] * 3
+        )
+
+    @parameterized.expand(
+        [
+            ("unknown_pricing", {"pricing": "free"}),
+            ("unknown_feature", {"pricing": PricingRule.COMMON, "price": "po"}),
+            ("missing_base", {"pricing": PricingRule.MARGIN, "price": "po_price"}),
+        ]
+    )
+    def test_invalid_rule(self, _, options):
+        with self.assertRaises(ValueError):
+            PricingRule("invalid", lambda f: True, "Invalid", **options)
+
+
+class TestPricingRules(TestCase):
+    def setUp(self) -> None:
+        self.customer = CustomerFactory()
+        self.product = ProductFactory(sku="SKU-1")
+
+    def create_rfq(self, po_prices, supplier_prices, quantity=5):
+        for price in po_prices:
+            POFactory(
+                customer=self.customer, product=self.product, price=price, quantity=1
+            )
+        for price in supplier_prices:
+            SupplierPriceFactory(
+                supplier=SupplierFactory(),
+                product=self.product,
+                price=price,
+                available_stock=3,
+            )
+        return RFQFactory(
+            customer=self.customer, product=self.product, quantity=quantity
+        )
+
+    @parameterized.expand(
+        [
+            ("no_supplier", [700_000], []),
+            ("single_po_lower_bid", [800_000], [730_000, 730_000]),
+            ("unique_po_equal_supplier", [730_000, 730_000], [730_000]),
+            ("no_po_single_supplier", [], [730_000]),
+            ("po_lower_supplier", [800_000, 900_000], [730_000]),
+        ]
+    )
+    def test_unpriced_rules(self, rule_id, po_prices, supplier_prices):
+        rfq = self.create_rfq(po_prices, supplier_prices)
+
+        analyzer = RFQAnalyzer(RFQ.objects.get(pk=rfq.pk)).handle()
+        engine = BatchPricingEngine().handle()
+
+        self.assertEqual(analyzer.rule.rule_id, rule_id)
+        self.assertIsNone(analyzer.chosen_price)
+        self.assertEqual(engine.decisions.loc[rfq.id, "rule"], rule_id)
+        self.assertEqual(engine.get_transactions(), [])
+
+    def test_custom_rule(self):
+        rfq = self.create_rfq([730_000, 730_000], [730_000])
+        registry = PricingRuleRegistry(DEFAULT_RULES).register(
+            PricingRule(
+                "unique_po_equal_supplier",
+                lambda f: (f.supplier_count == 1)
+                & (f.po_unique == 1)
+                & (f.supplier_min == f.po_min),
+                "Has {po_count} PO histories, all at the supplier price",
+                PricingRule.COMMON,
+                price="supplier_min",
+            )
+        )
+
+        analyzer = RFQAnalyzer(rfq, rule_table=registry.compile()).handle()
+        engine = BatchPricingEngine(rule_table=registry.compile()).handle()
+
+        self.assertEqual(analyzer.chosen_price, 730_000)
+        self.assertEqual(analyzer.note, "Has 2 PO histories, all at the supplier price")
+        self.assertEqual(engine.decisions.loc[rfq.id, "chosen_price"], 730_000)
+        self.assertEqual(
+            engine.decisions.loc[rfq.id, "final_price"], analyzer.final_price
+        )
+
+    def test_transactions_record_the_rule(self):
+        self.create_rfq([700_000], [730_000])
+
+        SupplierRecommender().handle()
+
+        self.assertEqual(
+            list(Transaction.objects.values_list("rule", flat=True)),
+            ["single_po_single_supplier_lower"],
+        )
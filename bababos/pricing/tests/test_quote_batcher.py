@@ -0,0 +1,164 @@
+import asyncio
+import threading
+
+from django.test import AsyncClient, TestCase
+from django.urls import reverse
+
+from bababos.pricing.models import (
+    CustomerFactory,
+    POFactory,
+    ProductFactory,
+    SupplierFactory,
+    SupplierPriceFactory,
+)
+from bababos.pricing.models.customer import UserFactory
+from bababos.pricing.services import QuoteBatcher, pricing_cache
+
+
+class EchoBatcher(QuoteBatcher):
+    # Answers every quote with its quantity, without the database
+    @staticmethod
+    def price(requests):
+        return [quantity for _, _, quantity in requests]
+
+
+class TestQuoteBatcher(TestCase):
+    def setUp(self) -> None:
+        pricing_cache.clear()
+        self.customers = [
+            CustomerFactory(code=f"M1-CUST-{n}", user__username=f"m1-cust-{n}")
+            for n in range(2)
+        ]
+        self.products = [ProductFactory(sku=f"SKU-{n}") for n in range(2)]
+        for product in self.products:
+            for price in [730_000, 750_000]:
+                SupplierPriceFactory(
+                    supplier=SupplierFactory(),
+                    product=product,
+                    price=price,
+                    available_stock=100,
+                )
+            for customer in self.customers:
+                POFactory(
+                    customer=customer,
+                    product=product,
+                    price=700_000,
+                    quantity=1,
+                    unit="Batang",
+                )
+        self.requests = [
+            (customer, product, quantity)
+            for customer in self.customers
+            for product in self.products
+            for quantity in [5, 150]
+        ]
+        self.staff = UserFactory(is_staff=True)
+
+    async def quote_all(self, batcher):
+        return await asyncio.gather(
+            *[batcher.quote(*request) for request in self.requests]
+        )
+
+    async def test_concurrent_quotes_share_a_batch(self):
+        batcher = QuoteBatcher(window=0.05, max_batch_size=100)
+
+        analyzers = await self.quote_all(batcher)
+
+        self.assertEqual(batcher.batches, 1)
+        self.assertEqual(
+            [(analyzer.customer, analyzer.product) for analyzer in analyzers],
+            [(customer, product) for customer, product, _ in self.requests],
+        )
+
+    def test_same_as_cache(self):
+        for request, analyzer in zip(self.requests, QuoteBatcher.price(self.requests)):
+            expected = pricing_cache.quote(*request)
+            self.assertEqual(analyzer.final_price, expected.final_price)
+            self.assertEqual(analyzer.note, expected.note)
+            self.assertEqual(
+                [candidate.supplier_price_id for candidate in analyzer.supplier_prices],
+                [candidate.supplier_price_id for candidate in expected.supplier_prices],
+            )
+
+    async def test_max_batch_size(self):
+        batcher = QuoteBatcher(window=0.05, max_batch_size=3)
+
+        analyzers = await self.quote_all(batcher)
+
+        self.assertEqual(list(batcher.batch_sizes), [3, 3, 2])
+        metrics = batcher.get_metrics()
+        self.assertEqual(metrics["quotes"], 8)
+        self.assertEqual(metrics["full_batches"], 2)
+        self.assertAlmostEqual(metrics["mean_batch_fill"], 8 / 9)
+        self.assertEqual(len(analyzers), 8)
+
+    def test_queue_per_event_loop(self):
+        batcher = EchoBatcher(window=0.05, max_batch_size=100)
+        barrier = threading.Barrier(2)
+        results = {}
+
+        async def quote_twice(thread):
+            barrier.wait()
+            return await asyncio.gather(
+                *[batcher.quote(None, None, (thread, n)) for n in range(2)]
+            )
+
+        def run(thread):
+            # Every thread runs its own loop, as async_to_sync does under WSGI
+            results[thread] = asyncio.run(quote_twice(thread))
+
+        threads = [threading.Thread(target=run, args=(thread,)) for thread in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(
+            results, {thread: [(thread, 0), (thread, 1)] for thread in range(2)}
+        )
+        self.assertEqual(list(batcher.batch_sizes), [2, 2])
+        self.assertEqual(len(batcher.queues), 0)
+
+    def test_drained_queues_are_dropped(self):
+        batcher = EchoBatcher(window=0.001)
+
+        # A loop per request, as async_to_sync does under WSGI
+        for n in range(50):
+            self.assertEqual(asyncio.run(batcher.quote(None, None, n)), n)
+
+        self.assertEqual(len(batcher.queues), 0)
+
+    def test_one_query_per_table(self):
+        with self.assertNumQueries(3):
+            QuoteBatcher.price(self.requests)
+
+        # Margin curves are kept by the pricing cache
+        with self.assertNumQueries(2):
+            QuoteBatcher.price(self.requests)
+
+    async def test_async_view(self):
+        customer, product, quantity = self.requests[1]
+        data = {"customer": customer.code, "sku": product.sku, "quantity": quantity}
+        client = AsyncClient()
+        anonymous = await client.post(
+            reverse("async-quotes"), data, content_type="application/json"
+        )
+        await client.aforce_login(self.staff)
+
+        response = await client.post(
+            reverse("async-quotes"), data, content_type="application/json"
+        )
+        invalid = await client.post(
+            reverse("async-quotes"),
+            {**data, "sku": "SKU-404"},
+            content_type="application/json",
+        )
+        metrics = await client.get(reverse("async-quotes-metrics"))
+
+        self.assertEqual(anonymous.status_code, 403)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["sku"], product.sku)
+        self.assertEqual(response.json()["final_price"], "825000.00000")
+        self.assertEqual(invalid.status_code, 400)
+        self.assertIn("sku", invalid.json())
+        self.assertGreaterEqual(metrics.json()["batches"], 1)
@@ -0,0 +1,229 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+from parameterized import parameterized
+from rest_framework.test import APIClient
+
+from bababos.pricing.models import (
+    CustomerFactory,
+    POFactory,
+    ProductFactory,
+    RFQFactory,
+    SupplierFactory,
+    SupplierPrice,
+    SupplierPriceFactory,
+)
+from bababos.pricing.models.customer import UserFactory
+from bababos.pricing.services import pricing_cache
+from bababos.pricing.services.supplier_recommender import RFQAnalyzer
+
+
+class TestQuotes(TestCase):
+    def setUp(self) -> None:
+        pricing_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(UserFactory(is_staff=True))
+        self.customer = CustomerFactory(code="M1-ABDI-11")
+        self.product = ProductFactory(sku="SKU-1")
+        self.supplier = SupplierFactory(code="S1-JAY-1")
+        self.supplier_price = SupplierPriceFactory(
+            supplier=self.supplier,
+            product=self.product,
+            price=730_000,
+            available_stock=300,
+        )
+        POFactory(
+            customer=self.customer,
+            product=self.product,
+            price=700_000,
+            quantity=10,
+            unit="Batang",
+        )
+
+    def quote(self, quantity=500, customer="M1-ABDI-11", sku="SKU-1"):
+        return self.client.post(
+            reverse("quotes"),
+            {"customer": customer, "sku": sku, "quantity": quantity},
+            format="json",
+        )
+
+    def test_quote(self):
+        response = self.quote()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "customer": "M1-ABDI-11",
+                "sku": "SKU-1",
+                "quantity": 500,
+                "chosen_price": "730000.00000",
+                "final_price": "803000.00000",
+                "profit_margin": "0.10000",
+                "rule": "single_po_single_supplier_lower",
+                "note": "Single PO history, single supplier price, and last PO history price less than or equal with candidate supplier price",
+                "suppliers": [
+                    {
+                        "supplier_price": self.supplier_price.id,
+                        "supplier": "S1-JAY-1",
+                        "price": "730000.00000",
+                        "quantity": 300,
+                    }
+                ],
+            },
+        )
+
+    def test_staff_only(self):
+        self.client.force_authenticate(None)
+        anonymous = self.quote()
+        self.client.force_authenticate(UserFactory())
+        customer = self.quote()
+
+        self.assertEqual(anonymous.status_code, 403)
+        self.assertEqual(customer.status_code, 403)
+
+    @parameterized.expand(
+        [
+            ("single_po_higher_bids", 500, [700_000], [730_000, 750_000]),
+            ("single_po_keep_po", 5, [900_000], [730_000]),
+            ("many_po_many_suppliers", 200, [700_000, 800_000], [730_000, 750_000]),
+            ("many_po_single_supplier", 50, [700_000, 800_000], [750_000]),
+        ]
+    )
+    def test_same_as_analyzer(self, _, quantity, po_prices, supplier_prices):
+        customer = CustomerFactory()
+        product = ProductFactory()
+        for price in po_prices:
+            POFactory(
+                customer=customer,
+                product=product,
+                price=price,
+                quantity=1,
+                unit="Batang",
+            )
+        for price in supplier_prices:
+            SupplierPriceFactory(
+                supplier=SupplierFactory(),
+                product=product,
+                price=price,
+                available_stock=100,
+            )
+        analyzer = RFQAnalyzer(
+            RFQFactory(customer=customer, product=product, quantity=quantity)
+        ).handle()
+
+        quote = pricing_cache.quote(customer, product, quantity)
+
+        self.assertEqual(quote.chosen_price, analyzer.chosen_price)
+        self.assertEqual(quote.final_price, analyzer.final_price)
+        self.assertEqual(quote.profit_margin, analyzer.profit_margin)
+        self.assertEqual(quote.note, analyzer.note)
+        self.assertEqual(
+            [
+                (candidate.supplier_price_id, candidate.purchased_stock)
+                for candidate in quote.supplier_prices
+            ],
+            [
+                (candidate.supplier_price_id, candidate.purchased_stock)
+                for candidate in analyzer.supplier_prices
+            ],
+        )
+
+    def test_warm_cache_does_not_query(self):
+        self.quote()
+
+        with self.assertNumQueries(0):
+            response = self.quote(quantity=5)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_supplier_price_write_invalidates(self):
+        self.quote()
+
+        self.supplier_price.price = 740_000
+        self.supplier_price.save()
+
+        self.assertEqual(self.quote().json()["chosen_price"], "740000.00000")
+
+    def test_purchase_order_write_invalidates(self):
+        self.assertTrue(self.quote().json()["note"].startswith("Single PO history"))
+
+        POFactory(
+            customer=self.customer,
+            product=self.product,
+            price=800_000,
+            quantity=10,
+            unit="Batang",
+        )
+
+        self.assertEqual(
+            self.quote().json()["note"],
+            "Has 2 PO histories, one supplier price, and supplier price between PO histories",
+        )
+
+    def test_stale_entries_are_loaded_again(self):
+        self.addCleanup(setattr, pricing_cache, "max_age", pricing_cache.max_age)
+        pricing_cache.max_age = 0
+        self.quote()
+
+        # Bulk writes send no signal
+        SupplierPrice.objects.filter(pk=self.supplier_price.pk).update(
+            price=Decimal(750_000)
+        )
+
+        self.assertEqual(self.quote().json()["chosen_price"], "750000.00000")
+
+    def test_customers_and_products_are_bounded(self):
+        self.addCleanup(
+            setattr, pricing_cache, "max_customers", pricing_cache.max_customers
+        )
+        self.addCleanup(
+            setattr, pricing_cache, "max_products", pricing_cache.max_products
+        )
+        pricing_cache.max_customers = pricing_cache.max_products = 2
+        customers = [
+            CustomerFactory(code=f"C-{n}", user__username=f"c-{n}") for n in range(3)
+        ]
+        products = [ProductFactory(sku=f"SKU-C{n}") for n in range(3)]
+
+        for customer, product in zip(customers, products):
+            pricing_cache.get_customer(customer.code)
+            pricing_cache.get_product(product.sku)
+        pricing_cache.get_customer("M1-UNKN-11")
+
+        self.assertEqual(
+            list(pricing_cache.customers), [customer.code for customer in customers[1:]]
+        )
+        self.assertEqual(
+            list(pricing_cache.products), [product.sku for product in products[1:]]
+        )
+
+    @parameterized.expand(
+        [
+            ("unknown_customer", {"customer": "M1-UNKN-11"}, "customer"),
+            ("unknown_sku", {"sku": "SKU-404"}, "sku"),
+            ("zero_quantity", {"quantity": 0}, "quantity"),
+        ]
+    )
+    def test_invalid_request(self, _, data, field):
+        response = self.quote(**data)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(field, response.json())
+
+    def test_no_decision(self):
+        # One supplier price below every PO history has no branch
+        POFactory(
+            customer=self.customer,
+            product=self.product,
+            price=800_000,
+            quantity=10,
+            unit="Batang",
+        )
+        self.supplier_price.price = 600_000
+        self.supplier_price.save()
+
+        response = self.quote()
+
+        self.assertEqual(response.status_code, 422)
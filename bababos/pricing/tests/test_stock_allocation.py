@@ -0,0 +1,185 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from bababos.pricing.models import (
+    LogisticFactory,
+    LogisticPriceFactory,
+    ProductFactory,
+    RegionFactory,
+    SupplierFactory,
+    SupplierPriceFactory,
+)
+from bababos.pricing.services import LogisticRecommender
+from bababos.pricing.services.stock_allocation import StockAllocationIndex
+
+
+class TestStockAllocationIndex(TestCase):
+    def setUp(self) -> None:
+        self.product = ProductFactory()
+        self.supplier_prices = [
+            SupplierPriceFactory(
+                supplier=SupplierFactory(),
+                product=self.product,
+                price=price,
+                available_stock=stock,
+            )
+            for price, stock in [
+                (750_000, 200),
+                (730_000, 300),
+                (700_000, 0),
+                (760_000, 100),
+            ]
+        ]
+
+    def test_allocate_from_cheapest_supplier(self):
+        index = StockAllocationIndex()
+
+        allocations = index.allocate(self.product.id, 400)
+
+        self.assertEqual(
+            [(a.supplier_price_id, a.purchased_stock) for a in allocations],
+            [(self.supplier_prices[1].id, 300), (self.supplier_prices[0].id, 100)],
+        )
+        self.assertEqual(allocations[1].remaining_stock, 100)
+
+    def test_allocations_share_stock(self):
+        index = StockAllocationIndex()
+
+        index.allocate(self.product.id, 400)
+        allocations = index.allocate(self.product.id, 150)
+
+        self.assertEqual(
+            [
+                (a.supplier_price_id, a.available_stock, a.purchased_stock)
+                for a in allocations
+            ],
+            [
+                (self.supplier_prices[0].id, 100, 100),
+                (self.supplier_prices[3].id, 100, 50),
+            ],
+        )
+        self.assertEqual(index.products[self.product.id].cursor, 2)
+        self.assertEqual(index.allocate(self.product.id, 100)[0].purchased_stock, 50)
+        self.assertEqual(index.allocate(self.product.id, 100), [])
+        self.assertEqual(
+            index.get_remaining_stocks(),
+            {
+                self.supplier_prices[1].id: 0,
+                self.supplier_prices[0].id: 0,
+                self.supplier_prices[3].id: 0,
+            },
+        )
+
+    def test_release(self):
+        index = StockAllocationIndex()
+        allocations = index.allocate(self.product.id, 350)
+        index.allocate(self.product.id, 100)
+
+        index.release(self.product.id, allocations)
+
+        self.assertEqual(index.products[self.product.id].cursor, 0)
+        self.assertEqual(
+            index.get_allocated_stocks(), {self.supplier_prices[0].id: 100}
+        )
+        self.assertEqual(
+            [
+                (a.supplier_price_id, a.purchased_stock)
+                for a in index.allocate(self.product.id, 400)
+            ],
+            [(self.supplier_prices[1].id, 300), (self.supplier_prices[0].id, 100)],
+        )
+
+    def test_load_product_once(self):
+        index = StockAllocationIndex().load([self.product.id])
+
+        with self.assertNumQueries(0):
+            index.load([self.product.id])
+            index.allocate(self.product.id, 10)
+
+    def test_ignore_superseded_prices(self):
+        SupplierPriceFactory(
+            supplier=self.supplier_prices[1].supplier,
+            product=self.product,
+            price=600_000,
+            available_stock=1000,
+            latest=False,
+        )
+
+        allocations = StockAllocationIndex().allocate(self.product.id, 100)
+
+        self.assertEqual(
+            [a.supplier_price_id for a in allocations], [self.supplier_prices[1].id]
+        )
+
+
+class TestLandedCostAllocation(TestCase):
+    def setUp(self) -> None:
+        self.cilincing = RegionFactory(name="Cilincing")
+        self.bekasi = RegionFactory(name="Kabupaten Bekasi")
+        fuso = LogisticFactory(fleet_type="Fuso", capacity=8)
+        tronton = LogisticFactory(fleet_type="Tronton", capacity=22)
+        for logistic, source, price in [
+            (fuso, self.cilincing, 1_800_000),
+            (tronton, self.cilincing, 3_450_000),
+            (fuso, self.bekasi, 100_000),
+        ]:
+            LogisticPriceFactory(
+                logistic=logistic,
+                source=source,
+                destination=self.bekasi,
+                price=price,
+            )
+
+        self.product = ProductFactory()
+        self.far, self.near = [
+            SupplierPriceFactory(
+                supplier=SupplierFactory(region=region),
+                product=self.product,
+                price=price,
+                available_stock=300,
+            )
+            for region, price in [(self.cilincing, 730_000), (self.bekasi, 750_000)]
+        ]
+        self.index = StockAllocationIndex(logistics=LogisticRecommender().load())
+
+    def test_allocate_from_lowest_landed_cost(self):
+        allocations = self.index.allocate(self.product.id, 20, self.bekasi.id)
+
+        # 750_000 plus 3 Fuso trips over 20 units beats 730_000 plus a Tronton
+        self.assertEqual(
+            [(a.supplier_price_id, a.purchased_stock, a.freight) for a in allocations],
+            [(self.near.id, 20, Decimal(15_000))],
+        )
+
+    def test_freight_of_purchased_stock(self):
+        allocations = self.index.allocate(self.product.id, 400, self.bekasi.id)
+
+        # The far supplier only delivers the last 100 units, in 5 Tronton trips
+        self.assertEqual(
+            [(a.supplier_price_id, a.purchased_stock, a.freight) for a in allocations],
+            [
+                (self.near.id, 300, Decimal("12666.66667")),
+                (self.far.id, 100, Decimal(172_500)),
+            ],
+        )
+        self.assertEqual(
+            self.index.allocate(self.product.id, 500, self.bekasi.id),
+            [(self.far.id, Decimal(730_000), 200, 200, 0, Decimal(172_500))],
+        )
+
+    def test_without_destination(self):
+        allocations = self.index.allocate(self.product.id, 20)
+
+        self.assertEqual(
+            [(a.supplier_price_id, a.freight) for a in allocations],
+            [(self.far.id, 0)],
+        )
+
+    def test_without_route(self):
+        allocations = self.index.allocate(self.product.id, 20, self.cilincing.id)
+
+        self.assertEqual(
+            [(a.supplier_price_id, a.freight) for a in allocations],
+            [(self.far.id, 0)],
+        )
@@ -0,0 +1,228 @@
+import datetime
+import io
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from parameterized import parameterized
+
+from bababos.pricing.models import (
+    RFQ,
+    CustomerFactory,
+    MarginCurve,
+    POFactory,
+    ProductFactory,
+    RFQFactory,
+    SupplierFactory,
+    SupplierPrice,
+    SupplierPriceFactory,
+    Transaction,
+)
+from bababos.pricing.services import (
+    StreamingSupplierRecommender,
+    SupplierRecommender,
+)
+
+
+class TestStockReservation(TestCase):
+    def setUp(self) -> None:
+        self.product = ProductFactory(sku="SKU-1")
+        self.supplier_price = SupplierPriceFactory(
+            supplier=SupplierFactory(),
+            product=self.product,
+            price=730_000,
+            available_stock=50,
+        )
+        customers = [
+            CustomerFactory(code=f"C-{tier}", user__username=f"c-{tier}", tier=tier)
+            for tier in [0, 2]
+        ]
+        for customer in customers:
+            POFactory(
+                customer=customer, product=self.product, quantity=1, price=800_000
+            )
+
+        now = timezone.now()
+        self.rfqs = []
+        for customer, quantity, minutes_ago in [(0, 40, 1), (1, 45, 2), (0, 5, 3)]:
+            rfq = RFQFactory(
+                customer=customers[customer], product=self.product, quantity=quantity
+            )
+            RFQ.objects.filter(pk=rfq.pk).update(
+                created=now - datetime.timedelta(minutes=minutes_ago)
+            )
+            self.rfqs.append(rfq)
+
+    def get_quantities(self):
+        quantities = dict(
+            Transaction.objects.values_list("rfq_id", "quantity"),
+        )
+        return [quantities.get(rfq.id, 0) for rfq in self.rfqs]
+
+    @parameterized.expand(
+        [
+            ("id", [40, 10, 0]),
+            ("created", [0, 45, 5]),
+            ("tier", [0, 45, 5]),
+            ("margin", [5, 45, 0]),
+        ]
+    )
+    def test_priority(self, priority, quantities):
+        SupplierRecommender(priority=priority).handle()
+
+        self.assertEqual(self.get_quantities(), quantities)
+
+    @parameterized.expand(
+        [("serial", SupplierRecommender), ("stream", StreamingSupplierRecommender)]
+    )
+    def test_margin_priority_uses_margin_curves(self, _, recommender_class):
+        # 90% on 40 units of the tier 0 customer beats 45 units on the default
+        MarginCurve.objects.create(
+            customer=self.rfqs[0].customer, quantities=[1], margins=[Decimal("0.9")]
+        )
+
+        recommender_class(priority="margin").handle()
+
+        self.assertEqual(self.get_quantities(), [40, 10, 0])
+
+    @parameterized.expand(
+        [("serial", SupplierRecommender), ("stream", StreamingSupplierRecommender)]
+    )
+    def test_reserve_stock(self, _, recommender_class):
+        self.supplier_price.available_stock = 100
+        self.supplier_price.save()
+        modified = SupplierPrice.objects.get().modified
+
+        recommender = recommender_class(reserve_stock=True).handle()
+
+        self.assertEqual(recommender.reserved, 1)
+        self.assertEqual(SupplierPrice.objects.get().available_stock, 10)
+        self.assertEqual(SupplierPrice.objects.get().modified, modified)
+
+        # Decided RFQs are not priced again, the new one gets what is left
+        rfq = RFQFactory(
+            customer=self.rfqs[0].customer, product=self.product, quantity=20
+        )
+        recommender = recommender_class(reserve_stock=True).handle()
+
+        self.assertEqual(recommender.rfq_count, 1)
+        self.assertEqual(recommender.reserved, 1)
+        self.assertEqual(SupplierPrice.objects.get().available_stock, 0)
+        self.assertEqual(Transaction.objects.get(rfq=rfq).quantity, 10)
+
+    def test_unpriced_rfq_reserves_nothing(self):
+        # No PO history and one supplier price, the rules leave it unpriced
+        product = ProductFactory(sku="SKU-2")
+        supplier_price = SupplierPriceFactory(
+            supplier=SupplierFactory(),
+            product=product,
+            price=730_000,
+            available_stock=50,
+        )
+        rfq = RFQFactory(customer=self.rfqs[0].customer, product=product, quantity=20)
+
+        for _ in range(2):
+            call_command(
+                "decide", "--reserve-stock", "--priority", "tier", stdout=io.StringIO()
+            )
+
+        supplier_price.refresh_from_db()
+        self.assertEqual(supplier_price.available_stock, 50)
+        self.assertFalse(Transaction.objects.filter(rfq=rfq).exists())
+        self.assertEqual(
+            SupplierPrice.objects.get(pk=self.supplier_price.pk).available_stock, 0
+        )
+
+    @parameterized.expand([("reserve", True, 1), ("no_reserve", False, 0)])
+    def test_reserve_stock_locks_supplier_prices(self, _, reserve_stock, locks):
+        with CaptureQueriesContext(connection) as queries:
+            SupplierRecommender(reserve_stock=reserve_stock).handle()
+
+        self.assertEqual(
+            len([query for query in queries if "FOR UPDATE" in query["sql"]]), locks
+        )
+
+    @parameterized.expand(
+        [
+            (
+                "serial",
+                SupplierRecommender,
+                "get_rfq_ids",
+                lambda rfqs: [rfq.id for rfq in rfqs],
+            ),
+            (
+                "stream",
+                StreamingSupplierRecommender,
+                "stream_rfqs",
+                lambda rfqs: iter([(rfq.id, rfq.product_id) for rfq in rfqs]),
+            ),
+        ]
+    )
+    def test_rfqs_decided_meanwhile_are_skipped(
+        self, _, recommender_class, listing, list_rfqs
+    ):
+        self.supplier_price.available_stock = 100
+        self.supplier_price.save()
+        # Listed before a concurrent run decided the first RFQ
+        recommender = recommender_class(reserve_stock=True)
+        recommender_class(reserve_stock=True).handle(
+            RFQ.objects.filter(pk=self.rfqs[0].pk)
+        )
+
+        with mock.patch.object(recommender, listing, return_value=list_rfqs(self.rfqs)):
+            recommender.handle()
+
+        self.assertEqual(self.get_quantities(), [40, 45, 5])
+        self.assertEqual(SupplierPrice.objects.get().available_stock, 10)
+
+    def test_oversold_reservation_fails(self):
+        other = SupplierPriceFactory(
+            supplier=SupplierFactory(),
+            product=self.product,
+            price=740_000,
+            available_stock=30,
+        )
+
+        with self.assertRaises(ValueError):
+            SupplierPrice.reserve_stocks({self.supplier_price.id: 60, other.id: 10})
+
+        # Reserved all or nothing
+        self.assertEqual(
+            dict(SupplierPrice.objects.values_list("id", "available_stock")),
+            {self.supplier_price.id: 50, other.id: 30},
+        )
+
+    @parameterized.expand(
+        [("serial", SupplierRecommender), ("stream", StreamingSupplierRecommender)]
+    )
+    def test_failed_reservation_writes_nothing(self, _, recommender_class):
+        with mock.patch.object(
+            SupplierPrice, "reserve_stocks", side_effect=DatabaseError
+        ), self.assertRaises(DatabaseError):
+            recommender_class(reserve_stock=True, flush_size=1).handle()
+
+        # The flushed transactions are rolled back with the reservation
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(SupplierPrice.objects.get().available_stock, 50)
+
+    def test_decide_reserve_stock(self):
+        stdout = io.StringIO()
+
+        call_command("decide", "--reserve-stock", "--priority", "tier", stdout=stdout)
+
+        self.assertIn("Reserved the stock of 1 supplier prices", stdout.getvalue())
+        self.assertEqual(SupplierPrice.objects.get().available_stock, 0)
+        self.assertEqual(self.get_quantities(), [0, 45, 5])
+
+    @parameterized.expand([("update", "--update"), ("incremental", "--incremental")])
+    def test_reserve_stock_only_once(self, _, option):
+        with self.assertRaises(CommandError):
+            call_command("decide", "--reserve-stock", option, stdout=io.StringIO())
+
+    def test_unknown_priority(self):
+        with self.assertRaises(ValueError):
+            SupplierRecommender(priority="size")
@@ -0,0 +1,112 @@
+import io
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from parameterized import parameterized
+
+from bababos.pricing.models import (
+    CustomerFactory,
+    POFactory,
+    ProductFactory,
+    RFQFactory,
+    SupplierFactory,
+    SupplierPriceFactory,
+    Transaction,
+)
+from bababos.pricing.services import StreamingSupplierRecommender, SupplierRecommender
+
+
+class TestStreamingSupplierRecommender(TestCase):
+    def setUp(self) -> None:
+        customers = [
+            CustomerFactory(code=f"M1-CUST-{i}", user__username=f"m1-cust-{i}")
+            for i in range(2)
+        ]
+        suppliers = [SupplierFactory() for _ in range(2)]
+        self.products = [ProductFactory(sku=f"SKU-{i}") for i in range(3)]
+        for i, product in enumerate(self.products):
+            POFactory(customer=customers[0], product=product, quantity=1, price=800_000)
+            for supplier in suppliers:
+                SupplierPriceFactory(
+                    supplier=supplier,
+                    product=product,
+                    price=730_000 + i * 10_000,
+                    available_stock=100,
+                )
+        # RFQs of a product are spread over the run and compete for its stock
+        for customer, product, quantity in [
+            (0, 0, 150),
+            (1, 1, 20),
+            (0, 0, 20),
+            (1, 2, 80),
+            (0, 1, 40),
+            (1, 0, 120),
+            (0, 2, 50),
+        ]:
+            RFQFactory(
+                customer=customers[customer],
+                product=self.products[product],
+                quantity=quantity,
+            )
+
+    @staticmethod
+    def get_transactions():
+        return list(
+            Transaction.objects.order_by("rfq_id", "supplier_price_id").values_list(
+                "rfq_id",
+                "supplier_price_id",
+                "chosen_price",
+                "final_price",
+                "analyzed_profit_margin",
+                "quantity",
+                "rule",
+            )
+        )
+
+    @parameterized.expand([("one_batch", 1000), ("small_batches", 2)])
+    def test_same_as_serial(self, _, batch_size):
+        SupplierRecommender().handle()
+        serial = self.get_transactions()
+        Transaction.objects.all().delete()
+
+        recommender = StreamingSupplierRecommender(batch_size=batch_size).handle()
+
+        self.assertEqual(self.get_transactions(), serial)
+        self.assertEqual(recommender.rfq_count, 7)
+        self.assertGreater(recommender.queries, 0)
+        self.assertGreater(recommender.peak_rss_mb, 0)
+
+    def test_bounded_context(self):
+        recommender = StreamingSupplierRecommender(
+            batch_size=2, max_context=2, min_batch_size=1
+        ).handle()
+
+        stats = recommender.get_context_stats()
+        self.assertEqual(stats["products"], 1)
+        self.assertEqual(stats["summaries"], 2)
+        self.assertEqual(stats["summary_hits"] + stats["summary_misses"], 6)
+
+    def test_max_memory(self):
+        recommender = StreamingSupplierRecommender(
+            batch_size=4, max_memory=100, min_batch_size=1
+        )
+
+        with mock.patch(
+            "bababos.pricing.services.streaming_recommender.get_rss_mb",
+            side_effect=[150, 150, 40],
+        ):
+            recommender.handle()
+
+        # Over the budget twice, then under half of it
+        self.assertEqual([size for size, _ in recommender.batch_timings], [4, 2, 1])
+        self.assertEqual(recommender.batch_size, 2)
+
+    def test_decide_stream(self):
+        stdout = io.StringIO()
+
+        call_command("decide", "--max-memory", "4096", stdout=stdout)
+
+        self.assertIn("Decided 7 RFQs", stdout.getvalue())
+        self.assertIn("Peak memory", stdout.getvalue())
+        self.assertIn("PO summaries kept", stdout.getvalue())
@@ -11,7 +11,10 @@ from bababos.pricing.models import (
     SupplierFactory,
     SupplierPriceFactory,
 )
-from bababos.pricing.services.supplier_recommender import RFQAnalyzer
+from bababos.pricing.services.supplier_recommender import (
+    CandidateSupplierPrice,
+    RFQAnalyzer,
+)
 
 
 class TestRFQAnalyzer(TestCase):
@@ -510,3 +513,34 @@ class TestRFQAnalyzer(TestCase):
         self, conf, param
     ):
         ...
+
+    def test_candidate_supplier_prices_resolve_models_lazily(self):
+        suppliers = [SupplierFactory() for _ in range(2)]
+        supplier_prices = [
+            SupplierPriceFactory(
+                supplier=supplier,
+                product=self.product,
+                price=price,
+                available_stock=10,
+            )
+            for supplier, price in zip(suppliers, [730_000, 750_000])
+        ]
+        POFactory(
+            customer=self.customer, product=self.product, quantity=1, price=800_000
+        )
+        rfq = RFQFactory(customer=self.customer, product=self.product, quantity=15)
+
+        candidates = RFQAnalyzer(rfq).handle().supplier_prices
+
+        self.assertEqual(
+            [
+                (candidate.supplier_price_id, candidate.purchased_stock)
+                for candidate in candidates
+            ],
+            [(supplier_prices[0].id, 10), (supplier_prices[1].id, 5)],
+        )
+        self.assertEqual(candidates[1].total, Decimal(3_750_000))
+        with self.assertNumQueries(1):
+            CandidateSupplierPrice.resolve(candidates)
+            self.assertEqual(candidates[0].supplier_price.supplier, suppliers[0])
+            self.assertEqual(candidates[1].supplier_price, supplier_prices[1])
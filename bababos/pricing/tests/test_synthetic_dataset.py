@@ -0,0 +1,38 @@
+from django.test import TestCase
+
+from bababos.pricing.models import PO, RFQ, Customer, Product, Supplier, SupplierPrice
+from bababos.pricing.services import SyntheticDataset
+
+
+class TestSyntheticDataset(TestCase):
+    def test_generate(self):
+        SyntheticDataset(
+            customers=4,
+            products=30,
+            suppliers=5,
+            purchase_orders_per_customer=10,
+            supplier_prices_per_product=2,
+            rfqs=8,
+            basket_size=3,
+        ).generate()
+
+        self.assertEqual(Customer.objects.count(), 4)
+        self.assertEqual(Supplier.objects.count(), 5)
+        self.assertEqual(Product.objects.count(), 30)
+        self.assertEqual(SupplierPrice.objects.filter(latest=True).count(), 60)
+        self.assertEqual(PO.objects.count(), 40)
+        self.assertEqual(RFQ.objects.count(), 8)
+
+        # Customers buy from, and ask for, the products of their basket
+        product_ids = list(Product.objects.order_by("id").values_list("id", flat=True))
+        customer_ids = list(
+            Customer.objects.order_by("id").values_list("id", flat=True)
+        )
+        baskets = {
+            customer_id: {product_ids[(n * 31 + k) % 30] for k in range(3)}
+            for n, customer_id in enumerate(customer_ids, start=1)
+        }
+        for customer_id, product_id in PO.objects.values_list("customer", "product"):
+            self.assertIn(product_id, baskets[customer_id])
+        for customer_id, product_id in RFQ.objects.values_list("customer", "product"):
+            self.assertIn(product_id, baskets[customer_id])
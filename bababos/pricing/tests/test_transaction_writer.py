@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from bababos.pricing.models import (
+    CustomerFactory,
+    ProductFactory,
+    RFQFactory,
+    SupplierFactory,
+    SupplierPriceFactory,
+    Transaction,
+)
+from bababos.pricing.services.transaction_writer import TransactionWriter
+
+
+class TestTransactionWriter(TestCase):
+    def setUp(self) -> None:
+        product = ProductFactory()
+        self.rfq = RFQFactory(customer=CustomerFactory(), product=product, quantity=10)
+        self.supplier_prices = [
+            SupplierPriceFactory(
+                supplier=SupplierFactory(code=f"S{i}", user__username=f"supplier-{i}"),
+                product=product,
+                price=730_000,
+                available_stock=5,
+            )
+            for i in range(3)
+        ]
+
+    def make_transaction(self, supplier_price, final_price=800_000):
+        return Transaction(
+            rfq=self.rfq,
+            supplier_price=supplier_price,
+            chosen_price=730_000,
+            final_price=final_price,
+            analyzed_profit_margin=Decimal("0.1"),
+            quantity=5,
+        )
+
+    def test_flush_when_buffer_is_full(self):
+        writer = TransactionWriter(flush_size=2)
+
+        writer.add(self.make_transaction(self.supplier_prices[0]))
+        self.assertEqual(Transaction.objects.count(), 0)
+
+        writer.add(self.make_transaction(self.supplier_prices[1]))
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(writer.buffer, [])
+
+    def test_skip_existing_transactions(self):
+        with TransactionWriter() as writer:
+            writer.add(self.make_transaction(self.supplier_prices[0]))
+
+        with TransactionWriter() as writer:
+            writer.extend(
+                [
+                    self.make_transaction(self.supplier_prices[0], final_price=900_000),
+                    self.make_transaction(self.supplier_prices[1]),
+                    self.make_transaction(self.supplier_prices[1]),
+                ]
+            )
+
+        self.assertEqual(
+            writer.get_stats(), {"inserted": 1, "skipped": 2, "updated": 0}
+        )
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(
+            Transaction.objects.get(supplier_price=self.supplier_prices[0]).final_price,
+            800_000,
+        )
+
+    def test_update_existing_transactions(self):
+        with TransactionWriter() as writer:
+            writer.add(self.make_transaction(self.supplier_prices[0]))
+
+        with TransactionWriter(update_conflicts=True) as writer:
+            writer.extend(
+                [
+                    self.make_transaction(self.supplier_prices[0], final_price=900_000),
+                    self.make_transaction(self.supplier_prices[2]),
+                ]
+            )
+
+        self.assertEqual(
+            writer.get_stats(), {"inserted": 1, "skipped": 0, "updated": 1}
+        )
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(
+            Transaction.objects.get(supplier_price=self.supplier_prices[0]).final_price,
+            900_000,
+        )
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from bababos.pricing.views import AsyncQuoteView, QuoteBatcherMetricsView, QuoteView
+
+urlpatterns = [
+    path("quotes", QuoteView.as_view(), name="quotes"),
+    path("quotes/async", AsyncQuoteView.as_view(), name="async-quotes"),
+    path(
+        "quotes/async/metrics",
+        QuoteBatcherMetricsView.as_view(),
+        name="async-quotes-metrics",
+    ),
+]
@@ -1,3 +1,88 @@
-from django.shortcuts import render
+import json
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from bababos.pricing.serializers import QuoteRequestSerializer, QuoteSerializer
+from bababos.pricing.services import pricing_cache, quote_batcher
+
+NO_DECISION = {"detail": "No price can be decided for this request."}
+
+
+def check_permissions(request) -> JsonResponse | None:
+    """
+    Check a plain Django request with the authentication and permission
+    classes of the API, as ``APIView`` does. Returns the response of a
+    request that is not allowed.
+    """
+    view = APIView()
+    view.request = view.initialize_request(request)
+    try:
+        view.check_permissions(view.request)
+    except exceptions.APIException as error:
+        response = view.handle_exception(error)
+        denied = JsonResponse(response.data, status=response.status_code)
+        if response.has_header("WWW-Authenticate"):
+            denied["WWW-Authenticate"] = response["WWW-Authenticate"]
+        return denied
+    return None
+
+
+class QuoteView(APIView):
+    """
+    Price a quantity of a SKU for a customer, like ``decide`` would, from
+    the in-process pricing cache. Nothing is saved.
+    """
+
+    def post(self, request):
+        serializer = QuoteRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        analyzer = pricing_cache.quote(**serializer.validated_data)
+        if analyzer.chosen_price is None:
+            return Response(NO_DECISION, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        return Response(QuoteSerializer(analyzer).data)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncQuoteView(View):
+    """
+    The quote of ``QuoteView`` for an ASGI server: concurrent requests are
+    coalesced by ``quote_batcher`` and priced from one fetch per batch.
+    """
+
+    async def post(self, request):
+        denied = await sync_to_async(check_permissions)(request)
+        if denied is not None:
+            return denied
+
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse(
+                {"detail": "JSON parse error."}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = QuoteRequestSerializer(data=data)
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        analyzer = await quote_batcher.quote(**serializer.validated_data)
+        if analyzer.chosen_price is None:
+            return JsonResponse(
+                NO_DECISION, status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        return JsonResponse(
+            await sync_to_async(lambda: QuoteSerializer(analyzer).data)()
+        )
+
+
+class QuoteBatcherMetricsView(View):
+    async def get(self, request):
+        return JsonResponse(quote_batcher.get_metrics())
@@ -135,3 +135,30 @@ STATIC_URL = "/static/"
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# The quote API shows supplier codes and cost prices, staff only
+
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "rest_framework.authentication.SessionAuthentication",
+        "rest_framework.authentication.BasicAuthentication",
+    ],
+    "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAdminUser"],
+}
+
+# Pricing cache of the quote API
+# Seconds before cached supplier prices and PO histories are loaded again,
+# writes of other processes (feed, decide) are seen after at most this long
+
+PRICING_CACHE_MAX_AGE = int(os.environ.get("PRICING_CACHE_MAX_AGE", 300))
+
+PRICING_CACHE_MAX_CUSTOMERS = int(os.environ.get("PRICING_CACHE_MAX_CUSTOMERS", 10_000))
+
+PRICING_CACHE_MAX_PRODUCTS = int(os.environ.get("PRICING_CACHE_MAX_PRODUCTS", 100_000))
+
+# Quote requests of the async API coalesced into one batch: seconds the first
+# request waits for others, and the most requests priced together
+
+QUOTE_BATCH_WINDOW = float(os.environ.get("QUOTE_BATCH_WINDOW", 0.005))
+
+QUOTE_BATCH_MAX_SIZE = int(os.environ.get("QUOTE_BATCH_MAX_SIZE", 100))
@@ -35,3 +35,59 @@ class CollectionTest(TestCase):
         self.assertEqual(result[0], data[1])
         self.assertEqual(result[1], data[2])
         self.assertEqual(result[2], data[0])
+
+    def test_filter_matches_every_keyword(self):
+        data = [
+            Item("a", 1),
+            Item("a", 2),
+            Item("b", 2),
+        ]
+
+        result = Collection.of(data).filter(name="a", age=2).get()
+        self.assertEqual(result, [data[1]])
+
+        result = Collection.of(data).filter(name="a").get()
+        self.assertEqual(result, [data[0], data[1]])
+
+        result = Collection.of(data).filter(name="c").get()
+        self.assertEqual(result, [])
+
+    def test_filter_reuses_index(self):
+        collection = Collection.of([Item("a", 1), Item("b", 2)])
+
+        collection.filter(age=1)
+        index = collection.indexes["age"]
+        collection.filter(age=2)
+
+        self.assertIs(collection.indexes["age"], index)
+
+    def test_multiple_order(self):
+        data = [
+            Item("b", 2),
+            Item("a", 2),
+            Item("c", 1),
+            Item("a", 1),
+        ]
+
+        result = Collection.of(data).order_by("age", "name").get()
+        self.assertEqual(result, [data[3], data[2], data[1], data[0]])
+
+        result = Collection.of(data).order_by("-age", "name").get()
+        self.assertEqual(result, [data[1], data[0], data[3], data[2]])
+
+    def test_frame_collection(self):
+        data = [
+            Item("b", 2),
+            Item("a", 2),
+            Item("c", 1),
+            Item("a", 1),
+        ]
+
+        for frame in [False, True]:
+            result = (
+                Collection.of(data, frame=frame).filter(name="a").order_by("-age").get()
+            )
+            self.assertEqual(result, [data[1], data[3]])
+
+            result = Collection.of(data, frame=frame).order_by("age", "-name").get()
+            self.assertEqual(result, [data[2], data[3], data[0], data[1]])
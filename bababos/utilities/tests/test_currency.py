@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+import pandas as pd
+from babel.numbers import format_currency
+from django.test import SimpleTestCase
+from parameterized import parameterized
+
+from bababos.utilities.utils import CurrencyFormatter, get_currency_formatter
+
+
+class CurrencyFormatterTest(SimpleTestCase):
+    @parameterized.expand(
+        [
+            ("integer", Decimal("1968468")),
+            ("places", Decimal("1968468.46800")),
+            ("half_even_down", Decimal("0.005")),
+            ("half_even_up", Decimal("0.015")),
+            ("negative", Decimal("-12500.5")),
+            ("negative_zero", Decimal("-0.001")),
+            ("large", Decimal("1e20")),
+            ("int", 3),
+            ("float", 1.005),
+            ("not_a_number", Decimal("NaN")),
+        ]
+    )
+    def test_same_as_babel(self, _, amount):
+        self.assertEqual(
+            get_currency_formatter().format(amount),
+            format_currency(amount, "IDR", locale="id_ID"),
+        )
+
+    def test_idr(self):
+        formatter = get_currency_formatter()
+
+        self.assertTrue(formatter.fast)
+        self.assertEqual(formatter.format(Decimal("2881122.03044")), "Rp2.881.122,03")
+        self.assertIs(get_currency_formatter(), formatter)
+
+    @parameterized.expand(
+        [("eur", "EUR", "de_DE", True), ("inr", "INR", "en_IN", False)]
+    )
+    def test_other_patterns(self, _, currency, locale, fast):
+        formatter = CurrencyFormatter(currency, locale)
+
+        self.assertEqual(formatter.fast, fast)
+        self.assertEqual(
+            formatter.format(Decimal("-1234567.891")),
+            format_currency(Decimal("-1234567.891"), currency, locale=locale),
+        )
+
+    def test_series(self):
+        amounts = pd.Series(
+            [Decimal("1000"), None, Decimal("1000.00"), Decimal("0.5")],
+            index=[10, 11, 12, 13],
+            name="price",
+        )
+
+        formatted = get_currency_formatter().format_series(amounts)
+
+        self.assertEqual(
+            formatted.to_dict(),
+            {10: "Rp1.000,00", 11: "", 12: "Rp1.000,00", 13: "Rp0,50"},
+        )
+        self.assertEqual(formatted.name, "price")
+
+    def test_float_series(self):
+        formatted = get_currency_formatter().format_series(
+            pd.Series([1.5, float("nan")]), missing=None
+        )
+
+        self.assertEqual(formatted.tolist(), ["Rp1,50", None])
@@ -0,0 +1,101 @@
+import decimal
+import random
+from decimal import Decimal
+
+import numpy as np
+from django.test import SimpleTestCase
+from parameterized import parameterized
+
+from bababos.utilities.utils import money
+
+
+class MoneyTest(SimpleTestCase):
+    @parameterized.expand(
+        [
+            ("integer", Decimal("700000"), 70_000_000_000),
+            ("places", Decimal("1968468.46800"), 196_846_846_800),
+            ("half_up", Decimal("0.000005"), 1),
+            ("half_away_from_zero", Decimal("-0.000005"), -1),
+            ("below_half", Decimal("0.0000049999"), 0),
+            ("float", 0.1, 10_000),
+            ("int", 3, 300_000),
+        ]
+    )
+    def test_to_units(self, _, amount, units):
+        self.assertEqual(money.to_units(amount), units)
+
+    def test_round_trip(self):
+        self.assertEqual(money.from_units(196_846_846_800), Decimal("1968468.468"))
+        self.assertEqual(str(money.from_units(70_000_000_000)), "700000.00000")
+        self.assertEqual(money.to_ratio_units(0.1), 10**19)
+        self.assertEqual(money.from_ratio_units(5 * 10**19), Decimal("0.5"))
+
+    @parameterized.expand(
+        [
+            ("half_up", decimal.ROUND_HALF_UP, [3, 4, -5, -3, 2]),
+            ("half_even", decimal.ROUND_HALF_EVEN, [2, 4, -4, -2, 2]),
+        ]
+    )
+    def test_divide(self, _, rounding, quotients):
+        numerators = [5, 7, -9, -5, 3]
+
+        self.assertEqual(
+            [money.divide(n, 2, rounding=rounding) for n in numerators], quotients
+        )
+        for dtype in ["int64", object]:
+            self.assertEqual(
+                money.divide(
+                    np.array(numerators, dtype=dtype), 2, rounding=rounding
+                ).tolist(),
+                quotients,
+            )
+
+    def test_same_as_decimal(self):
+        """
+        Prices plus margins and ratios of prices, rounded to the stored
+        places, are the ones of exact ``Decimal`` arithmetic.
+        """
+        context = decimal.Context(prec=100, rounding=decimal.ROUND_HALF_UP)
+        places = Decimal(1).scaleb(-money.PLACES)
+        rng = random.Random(24)
+        for _ in range(2000):
+            price = money.from_units(rng.randint(1, 10**15))
+            base = money.from_units(rng.randint(1, 10**15))
+            margin = Decimal(rng.randint(0, 10**20)).scaleb(-money.RATIO_PLACES)
+
+            self.assertEqual(
+                money.add_margin(money.to_units(price), money.to_ratio_units(margin)),
+                money.to_units(
+                    context.add(price, context.multiply(price, margin)).quantize(
+                        places, context=context
+                    )
+                ),
+            )
+            self.assertEqual(
+                money.to_units(
+                    money.from_ratio_units(
+                        money.get_ratio(money.to_units(price), money.to_units(base))
+                    )
+                ),
+                money.to_units(context.divide(price, base)),
+            )
+
+    def test_arrays(self):
+        units = money.to_units_array(
+            [Decimal("1.5"), None, Decimal("1.50000"), float("nan")]
+        )
+
+        self.assertEqual(units.dtype, np.int64)
+        self.assertEqual(units.tolist(), [150_000, 0, 150_000, 0])
+        self.assertEqual(
+            money.from_units_array(units, mask=[True, True, True, False]).tolist(),
+            [Decimal("1.5"), Decimal("0"), Decimal("1.5"), None],
+        )
+        self.assertEqual(
+            money.to_units_array([Decimal("0.5")], money.RATIO_PLACES, dtype=object)[0],
+            5 * 10**19,
+        )
+
+    def test_int64_bound(self):
+        with self.assertRaises(OverflowError):
+            money.to_units_array([Decimal("100000000000000")])
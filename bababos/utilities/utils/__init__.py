@@ -1,4 +1,19 @@
-from .collection import Collection
+from . import money
+from .collection import Collection, FrameCollection
+from .copy import copy_objects
+from .currency import CurrencyFormatter, get_currency_formatter
 from .model import Model
+from .resources import QueryCounter, get_peak_rss_mb, get_rss_mb
 
-__all__ = ["Collection", "Model"]
+__all__ = [
+    "Collection",
+    "CurrencyFormatter",
+    "FrameCollection",
+    "Model",
+    "QueryCounter",
+    "copy_objects",
+    "get_currency_formatter",
+    "get_peak_rss_mb",
+    "get_rss_mb",
+    "money",
+]
@@ -1,30 +1,113 @@
+from collections.abc import Hashable
+
 import pandas as pd
 
 
 class Collection:
+    """
+    Query a list of objects by attribute, the way a queryset would.
+
+    ``filter`` keeps the items matching every keyword, through a hash index
+    per attribute built the first time that attribute is filtered on.
+    ``order_by`` is a stable sort on every key, ``-key`` sorts descending.
+    """
 
     def __init__(self, collection):
-        self.collection = collection
+        self.collection = list(collection)
+        self.indexes = {}
 
     def get(self):
         return self.collection
 
     @classmethod
-    def of(cls, collection):
+    def of(cls, collection, frame=False):
+        if frame:
+            return FrameCollection(collection)
         return cls(collection)
 
     def filter(self, **kwargs):
-        result = []
-        for item in self.collection:
-            for kwarg in kwargs:
-                if getattr(item, kwarg) == kwargs[kwarg]:
-                    result.append(item)
-        self.collection = result
-        return self
+        positions = None
+        for attribute, value in kwargs.items():
+            matches = self._match(attribute, value)
+            positions = matches if positions is None else positions & matches
+
+        if positions is None:
+            return self.__class__(self.collection)
+        return self.__class__(self.collection[i] for i in sorted(positions))
 
     def order_by(self, *args):
         data = self.collection
-        for arg in args:
-            data = sorted(self.collection, key=lambda x: getattr(x, arg))
-        self.collection = data
-        return self
+        for arg in reversed(args):
+            descending = arg.startswith("-")
+            attribute = arg.lstrip("-")
+            data = sorted(
+                data, key=lambda item: getattr(item, attribute), reverse=descending
+            )
+        return self.__class__(data)
+
+    def _match(self, attribute, value):
+        if not isinstance(value, Hashable):
+            return {
+                i
+                for i, item in enumerate(self.collection)
+                if getattr(item, attribute) == value
+            }
+        return self._get_index(attribute).get(value, set())
+
+    def _get_index(self, attribute):
+        if attribute not in self.indexes:
+            index = {}
+            for i, item in enumerate(self.collection):
+                index.setdefault(getattr(item, attribute), set()).add(i)
+            self.indexes[attribute] = index
+        return self.indexes[attribute]
+
+
+class FrameCollection(Collection):
+    """
+    ``Collection`` backed by a DataFrame, for large collections.
+
+    An attribute is read from every item once, into a column, the first time
+    it is used, and filters and sorts then run on the columns.
+    """
+
+    def __init__(self, collection, frame=None):
+        super().__init__(collection)
+        self.frame = (
+            pd.DataFrame(index=pd.RangeIndex(len(self.collection)))
+            if frame is None
+            else frame
+        )
+
+    def filter(self, **kwargs):
+        mask = pd.Series(True, index=self.frame.index)
+        for attribute, value in kwargs.items():
+            mask &= self._get_column(attribute) == value
+        return self._take(self.frame.index[mask.to_numpy()])
+
+    def order_by(self, *args):
+        if not args:
+            return self._take(self.frame.index)
+
+        attributes = [arg.lstrip("-") for arg in args]
+        for attribute in attributes:
+            self._get_column(attribute)
+        frame = self.frame.sort_values(
+            attributes,
+            ascending=[not arg.startswith("-") for arg in args],
+            kind="stable",
+        )
+        return self._take(frame.index)
+
+    def _take(self, labels):
+        positions = self.frame.index.get_indexer(labels)
+        frame = self.frame.iloc[positions].reset_index(drop=True)
+        return self.__class__([self.collection[i] for i in positions], frame=frame)
+
+    def _get_column(self, attribute):
+        if attribute not in self.frame:
+            self.frame[attribute] = pd.Series(
+                [getattr(item, attribute) for item in self.collection],
+                index=self.frame.index,
+            )
+        return self.frame[attribute]
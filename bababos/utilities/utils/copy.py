@@ -0,0 +1,45 @@
+import io
+
+from django.db import connections, router
+
+
+def copy_objects(model, objects, using=None):
+    """
+    Insert unsaved model instances with PostgreSQL ``COPY``.
+
+    Field defaults and ``pre_save`` hooks (``auto_now`` and the like) are
+    applied the same way ``bulk_create`` does, but the primary keys are not
+    set back on the instances.
+    """
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+
+    buffer = io.StringIO()
+    for instance in objects:
+        values = [
+            field.get_db_prep_save(field.pre_save(instance, add=True), connection)
+            for field in fields
+        ]
+        buffer.write("\t".join(_copy_value(value) for value in values))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN", buffer)
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
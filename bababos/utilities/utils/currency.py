@@ -0,0 +1,89 @@
+import decimal
+import functools
+
+import numpy as np
+import pandas as pd
+from babel import Locale
+from babel.numbers import (
+    get_currency_precision,
+    get_currency_symbol,
+    get_decimal_symbol,
+    get_group_symbol,
+    get_minus_sign_symbol,
+)
+
+
+class CurrencyFormatter:
+    """
+    Format amounts of one currency in one locale the same way as
+    ``babel.numbers.format_currency``, with the pattern parsed once.
+
+    Patterns grouping digits by three, such as IDR in id_ID
+    (``Rp1.234.567,89``), are formatted with Python's own number formatting
+    and the symbols of the locale. The fast path is checked against babel
+    once, other patterns and amounts that are not finite go through babel.
+    """
+
+    SAMPLES = ["-1234567.891", "0.005", "0.015", "1000", "-0.001"]
+
+    def __init__(self, currency="IDR", locale="id_ID"):
+        self.currency = currency
+        self.locale = Locale.parse(locale)
+        self.pattern = self.locale.currency_formats["standard"]
+
+        digits = get_currency_precision(currency)
+        self.exponent = decimal.Decimal(1).scaleb(-digits)
+        self.format_spec = f",.{digits}f"
+        # Enough digits to quantize any amount of a DecimalField
+        self.context = decimal.Context(prec=100, rounding=decimal.ROUND_HALF_EVEN)
+        self.symbols = str.maketrans(
+            {
+                ",": get_group_symbol(self.locale),
+                ".": get_decimal_symbol(self.locale),
+            }
+        )
+        symbol = get_currency_symbol(currency, self.locale)
+        minus = get_minus_sign_symbol(self.locale)
+        self.affixes = [
+            tuple(affix.replace("¤", symbol).replace("-", minus) for affix in affixes)
+            for affixes in zip(self.pattern.prefix, self.pattern.suffix)
+        ]
+
+        self.fast = self.pattern.grouping == (3, 3) and all(
+            self.format_fast(decimal.Decimal(sample))
+            == self.pattern.apply(decimal.Decimal(sample), self.locale, currency)
+            for sample in self.SAMPLES
+        )
+
+    def format(self, amount) -> str:
+        if not isinstance(amount, decimal.Decimal):
+            # As babel does, floats are formatted as they are printed
+            amount = decimal.Decimal(str(amount))
+        if self.fast and amount.is_finite():
+            return self.format_fast(amount)
+        return self.pattern.apply(amount, self.locale, currency=self.currency)
+
+    def format_fast(self, amount: decimal.Decimal) -> str:
+        number = format(
+            abs(amount).quantize(self.exponent, context=self.context),
+            self.format_spec,
+        ).translate(self.symbols)
+        prefix, suffix = self.affixes[amount.is_signed()]
+        return prefix + number + suffix
+
+    def format_series(self, amounts: pd.Series, missing="") -> pd.Series:
+        """
+        Format a column, each distinct amount once. Missing amounts are
+        ``missing``.
+        """
+        codes, uniques = pd.factorize(amounts)
+        # Missing amounts have the code -1, the last one
+        formatted = np.array([*map(self.format, uniques), missing], dtype=object)
+        return pd.Series(
+            formatted[codes], index=amounts.index, name=amounts.name, dtype=object
+        )
+
+
+@functools.lru_cache
+def get_currency_formatter(currency="IDR", locale="id_ID") -> CurrencyFormatter:
+    return CurrencyFormatter(currency, locale)
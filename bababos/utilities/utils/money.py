@@ -0,0 +1,106 @@
+import decimal
+
+import numpy as np
+import pandas as pd
+
+# Prices are stored with 5 decimal places, as integers of 10 ** -5 rupiah
+# they are exact and an int64 holds up to 92 trillion rupiah
+PLACES = 5
+SCALE = 10**PLACES
+
+# Profit margins and other ratios, with places enough that a ratio times a
+# price rounds to the same units as the exact product
+RATIO_PLACES = 20
+RATIO_SCALE = 10**RATIO_PLACES
+
+# Enough digits to scale any amount of a DecimalField exactly
+CONTEXT = decimal.Context(prec=100)
+
+
+def to_units(amount, places=PLACES) -> int:
+    """
+    ``amount`` in integers of ``10 ** -places``, rounded half away from
+    zero as PostgreSQL rounds the numeric columns. Floats are taken as they
+    are printed.
+    """
+    if isinstance(amount, float):
+        amount = str(amount)
+    return int(
+        decimal.Decimal(amount)
+        .scaleb(places, context=CONTEXT)
+        .to_integral_value(rounding=decimal.ROUND_HALF_UP)
+    )
+
+
+def from_units(units, places=PLACES) -> decimal.Decimal:
+    return decimal.Decimal(int(units)).scaleb(-places, context=CONTEXT)
+
+
+def to_ratio_units(ratio) -> int:
+    return to_units(ratio, RATIO_PLACES)
+
+
+def from_ratio_units(units) -> decimal.Decimal:
+    return from_units(units, RATIO_PLACES)
+
+
+def divide(numerator, denominator, rounding=decimal.ROUND_HALF_UP):
+    """
+    ``numerator / denominator`` rounded to an integer, half away from zero
+    or half to even. Both are integers, or arrays of them, and
+    ``denominator`` is positive.
+    """
+    negative = numerator < 0
+    magnitude = abs(numerator)
+    quotient, remainder = magnitude // denominator, magnitude % denominator
+    if rounding == decimal.ROUND_HALF_UP:
+        up = remainder * 2 >= denominator
+    elif rounding == decimal.ROUND_HALF_EVEN:
+        up = (remainder * 2 > denominator) | (
+            (remainder * 2 == denominator) & (quotient % 2 == 1)
+        )
+    else:
+        raise ValueError(f"Unsupported rounding {rounding!r}")
+    quotient = quotient + up
+    if isinstance(quotient, np.ndarray):
+        return np.where(negative, -quotient, quotient)
+    return -quotient if negative else quotient
+
+
+def get_ratio(part, whole):
+    """
+    ``part / whole`` in ratio units.
+    """
+    return divide(part * RATIO_SCALE, whole)
+
+
+def add_margin(price, margin):
+    """
+    ``price`` plus ``margin`` (ratio units) of it, rounded to price units.
+    """
+    return price + divide(price * margin, RATIO_SCALE)
+
+
+def to_units_array(amounts, places=PLACES, dtype="int64") -> np.ndarray:
+    """
+    ``to_units`` of a column, each distinct amount converted once. Missing
+    amounts are 0. Ratios do not fit int64, use ``dtype=object`` for them.
+    """
+    codes, uniques = pd.factorize(np.asarray(amounts, dtype=object))
+    # Missing amounts have the code -1, the last one
+    units = [*(to_units(amount, places) for amount in uniques), 0]
+    return np.array(units, dtype=dtype)[codes]
+
+
+def from_units_array(units, places=PLACES, mask=None) -> np.ndarray:
+    """
+    ``Decimal`` of every unit, each distinct one converted once. Where
+    ``mask`` is false the amount is ``None``.
+    """
+    codes, uniques = pd.factorize(np.asarray(units, dtype=object))
+    amounts = np.array(
+        [*(from_units(unit, places) for unit in uniques), None], dtype=object
+    )[codes]
+    if mask is not None:
+        amounts[~np.asarray(mask, dtype=bool)] = None
+    return amounts
@@ -0,0 +1,38 @@
+import os
+import resource
+
+
+class QueryCounter:
+    """
+    Count the queries run on a connection, used as an execute wrapper.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def get_rss_mb():
+    """
+    Resident memory of the process right now, the peak so far where
+    ``/proc`` is not available.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except OSError:
+        return get_peak_rss_mb()
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def get_peak_rss_mb(children=False):
+    """
+    Peak resident memory of the process, or of its largest child process
+    when ``children`` is set.
+    """
+    # Kilobytes on Linux
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    return resource.getrusage(who).ru_maxrss / 1024